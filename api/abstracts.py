@@ -47,7 +47,7 @@ import doctovec
 class Abstracts(object):
     """Manage award abstracts in their string form."""
 
-    def __init__(self):
+    def __init__(self, db=None, directory=None):
         """Parse the data into data frames.
 
             1. award/abstract pairings
@@ -59,7 +59,46 @@ class Abstracts(object):
         few of the abstracts multiple times in the frame, increasing memory
         overhead significantly.
 
+        :type  db: L{award_db.AwardDatabase}
+        :param db: If given, read the pairings from this award database
+            instead of parsing the JSON files; see
+            L{data.DataDirectory.award_db}.
+        :type  directory: L{data.DataDirectory}
+        :param directory: Data directory to look up single awards in through
+            its award index; see L{__getitem__}. Opened on first use by
+            default.
+
         """
+        self._directory = directory
+        abstract_frame_columns = ['award_id', 'abstract', 'title']
+        pi_frame_columns = ['pi_id', 'award_id']
+        if db is not None:
+            awd_abstract_pairings = [
+                (str(award_id), abstract, title)
+                for award_id, abstract, title in db.abstracts()]
+            pi_awd_pairings = [(str(pi_id), str(award_id))
+                               for pi_id, award_id in db.pi_award_pairings()]
+        else:
+            awd_abstract_pairings, pi_awd_pairings = self._parse_pairings()
+
+        self._pi_frame = pd.DataFrame(
+            pi_awd_pairings,
+            columns=pi_frame_columns)
+        self._abstract_frame = pd.DataFrame(
+            awd_abstract_pairings,
+            columns=abstract_frame_columns)
+
+        self.select_columns = ['abstract', 'title']
+        self.abstracts = self._abstract_frame['abstract'].values
+        self.titles = self._abstract_frame['title'].values
+        self.award_ids = self._abstract_frame['award_id'].values
+
+        # include set of PI IDs for convenience
+        self.pis = self._pi_frame['pi_id'].unique()
+
+    @staticmethod
+    def _parse_pairings():
+        """Parse the award/abstract and pi/award pairings from the JSON."""
         awd_abstract_pairings = []
         pi_awd_pairings = []
         data_manager = data.DataDirectory()
@@ -70,43 +109,33 @@ class Abstracts(object):
             title = unicode(award_data['title'])
 
             # add a record for the award/abstract pairing
-            abstract_frame_columns = ['award_id', 'abstract', 'title']
             awd_abstract_pairings.append((award_id, abstract, title))
 
             # add a record for each pi/award pairing
-            pi_frame_columns = ['pi_id', 'award_id']
             for pi_id in pi_list:
                 pi_awd_pairings.append((pi_id, award_id))
 
-        self._pi_frame = pd.DataFrame(
-            pi_awd_pairings,
-            columns=pi_frame_columns)
-        self._abstract_frame = pd.DataFrame(
-            awd_abstract_pairings,
-            columns=abstract_frame_columns)
+        return awd_abstract_pairings, pi_awd_pairings
 
-        self.select_columns = ['abstract', 'title']
-        self.abstracts = self._abstract_frame['abstract'].values
-        self.award_ids = self._abstract_frame['award_id'].values
-
-        # include set of PI IDs for convenience
-        self.pis = self._pi_frame['pi_id'].unique()
+    def data_directory(self):
+        """Return the data directory single awards are looked up in."""
+        if self._directory is None:
+            self._directory = data.DataDirectory()
+        return self._directory
 
     def __getitem__(self, award_id):
         """Look up an abstract by the id of the award it was written for.
+        Only that award is read, through the on-disk award index of the data
+        directory; see L{data.DataDirectory.get_award}.
 
         :type  award_id: str or int
         :param award_id: ID of the award to look up an abstract for.
-        :raises KeyError: If the award id is not in the data parsed.
+        :raises KeyError: If the award id is not in the data.
 
         """
-        selector = self._abstract_frame['award_id'] == str(award_id)
-        result = self._abstract_frame[selector]
-        if len(result) == 1:
-            arr = result[self.select_columns].values
-            return u' '.join(arr[0])
-        else:
-            raise KeyError('unknown award id')
+        award_data = self.data_directory().get_award(award_id)
+        return u' '.join((unicode(award_data['abstract']),
+                          unicode(award_data['title'])))
 
     def for_pi(self, pi_id):
         """Get all abstracts for a particular PI. This gets a list
@@ -334,21 +363,43 @@ class AbstractBoWs(object):
 
         :keyword bool parse: see L{AbstractVectors.__init__}
         :keyword bool filter_extremes: see L{gensim.corpora.dictionary}
+        :keyword bool cached: If True, load the dictionary saved by a
+            previous build when the manifest shows the data files are
+            unchanged, and save the dictionary after building it; by
+            default this is done only when the corpus is parsed from the
+            full data (no I{abstracts} or I{abstract_vectors} passed).
 
         """
         abstract_vectors = kwargs.get('abstract_vectors', None)
         abstracts = kwargs.get('abstracts', None)
         parse = kwargs.get('parse', False)
+        filter_extremes = kwargs.get('filter_extremes', False)
+        cached = kwargs.get(
+            'cached', abstract_vectors is None and abstracts is None)
 
         if abstract_vectors is None:
             self._abstract_vectors = AbstractVectors(abstracts, parse)
         else:
             self._abstract_vectors = abstract_vectors
 
-        self.dictionary = gensim.corpora.dictionary.Dictionary(
-            self._abstract_vectors)
-        if kwargs.get('filter_extremes', False):
-            self.dictionary.filter_extremes()
+        stage = 'bow-dictionary'
+        params = {'filter_extremes': filter_extremes, 'parse': parse}
+        self.params = params
+        self.cached = cached
+        inputs = data.DataDirectory().input_files()
+        manifest = data.load_manifest()
+        if cached and manifest.is_current(stage, inputs, params):
+            self.dictionary = gensim.corpora.dictionary.Dictionary.load(
+                data.BOW_DICTIONARY_FILE)
+        else:
+            self.dictionary = gensim.corpora.dictionary.Dictionary(
+                self._abstract_vectors)
+            if filter_extremes:
+                self.dictionary.filter_extremes()
+            if cached:
+                self.dictionary.save(data.BOW_DICTIONARY_FILE)
+                manifest.record(
+                    stage, inputs, [data.BOW_DICTIONARY_FILE], params)
 
         self.award_ids = self._abstract_vectors.award_ids
         self.pis = self._abstract_vectors.pis
@@ -570,6 +621,44 @@ def build_lda():
     return gensim.models.LdaModel(bow_corpus, id2word=bow_corpus.dictionary)
 
 
+def tfidf_model(bow_corpus=None):
+    """Return the TF-IDF model of the abstracts BoW corpus. The model is
+    loaded from its pickle file if the manifest shows the data files and the
+    saved BoW dictionary are unchanged since it was trained on a corpus with
+    the same parameters; otherwise it is trained and saved. A corpus which
+    does not use the saved dictionary (see the I{cached} keyword of
+    L{AbstractBoWs}) is trained on without touching the saved model.
+
+    :type  bow_corpus: L{AbstractBoWs}
+    :param bow_corpus: The corpus to train on; a new instance with the
+        default parameters is created if none is passed and training is
+        needed.
+    :rtype:  L{gensim.models.TfidfModel}
+    :return: The TF-IDF model.
+
+    """
+    if bow_corpus is not None and not bow_corpus.cached:
+        return gensim.models.TfidfModel(bow_corpus)
+
+    stage = 'tfidf'
+    if bow_corpus is None:
+        params = {'filter_extremes': False, 'parse': False}
+    else:
+        params = bow_corpus.params
+    inputs = data.DataDirectory().input_files() + [data.BOW_DICTIONARY_FILE]
+    manifest = data.load_manifest()
+    if (os.path.isfile(data.BOW_DICTIONARY_FILE) and
+            manifest.is_current(stage, inputs, params)):
+        return gensim.models.TfidfModel.load(data.TFIDF_FILE)
+
+    if bow_corpus is None:
+        bow_corpus = AbstractBoWs()
+    tfidf = gensim.models.TfidfModel(bow_corpus)
+    tfidf.save(data.TFIDF_FILE)
+    manifest.record(stage, inputs, [data.TFIDF_FILE], params)
+    return tfidf
+
+
 def write_wordle_files(lda_model, num_topics=10, topn=40):
     """Write files in a format which can be copy/pasted into wordle.net
     to generate word clouds. The format is really quite simple::
@@ -623,4 +712,4 @@ def write_wordle_files(lda_model, num_topics=10, topn=40):
 
 if __name__ == "__main__":
     corpus = AbstractBoWs()
-    tfidf = gensim.models.TfidfModel(corpus)
+    tfidf = tfidf_model(corpus)
@@ -0,0 +1,389 @@
+"""
+This module contains a local SQLite database of the award data, for
+answering lookups like "which awards did this PI work on" or "which awards
+did this program fund" with an index seek instead of a scan over every award
+or a data frame rebuilt in memory on each start. It is a lightweight stand-in
+for the relational store planned in db/README.md.
+
+The database has the following tables::
+
+    award           (award_id, title, abstract, effective, expiration)
+    award_pi        (award_id, pi_id, position)
+    award_po        (award_id, po_id, position)
+    agent           (agent_id, dir_id, dir_name, dir_abbr, div_id, div_name,
+                     div_abbr, pgm_id, pgm_name)
+    award_agent     (award_id, agent_id, position)
+    pi_name         (pi_id, name)                       from pi-names.csv
+    institution     (inst_id, org, street, city, state, zip, nation)
+                                                        from institutions.csv
+    pi_affiliation  (pi_id, inst_id)                    from pi-affiliations.csv
+
+Ids are stored as text and dates in the 'YYYY-MM-DD' form of the JSON, so
+date ranges compare correctly as strings; missing dates are NULL. The
+position columns keep the order of the lists in the JSON.
+
+The database is written in one transaction with bulk inserts, and the
+indexes are created after the rows are loaded. It is opened in WAL mode, so
+readers in other processes are not blocked by a writer.
+
+"""
+import os
+import csv
+import sqlite3
+import itertools
+
+import award_store
+
+
+BATCH_SIZE = 5000
+
+SCHEMA = """
+CREATE TABLE award (
+    award_id TEXT PRIMARY KEY,
+    title TEXT,
+    abstract TEXT,
+    effective TEXT,
+    expiration TEXT
+);
+CREATE TABLE award_pi (award_id TEXT, pi_id TEXT, position INTEGER);
+CREATE TABLE award_po (award_id TEXT, po_id TEXT, position INTEGER);
+CREATE TABLE agent (
+    agent_id INTEGER PRIMARY KEY,
+    dir_id TEXT, dir_name TEXT, dir_abbr TEXT,
+    div_id TEXT, div_name TEXT, div_abbr TEXT,
+    pgm_id TEXT, pgm_name TEXT
+);
+CREATE TABLE award_agent (award_id TEXT, agent_id INTEGER, position INTEGER);
+CREATE TABLE pi_name (pi_id TEXT PRIMARY KEY, name TEXT);
+CREATE TABLE institution (
+    inst_id TEXT PRIMARY KEY,
+    org TEXT, street TEXT, city TEXT, state TEXT, zip TEXT, nation TEXT
+);
+CREATE TABLE pi_affiliation (pi_id TEXT, inst_id TEXT);
+"""
+
+INDEXES = """
+CREATE INDEX award_effective ON award (effective);
+CREATE INDEX award_pi_pi ON award_pi (pi_id);
+CREATE INDEX award_pi_award ON award_pi (award_id);
+CREATE INDEX award_po_po ON award_po (po_id);
+CREATE INDEX award_po_award ON award_po (award_id);
+CREATE INDEX award_agent_agent ON award_agent (agent_id);
+CREATE INDEX award_agent_award ON award_agent (award_id);
+CREATE INDEX agent_pgm ON agent (pgm_id);
+CREATE INDEX agent_div ON agent (div_id);
+CREATE INDEX agent_dir ON agent (dir_id);
+CREATE INDEX pi_affiliation_pi ON pi_affiliation (pi_id);
+CREATE INDEX pi_affiliation_inst ON pi_affiliation (inst_id);
+"""
+
+# the CSV files loaded from the csv directory, and the tables they fill
+CSV_TABLES = (
+    ('pi-names.csv', 'pi_name', 2),
+    ('institutions.csv', 'institution', 7),
+    ('pi-affiliations.csv', 'pi_affiliation', 2)
+)
+
+# columns of the funding agent records; see L{AwardDatabase.funding_agents}
+AGENT_COLUMNS = [
+    'pi_id', 'award_id',
+    'dir_id', 'dir_name', 'dir_abbr',
+    'div_id', 'div_name', 'div_abbr',
+    'pgm_id', 'pgm_name'
+]
+
+
+def connect(path):
+    """Open a connection to an award database in WAL mode."""
+    conn = sqlite3.connect(path)
+    conn.text_factory = unicode
+    conn.execute('PRAGMA journal_mode=WAL')
+    return conn
+
+
+def _batches(rows, size=BATCH_SIZE):
+    rows = iter(rows)
+    while True:
+        batch = list(itertools.islice(rows, size))
+        if not batch:
+            return
+        yield batch
+
+
+def _csv_rows(path, width):
+    with open(path, 'rb') as f:
+        reader = csv.reader(f)
+        next(reader, None)  # header
+        for row in reader:
+            if len(row) == width:
+                yield [value.decode('utf-8') for value in row]
+
+
+def _null_date(value):
+    return value if value else None
+
+
+class _AwardLoader(object):
+    """Split award dicts into the rows of the award tables."""
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.agents = {}  # agent key -> agent id
+        self.lists = {'award_pi': [], 'award_po': [], 'award_agent': []}
+
+    def rows(self, awards):
+        """Yield award rows, buffering the rows of the list tables."""
+        for award in awards:
+            award_id = unicode(award['awardID'])
+            yield (award_id, award['title'], award['abstract'],
+                   _null_date(award['effectiveDate']),
+                   _null_date(award['expirationDate']))
+
+            for position, pi_id in enumerate(award['PIcoPI']):
+                self.lists['award_pi'].append(
+                    (award_id, unicode(pi_id), position))
+            for position, po_id in enumerate(award['PO']):
+                self.lists['award_po'].append(
+                    (award_id, unicode(po_id), position))
+            for position, agent in enumerate(award['fundingAgent']):
+                key = award_store.agent_key(agent)
+                agent_id = self.agents.get(key)
+                if agent_id is None:
+                    agent_id = self.agents[key] = len(self.agents)
+                self.lists['award_agent'].append(
+                    (award_id, agent_id, position))
+
+    def flush_lists(self):
+        """Insert the buffered rows of the list tables."""
+        for table, rows in self.lists.items():
+            if rows:
+                self.conn.executemany(
+                    'INSERT INTO {} VALUES (?, ?, ?)'.format(table), rows)
+                del rows[:]
+
+    def load(self, awards):
+        for batch in _batches(self.rows(awards)):
+            self.conn.executemany(
+                'INSERT INTO award VALUES (?, ?, ?, ?, ?)',
+                batch)
+            self.flush_lists()
+        self.flush_lists()
+
+        self.conn.executemany(
+            'INSERT INTO agent VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+            (((agent_id,) + key) for key, agent_id in self.agents.items()))
+
+
+def build_database(path, awards, csv_dir=None):
+    """Write a new award database, replacing any existing one at the path.
+
+    :param str path: Path of the database file.
+    :type  awards: iterable of dict
+    :param awards: The awards, in the layout of the JSON data files.
+    :param str csv_dir: Directory with the pi-names.csv, institutions.csv,
+        and pi-affiliations.csv files to load; files which are missing are
+        skipped, and so are all of them if this is None.
+    :rtype:  L{AwardDatabase}
+    :return: The database which was written, opened for reading.
+    :raises sqlite3.IntegrityError: If an award id appears twice.
+
+    """
+    tmp_path = path + '.tmp'
+    for suffix in ('', '-wal', '-shm'):
+        if os.path.exists(tmp_path + suffix):
+            os.remove(tmp_path + suffix)
+
+    conn = connect(tmp_path)
+    try:
+        conn.execute('PRAGMA synchronous=OFF')
+        conn.executescript(SCHEMA)
+        with conn:
+            _AwardLoader(conn).load(awards)
+            for filename, table, width in CSV_TABLES:
+                csv_path = os.path.join(csv_dir or '', filename)
+                if csv_dir is None or not os.path.isfile(csv_path):
+                    continue
+                placeholders = ', '.join('?' * width)
+                conn.executemany(
+                    'INSERT OR REPLACE INTO {} VALUES ({})'.format(
+                        table, placeholders),
+                    _csv_rows(csv_path, width))
+        conn.executescript(INDEXES)
+        conn.execute('ANALYZE')
+        conn.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+    finally:
+        conn.close()
+
+    for suffix in ('-wal', '-shm'):
+        if os.path.exists(tmp_path + suffix):
+            os.remove(tmp_path + suffix)
+    os.rename(tmp_path, path)
+    return AwardDatabase(path)
+
+
+class AwardDatabase(object):
+    """Query an award database written by L{build_database}."""
+
+    def __init__(self, path):
+        """
+        :param str path: Path of the database file.
+        :raises IOError: If there is no database at the path.
+
+        """
+        if not os.path.isfile(path):
+            raise IOError('no award database at {}'.format(path))
+        self.path = path
+        self.conn = connect(path)
+
+    def __len__(self):
+        return self.conn.execute('SELECT COUNT(*) FROM award').fetchone()[0]
+
+    def __str__(self):
+        return 'Award database of {} awards at {}.'.format(len(self),
+                                                            self.path)
+
+    def close(self):
+        self.conn.close()
+
+    def _column(self, query, params=()):
+        return [row[0] for row in self.conn.execute(query, params)]
+
+    def awards_for_pi(self, pi_id):
+        """Return the ids of all awards a PI worked on, in award id order.
+
+        :type  pi_id: str or int
+        :param pi_id: The id of the PI.
+        :rtype:  list of unicode
+        :return: The award ids.
+
+        """
+        return self._column(
+            'SELECT DISTINCT award_id FROM award_pi WHERE pi_id = ? '
+            'ORDER BY award_id', (unicode(pi_id),))
+
+    def pis_for_award(self, award_id):
+        """Return the ids of the PIs of an award, in the order of the JSON.
+
+        :type  award_id: str or int
+        :param award_id: The id of the award.
+        :rtype:  list of unicode
+        :return: The PI ids.
+
+        """
+        return self._column(
+            'SELECT pi_id FROM award_pi WHERE award_id = ? '
+            'ORDER BY position', (unicode(award_id),))
+
+    def awards_for_program(self, pgm_id):
+        """Return the ids of all awards funded by a program.
+
+        :type  pgm_id: str or int
+        :param pgm_id: The id of the program.
+        :rtype:  list of unicode
+        :return: The award ids, in award id order.
+
+        """
+        return self._column(
+            'SELECT DISTINCT aa.award_id FROM agent a '
+            'JOIN award_agent aa ON aa.agent_id = a.agent_id '
+            'WHERE a.pgm_id = ? ORDER BY aa.award_id', (unicode(pgm_id),))
+
+    def awards_between(self, start, end):
+        """Return the ids of all awards active at any point between two
+        dates (inclusive): those which take effect no later than the end and
+        expire no earlier than the start, or have no expiration date.
+
+        :param str start: First day of the range, as 'YYYY-MM-DD'.
+        :param str end: Last day of the range, as 'YYYY-MM-DD'.
+        :rtype:  list of unicode
+        :return: The award ids, in order of effective date.
+
+        """
+        return self._column(
+            'SELECT award_id FROM award WHERE effective <= ? '
+            'AND (expiration IS NULL OR expiration >= ?) '
+            'ORDER BY effective, award_id',
+            (str(end), str(start)))
+
+    def award(self, award_id):
+        """Rebuild the award dict for an award id, in the same layout as the
+        awards parsed from the JSON files.
+
+        :type  award_id: str or int
+        :param award_id: The id of the award.
+        :rtype:  dict
+        :return: The award data.
+        :raises KeyError: If there is no award with that id.
+
+        """
+        award_id = unicode(award_id)
+        row = self.conn.execute(
+            'SELECT title, abstract, effective, expiration FROM award '
+            'WHERE award_id = ?', (award_id,)).fetchone()
+        if row is None:
+            raise KeyError(award_id)
+
+        title, abstract, effective, expiration = row
+        agents = self.conn.execute(
+            'SELECT a.dir_id, a.dir_name, a.dir_abbr, a.div_id, a.div_name, '
+            'a.div_abbr, a.pgm_id, a.pgm_name FROM award_agent aa '
+            'JOIN agent a ON a.agent_id = aa.agent_id '
+            'WHERE aa.award_id = ? ORDER BY aa.position', (award_id,))
+        return {
+            'awardID': award_id,
+            'title': title,
+            'abstract': abstract,
+            'effectiveDate': effective or '',
+            'expirationDate': expiration or '',
+            'PIcoPI': self.pis_for_award(award_id),
+            'PO': self._column(
+                'SELECT po_id FROM award_po WHERE award_id = ? '
+                'ORDER BY position', (award_id,)),
+            'fundingAgent': [award_store.agent_dict(tuple(agent))
+                             for agent in agents]
+        }
+
+    def pi_award_pairings(self):
+        """Return a (pi_id, award_id) record for each PI of each award."""
+        return self.conn.execute(
+            'SELECT pi_id, award_id FROM award_pi').fetchall()
+
+    def abstracts(self):
+        """Return an (award_id, abstract, title) record for each award."""
+        return self.conn.execute(
+            'SELECT award_id, abstract, title FROM award '
+            'ORDER BY rowid').fetchall()
+
+    def funding_agents(self):
+        """Return a record for every funding agent / PI combination of every
+        award, with the fields of L{AGENT_COLUMNS}; the same records as
+        L{parse.parse_funding_agents} builds from the JSON files.
+
+        """
+        return self.conn.execute(
+            'SELECT ap.pi_id, ap.award_id, a.dir_id, a.dir_name, a.dir_abbr, '
+            'a.div_id, a.div_name, a.div_abbr, a.pgm_id, a.pgm_name '
+            'FROM award_agent aa '
+            'JOIN agent a ON a.agent_id = aa.agent_id '
+            'JOIN award_pi ap ON ap.award_id = aa.award_id').fetchall()
+
+    def pi_name(self, pi_id):
+        """Return the name of a PI, or None if it is not in pi-names.csv."""
+        row = self.conn.execute('SELECT name FROM pi_name WHERE pi_id = ?',
+                                (unicode(pi_id),)).fetchone()
+        return None if row is None else row[0]
+
+    def affiliations(self, pi_id):
+        """Return the institution records a PI is affiliated with.
+
+        :type  pi_id: str or int
+        :param pi_id: The id of the PI.
+        :rtype:  list of tuple
+        :return: (inst_id, org, street, city, state, zip, nation) records.
+
+        """
+        return self.conn.execute(
+            'SELECT i.* FROM pi_affiliation p '
+            'JOIN institution i ON i.inst_id = p.inst_id '
+            'WHERE p.pi_id = ? ORDER BY i.inst_id',
+            (unicode(pi_id),)).fetchall()
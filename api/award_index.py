@@ -0,0 +1,200 @@
+"""
+This module contains a persistent index from award ids (and document ids) to
+the location of each award's data, so a single award can be fetched without
+scanning the whole dataset. What a location is depends on the backend of the
+L{data.DataDirectory} the index was built for:
+
+    json:       (filename, byte offset, byte length) of the award's object
+                within its monthly JSON file
+    columnar:   the award's row in the compiled L{award_store.AwardStore}
+
+The index is built once by scanning the data, then pickled so that later
+sessions only pay for unpickling a dict.
+
+"""
+import os
+import cPickle as pickle
+from cStringIO import StringIO
+
+try:
+    import ujson as json
+except ImportError:
+    import json
+
+import json_stream
+
+
+def award_spans(text):
+    """Find the byte span of each award object in the text of a JSON data file,
+    without decoding the awards; see L{json_stream.iter_award_objects}.
+
+    :param str text: The raw (undecoded) contents of a JSON data file.
+    :rtype:  iterator yielding (str, int, int)
+    :return: An iterator over (doc_id, start, end) for each award, where
+        text[start:end] is the award's JSON object.
+    :raises ValueError: If the text ends inside a string.
+
+    """
+    for doc_id, offset, raw in json_stream.iter_award_objects(
+            StringIO(text)):
+        yield (doc_id, offset, offset + len(raw))
+
+
+def read_award(filepath, offset, length):
+    """Read and decode a single award object from a JSON data file.
+
+    :param str filepath: Path of the JSON data file.
+    :param int offset: Byte offset of the award's object in the file.
+    :param int length: Byte length of the award's object.
+    :rtype:  dict
+    :return: The decoded award.
+
+    """
+    with open(filepath, 'rb') as f:
+        f.seek(offset)
+        return json.loads(f.read(length))
+
+
+class AwardIndex(object):
+    """Map award ids and document ids to the location of their data."""
+
+    def __init__(self, backend, locations=None, doc_ids=None):
+        """
+        :param str backend: The L{data.DataDirectory} backend the locations
+            refer to; either 'json' or 'columnar'.
+        :param dict locations: Maps award ids to their locations.
+        :param dict doc_ids: Maps document ids to award ids.
+
+        """
+        self.backend = backend
+        self.locations = {} if locations is None else locations
+        self.doc_ids = {} if doc_ids is None else doc_ids
+
+    def __len__(self):
+        return len(self.locations)
+
+    def __contains__(self, award_id):
+        return str(award_id) in self.locations
+
+    def __str__(self):
+        msg = 'Index of {} awards for the {} backend.'
+        return msg.format(len(self), self.backend)
+
+    def add(self, award_id, doc_id, location):
+        """Record the location of an award.
+
+        :type  award_id: str or int
+        :param award_id: The id of the award.
+        :type  doc_id: str or int
+        :param doc_id: The id of the document the award is keyed by.
+        :param location: Where the award's data is; see the module docstring.
+
+        """
+        award_id = str(award_id)
+        self.locations[award_id] = location
+        self.doc_ids[str(doc_id)] = award_id
+
+    def location(self, award_id):
+        """Look up the location of an award.
+
+        :type  award_id: str or int
+        :param award_id: The id of the award to look up.
+        :return: The location of the award's data.
+        :raises KeyError: If the award id is not in the index.
+
+        """
+        return self.locations[str(award_id)]
+
+    def award_id(self, doc_id):
+        """Look up the award id for a document id.
+
+        :type  doc_id: str or int
+        :param doc_id: The id of the document to look up.
+        :rtype:  str
+        :return: The id of the award the document is for.
+        :raises KeyError: If the document id is not in the index.
+
+        """
+        return self.doc_ids[str(doc_id)]
+
+    def remove_files(self, filenames):
+        """Drop every award located in one of the given JSON data files, so
+        those files can be re-indexed after they change.
+
+        :type  filenames: iterable of str
+        :param filenames: Base names of the JSON data files.
+
+        """
+        filenames = set(filenames)
+        removed = set(award_id for award_id, location
+                      in self.locations.iteritems()
+                      if location[0] in filenames)
+        for award_id in removed:
+            del self.locations[award_id]
+        for doc_id, award_id in self.doc_ids.items():
+            if award_id in removed:
+                del self.doc_ids[doc_id]
+
+    def index_file(self, filepath):
+        """Add the location of every award in a JSON data file.
+
+        :param str filepath: Path of the JSON data file to scan.
+
+        """
+        filename = os.path.basename(filepath)
+        with open(filepath, 'rb') as f:
+            for doc_id, offset, raw in json_stream.iter_award_objects(f):
+                award = json.loads(raw)
+                location = (filename, offset, len(raw))
+                self.add(award['awardID'], doc_id, location)
+
+    def save(self, path):
+        """Pickle the index to the given path."""
+        state = (self.backend, self.locations, self.doc_ids)
+        with open(path, 'wb') as f:
+            pickle.dump(state, f, pickle.HIGHEST_PROTOCOL)
+
+    @classmethod
+    def load(cls, path):
+        """Load an index pickled by L{save}.
+
+        :param str path: Path of the pickle file.
+        :rtype:  L{AwardIndex}
+        :return: The loaded index.
+
+        """
+        with open(path, 'rb') as f:
+            backend, locations, doc_ids = pickle.load(f)
+        return cls(backend, locations, doc_ids)
+
+    @classmethod
+    def build_json(cls, filepaths):
+        """Build an index over JSON data files.
+
+        :type  filepaths: iterable of str
+        :param filepaths: Paths of the JSON data files to index.
+        :rtype:  L{AwardIndex}
+        :return: The index, with (filename, offset, length) locations.
+
+        """
+        index = cls('json')
+        for filepath in filepaths:
+            index.index_file(filepath)
+        return index
+
+    @classmethod
+    def build_columnar(cls, store):
+        """Build an index over a compiled award store.
+
+        :type  store: L{award_store.AwardStore}
+        :param store: The store to index.
+        :rtype:  L{AwardIndex}
+        :return: The index, with store rows as locations.
+
+        """
+        index = cls('columnar')
+        award_ids = store.column('award_id')
+        doc_ids = store.column('doc_id')
+        for row in xrange(len(store)):
+            index.add(award_ids[row], doc_ids[row], row)
+        return index
@@ -0,0 +1,497 @@
+"""
+This module contains a columnar, typed store for the award data. Decoding the
+raw JSON files dominates the start-up time of everything built on top of
+L{data.DataDirectory}, so the store is compiled from them once and then read
+back through memory-mapped numpy arrays.
+
+Each column lives in its own binary file in the store directory::
+
+    award_id.bin            fixed-width award ids, one per row
+    doc_id.bin              fixed-width document ids, one per row
+    effective.bin           effective dates (datetime64[D])
+    expiration.bin          expiration dates (datetime64[D])
+    source.bin              year/month of the originating file (yyyymm)
+    pi_offsets.bin          offsets into pi_codes (num_rows + 1 entries)
+    pi_codes.bin            codes into the PI string table
+    po_offsets.bin          offsets into po_codes
+    po_codes.bin            codes into the PO string table
+    agent_offsets.bin       offsets into agent_codes
+    agent_codes.bin         codes into the funding agent table
+    title_offsets.bin       byte offsets into the title blob
+    title.bin               utf-8 encoded titles, concatenated
+    abstract_offsets.bin    byte offsets into the abstract blob
+    abstract.bin            utf-8 encoded abstracts, concatenated
+    meta.json               dtypes, row count, string tables, source ranges
+
+The list columns are stored CSR-style, so the PI ids for row i are::
+
+    pi_table[pi_codes[pi_offsets[i]:pi_offsets[i + 1]]]
+
+Rows are written in the order the awards are appended, which is chronological
+when compiled through L{data.compile_award_store}, and all rows from one
+source file are contiguous.
+
+The PI and PO tables keep the values with the types they had in the JSON
+(the data mixes integer and string ids), so rebuilt awards compare equal to
+the parsed ones. Rebuilding award dicts still costs about as much as decoding
+the JSON; L{AwardStore.awards} does it a chunk of rows at a time to keep the
+per-row overhead down, but the fast path is L{AwardStore.column}, which reads
+whole columns without building any dicts.
+
+"""
+import os
+
+try:
+    import ujson as json
+except ImportError:
+    import json
+
+import numpy as np
+
+
+ID_WIDTH = 16
+ID_DTYPE = 'S{}'.format(ID_WIDTH)
+DATE_DTYPE = 'datetime64[D]'
+OFFSET_DTYPE = 'int64'
+CODE_DTYPE = 'int32'
+BLOB_DTYPE = 'uint8'
+META_FILE = 'meta.json'
+CHUNK_SIZE = 10000  # rows decoded at once when rebuilding award dicts
+
+# fixed-size columns with one entry per row
+ROW_COLUMNS = (
+    ('award_id', ID_DTYPE),
+    ('doc_id', ID_DTYPE),
+    ('effective', DATE_DTYPE),
+    ('expiration', DATE_DTYPE),
+    ('source', 'int32')
+)
+# variable-length columns backed by a table of distinct values
+LIST_COLUMNS = ('pi', 'po', 'agent')
+# variable-length utf-8 text columns
+TEXT_COLUMNS = ('title', 'abstract')
+
+# the funding agent fields, in the order they are stored in the agent table
+AGENT_FIELDS = (
+    ('dir', ('id', 'name', 'abbr')),
+    ('div', ('id', 'name', 'abbr')),
+    ('pgm', ('id', 'name'))
+)
+
+
+def _column_dtypes():
+    dtypes = dict(ROW_COLUMNS)
+    for name in LIST_COLUMNS:
+        dtypes[name + '_offsets'] = OFFSET_DTYPE
+        dtypes[name + '_codes'] = CODE_DTYPE
+    for name in TEXT_COLUMNS:
+        dtypes[name + '_offsets'] = OFFSET_DTYPE
+        dtypes[name] = BLOB_DTYPE
+    return dtypes
+
+
+def _encode_id(value):
+    encoded = unicode(value).encode('ascii')
+    if len(encoded) > ID_WIDTH:
+        raise ValueError('id longer than {} bytes: {}'.format(
+            ID_WIDTH, encoded))
+    return encoded
+
+
+def _encode_date(value):
+    return value if value else 'NaT'
+
+
+def agent_key(agent):
+    """Flatten a funding agent dict from the JSON data into a tuple that can
+    be stored in the agent table.
+
+    :param dict agent: The funding agent, with 'dir', 'div', and 'pgm' keys.
+    :rtype:  tuple of str
+    :return: The agent fields, ordered as in L{AGENT_FIELDS}.
+
+    """
+    return tuple(agent[level][field]
+                 for level, fields in AGENT_FIELDS
+                 for field in fields)
+
+
+def agent_dict(key):
+    """Inverse of L{agent_key}: rebuild the nested funding agent dict.
+
+    :param tuple key: The flattened funding agent fields.
+    :rtype:  dict
+    :return: The funding agent in the same layout as the JSON data.
+
+    """
+    agent = {}
+    values = iter(key)
+    for level, fields in AGENT_FIELDS:
+        agent[level] = {field: next(values) for field in fields}
+    return agent
+
+
+class AwardStoreWriter(object):
+    """Append awards to a new columnar store on disk.
+
+    Rows are buffered and flushed to the column files every I{flush_every}
+    awards, so memory use is bounded by the buffer size plus the distinct
+    values of the PI, PO, and funding agent tables. The store only becomes
+    readable once L{close} writes the meta file.
+
+    """
+
+    def __init__(self, dirpath, flush_every=10000):
+        """
+        :param str dirpath: Directory to write the store to; it is created
+            if it does not exist and existing column files are overwritten.
+        :param int flush_every: Number of rows to buffer between writes.
+
+        """
+        if not os.path.isdir(dirpath):
+            os.makedirs(dirpath)
+
+        self.dirpath = dirpath
+        self.flush_every = flush_every
+        self.num_rows = 0
+        self.sources = []  # [source, start row, stop row, filename]
+        self.dtypes = _column_dtypes()
+
+        self._codes = {name: {} for name in LIST_COLUMNS}
+        self._tables = {name: [] for name in LIST_COLUMNS}
+        self._ends = {name: 0 for name in LIST_COLUMNS + TEXT_COLUMNS}
+        self._files = {
+            name: open(os.path.join(dirpath, name + '.bin'), 'wb')
+            for name in self.dtypes
+        }
+        self._buffers = {name: [] for name in self.dtypes}
+
+        # every offsets column starts at 0
+        for name in LIST_COLUMNS + TEXT_COLUMNS:
+            self._buffers[name + '_offsets'].append(0)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            for f in self._files.values():
+                f.close()
+
+    def _encode_list(self, name, values):
+        codes = self._codes[name]
+        table = self._tables[name]
+        encoded = []
+        for value in values:
+            code = codes.get(value)
+            if code is None:
+                code = codes[value] = len(table)
+                table.append(value)
+            encoded.append(code)
+
+        self._buffers[name + '_codes'].extend(encoded)
+        self._ends[name] += len(encoded)
+        self._buffers[name + '_offsets'].append(self._ends[name])
+
+    def _encode_text(self, name, text):
+        encoded = text.encode('utf-8')
+        self._buffers[name].append(encoded)
+        self._ends[name] += len(encoded)
+        self._buffers[name + '_offsets'].append(self._ends[name])
+
+    def _track_source(self, source, filename):
+        if self.sources and self.sources[-1][0] == source:
+            self.sources[-1][2] = self.num_rows + 1
+        elif any(entry[0] == source for entry in self.sources):
+            raise ValueError(
+                'awards for source {} must be appended together'.format(
+                    source))
+        else:
+            self.sources.append(
+                [source, self.num_rows, self.num_rows + 1, filename])
+
+    def append(self, doc_id, award, source=0, filename=''):
+        """Append one award to the store.
+
+        :param str doc_id: The document id the award is keyed by in the JSON.
+        :param dict award: The award data, in the same layout as the JSON.
+        :param int source: The year and month of the file the award was read
+            from, as yyyymm; all awards of one source must be appended one
+            after another.
+        :param str filename: Name of the file the award was read from.
+        :raises ValueError: If an id is too long or a source is split.
+
+        """
+        self._track_source(source, filename)
+
+        buffers = self._buffers
+        buffers['award_id'].append(_encode_id(award['awardID']))
+        buffers['doc_id'].append(_encode_id(doc_id))
+        buffers['effective'].append(_encode_date(award['effectiveDate']))
+        buffers['expiration'].append(_encode_date(award['expirationDate']))
+        buffers['source'].append(source)
+
+        # ids keep their JSON type; the meta file stores them as they are
+        self._encode_list('pi', list(award['PIcoPI']))
+        self._encode_list('po', list(award['PO']))
+        self._encode_list(
+            'agent', [agent_key(agent) for agent in award['fundingAgent']])
+        self._encode_text('title', award['title'])
+        self._encode_text('abstract', award['abstract'])
+
+        self.num_rows += 1
+        if self.num_rows % self.flush_every == 0:
+            self.flush()
+
+    def flush(self):
+        """Write all buffered rows to the column files."""
+        for name, buf in self._buffers.items():
+            if not buf:
+                continue
+
+            f = self._files[name]
+            if name in TEXT_COLUMNS:
+                f.write(''.join(buf))
+            else:
+                np.array(buf, dtype=self.dtypes[name]).tofile(f)
+            del buf[:]
+
+    def close(self):
+        """Flush remaining rows and write the meta file, which makes the store
+        readable by L{AwardStore}.
+
+        """
+        self.flush()
+        for f in self._files.values():
+            f.close()
+
+        meta = {
+            'num_rows': self.num_rows,
+            'dtypes': self.dtypes,
+            'sources': self.sources,
+            'tables': {name: self._tables[name] for name in LIST_COLUMNS}
+        }
+        path = os.path.join(self.dirpath, META_FILE)
+        with open(path + '.tmp', 'w') as f:
+            json.dump(meta, f)
+        os.rename(path + '.tmp', path)
+
+
+class AwardStore(object):
+    """Read awards back from a columnar store written by L{AwardStoreWriter}.
+
+    Columns are memory-mapped lazily on first access, so opening a store only
+    costs reading its meta file.
+
+    """
+
+    def __init__(self, dirpath):
+        """
+        :param str dirpath: Directory the store was written to.
+        :raises IOError: If there is no compiled store in the directory.
+
+        """
+        self.dirpath = dirpath
+        meta_path = os.path.join(dirpath, META_FILE)
+        if not os.path.isfile(meta_path):
+            raise IOError('no compiled award store in {}'.format(dirpath))
+
+        with open(meta_path) as f:
+            meta = json.load(f)
+
+        self.num_rows = meta['num_rows']
+        self.dtypes = meta['dtypes']
+        self.sources = [tuple(entry) for entry in meta['sources']]
+        self.tables = {
+            'pi': list(meta['tables']['pi']),
+            'po': list(meta['tables']['po']),
+            'agent': [tuple(agent) for agent in meta['tables']['agent']]
+        }
+        self._columns = {}
+
+    def __len__(self):
+        return self.num_rows
+
+    def __str__(self):
+        msg = 'Columnar store of {} awards from {} source files.'
+        return msg.format(self.num_rows, len(self.sources))
+
+    def column(self, name):
+        """Return the memory-mapped array for a column of the store.
+
+        :param str name: Name of the column; see the module docstring.
+        :rtype:  L{numpy.ndarray}
+        :return: The read-only column array.
+        :raises KeyError: If there is no such column.
+
+        """
+        try:
+            return self._columns[name]
+        except KeyError:
+            dtype = np.dtype(self.dtypes[name])
+            path = os.path.join(self.dirpath, name + '.bin')
+            if os.path.getsize(path) == 0:  # mmap refuses empty files
+                array = np.zeros(0, dtype=dtype)
+            else:
+                array = np.memmap(path, dtype=dtype, mode='r')
+            self._columns[name] = array
+            return array
+
+    def source_rows(self, source):
+        """Return the range of rows read from the given source file.
+
+        :param int source: The year and month of the source, as yyyymm.
+        :rtype:  xrange
+        :return: The rows for that source; empty if it is not in the store.
+
+        """
+        for entry in self.sources:
+            if entry[0] == source:
+                return xrange(entry[1], entry[2])
+        return xrange(0)
+
+    def list_codes(self, name, row):
+        """Return the table codes of a list column for one row."""
+        offsets = self.column(name + '_offsets')
+        return self.column(name + '_codes')[offsets[row]:offsets[row + 1]]
+
+    def list_values(self, name, row):
+        """Return the decoded values of a list column for one row."""
+        table = self.tables[name]
+        return [table[code] for code in self.list_codes(name, row)]
+
+    def text(self, name, row):
+        """Return the decoded value of a text column for one row."""
+        offsets = self.column(name + '_offsets')
+        blob = self.column(name)[offsets[row]:offsets[row + 1]]
+        return blob.tostring().decode('utf-8')
+
+    def date(self, name, row):
+        """Return a date column value in the 'YYYY-MM-DD' form of the JSON."""
+        value = str(self.column(name)[row])
+        return '' if value == 'NaT' else value
+
+    def award(self, row):
+        """Rebuild the award dict for one row, in the same layout as the
+        awards parsed from the JSON files.
+
+        :param int row: The row to read.
+        :rtype:  dict
+        :return: The award data.
+
+        """
+        return {
+            'awardID': self.column('award_id')[row].decode('ascii'),
+            'effectiveDate': self.date('effective', row),
+            'expirationDate': self.date('expiration', row),
+            'PIcoPI': self.list_values('pi', row),
+            'PO': self.list_values('po', row),
+            'fundingAgent': [agent_dict(agent)
+                             for agent in self.list_values('agent', row)],
+            'title': self.text('title', row),
+            'abstract': self.text('abstract', row)
+        }
+
+    def _list_range(self, name, start, stop):
+        offsets = self.column(name + '_offsets')[start:stop + 1].tolist()
+        base = offsets[0]
+        codes = self.column(name + '_codes')[base:offsets[-1]].tolist()
+        table = self.tables[name]
+        return [[table[code] for code in
+                 codes[offsets[i] - base:offsets[i + 1] - base]]
+                for i in xrange(stop - start)]
+
+    def _text_range(self, name, start, stop):
+        offsets = self.column(name + '_offsets')[start:stop + 1].tolist()
+        base = offsets[0]
+        text = self.column(name)[base:offsets[-1]].tostring()
+        return [text[offsets[i] - base:offsets[i + 1] - base].decode('utf-8')
+                for i in xrange(stop - start)]
+
+    def _date_range(self, name, start, stop):
+        return ['' if value == 'NaT' else value for value
+                in self.column(name)[start:stop].astype('S10').tolist()]
+
+    def award_range(self, start, stop):
+        """Rebuild the award dicts for a range of rows, decoding each column
+        of the range at once instead of row by row.
+
+        :param int start: The first row to read.
+        :param int stop: The row after the last to read.
+        :rtype:  list of dict
+        :return: The award data, in row order.
+
+        """
+        stop = min(stop, self.num_rows)
+        if start >= stop:
+            return []
+
+        award_ids = self.column('award_id')[start:stop].tolist()
+        effective = self._date_range('effective', start, stop)
+        expiration = self._date_range('expiration', start, stop)
+        pis = self._list_range('pi', start, stop)
+        pos = self._list_range('po', start, stop)
+        agents = self._list_range('agent', start, stop)
+        titles = self._text_range('title', start, stop)
+        abstracts = self._text_range('abstract', start, stop)
+        return [{
+            'awardID': award_ids[i].decode('ascii'),
+            'effectiveDate': effective[i],
+            'expirationDate': expiration[i],
+            'PIcoPI': pis[i],
+            'PO': pos[i],
+            'fundingAgent': [agent_dict(agent) for agent in agents[i]],
+            'title': titles[i],
+            'abstract': abstracts[i]
+        } for i in xrange(stop - start)]
+
+    def awards(self, rows=None, chunk_size=CHUNK_SIZE):
+        """Yield award dicts for the given rows, or for all rows in order.
+        Contiguous rows, such as all rows or those of a source file, are
+        decoded a chunk at a time; see L{award_range}.
+
+        :type  rows: iterable of int
+        :param rows: The rows to read; all rows by default.
+        :param int chunk_size: Number of contiguous rows decoded at once.
+        :rtype:  iterator yielding dict
+        :return: An iterator over the rebuilt award dicts.
+
+        """
+        if rows is None:
+            rows = xrange(self.num_rows)
+
+        contiguous = (isinstance(rows, xrange) and
+                      (len(rows) < 2 or rows[1] - rows[0] == 1))
+        if not contiguous:
+            for row in rows:
+                yield self.award(row)
+            return
+
+        if not len(rows):
+            return
+        for start in xrange(rows[0], rows[-1] + 1, chunk_size):
+            stop = min(start + chunk_size, rows[-1] + 1)
+            for award in self.award_range(start, stop):
+                yield award
+
+    __iter__ = awards
+
+
+def compile_store(documents, dirpath, flush_every=10000):
+    """Compile a new columnar store from an iterable of parsed documents.
+
+    :type  documents: iterable of (int, str, str, dict)
+    :param documents: Tuples of (source, filename, doc_id, award), where the
+        source is the yyyymm of the file the award was parsed from.
+    :param str dirpath: Directory to write the store to.
+    :param int flush_every: Number of rows to buffer between writes.
+    :rtype:  L{AwardStore}
+    :return: The store which was written, opened for reading.
+
+    """
+    with AwardStoreWriter(dirpath, flush_every) as writer:
+        for source, filename, doc_id, award in documents:
+            writer.append(doc_id, award, source, filename)
+    return AwardStore(dirpath)
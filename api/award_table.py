@@ -0,0 +1,165 @@
+"""
+This module contains the award table kept alongside the PI collaboration
+graph. An award with k PIs becomes k(k-1)/2 edges of the graph; copying its
+title, abstract, dates, PO, and funding agents onto each of those edges stores
+them over and over. Instead, every edge carries only the integer index of its
+award in the table (the 'award' edge attribute), and the award attributes are
+stored once per award, as columns::
+
+    table = AwardTable()
+    index = table.append({'awardID': '9596119', 'abstract': ..., ...})
+    g.add_edge(source, target, award=index)
+
+    table.edge_value(g.es[0], 'abstract')     # one attribute of one edge
+    table.resolve(g.es, 'title')              # one attribute of many edges
+    table.join(g, ['title', 'abstract'])      # copy onto the edges for export
+
+Besides the attributes copied onto edges before, the table keeps the PIs of
+each award and the month its data came from (as YYYYMM), so the awards of one
+month can be replaced when the month is revised; see
+L{parse.update_full_graph}.
+
+The table is pickled next to the graph; see L{data.load_award_table}.
+
+"""
+import cPickle as pickle
+
+
+# the award attributes the full graph used to copy onto each edge
+EDGE_COLUMNS = ('awardID', 'title', 'abstract', 'effectiveDate',
+                'expirationDate', 'PO', 'dir', 'div', 'pgm')
+
+COLUMNS = EDGE_COLUMNS + ('PIcoPI', 'source')
+
+# name of the edge attribute holding the index of the award
+EDGE_ATTRIBUTE = 'award'
+
+
+class AwardTable(object):
+    """Columns of award attributes, indexed by the 'award' edge attribute."""
+
+    def __init__(self, columns=None):
+        """
+        :param dict columns: Maps each attribute name to the list of its
+            values, one per award; empty columns for L{COLUMNS} by default.
+
+        """
+        if columns is None:
+            columns = {name: [] for name in COLUMNS}
+        self.columns = columns
+
+    def __len__(self):
+        return len(self.columns['awardID'])
+
+    def __str__(self):
+        return 'Table of {} awards with {} attributes.'.format(
+            len(self), len(self.columns))
+
+    def append(self, attributes):
+        """Add an award to the table.
+
+        :param dict attributes: Value of each column for the award; missing
+            columns get None.
+        :rtype:  int
+        :return: The index of the award, to store on its edges.
+
+        """
+        index = len(self)
+        for name, values in self.columns.iteritems():
+            values.append(attributes.get(name))
+        return index
+
+    def row(self, index):
+        """Return all attributes of an award.
+
+        :param int index: Index of the award.
+        :rtype:  dict
+        :raises IndexError: If there is no award with the index.
+
+        """
+        return {name: values[index]
+                for name, values in self.columns.iteritems()}
+
+    def value(self, index, name):
+        """Return one attribute of an award.
+
+        :param int index: Index of the award.
+        :param str name: Name of the attribute.
+        :raises KeyError: If there is no such attribute.
+
+        """
+        return self.columns[name][index]
+
+    def edge_value(self, edge, name):
+        """Return one attribute of the award of an edge.
+
+        :type  edge: L{igraph.Edge}
+        :param edge: An edge with an 'award' attribute.
+        :param str name: Name of the award attribute.
+
+        """
+        return self.columns[name][edge[EDGE_ATTRIBUTE]]
+
+    def resolve(self, edges, name):
+        """Return one attribute of the award of each edge.
+
+        :type  edges: L{igraph.EdgeSeq}
+        :param edges: Edges with an 'award' attribute.
+        :param str name: Name of the award attribute.
+        :rtype:  list
+        :return: The value for each edge, in the order of the edges.
+
+        """
+        values = self.columns[name]
+        if not len(edges):  # the attribute does not exist without edges
+            return []
+        return [values[index] for index in edges[EDGE_ATTRIBUTE]]
+
+    def join(self, graph, names=None):
+        """Copy award attributes onto the edges of a graph, for writers
+        which need them as edge attributes. This undoes the savings of the
+        table for the graph it is applied to, so apply it to the (sub)graph
+        being exported rather than to the full graph.
+
+        :type  graph: L{igraph.Graph}
+        :param graph: Graph whose edges have an 'award' attribute.
+        :param list names: Attributes to copy; those in L{EDGE_COLUMNS} by
+            default.
+        :rtype:  L{igraph.Graph}
+        :return: The graph, with the attributes set on its edges.
+
+        """
+        if names is None:
+            names = EDGE_COLUMNS
+        for name in names:
+            graph.es[name] = self.resolve(graph.es, name)
+        return graph
+
+    def sources(self):
+        """Return the sorted list of months (as YYYYMM) with awards in the
+        table.
+
+        """
+        return sorted(set(self.columns['source']))
+
+    def select(self, indices):
+        """Return a new table with only the given awards, in the given
+        order.
+
+        :param list indices: Indices of the awards to keep.
+        :rtype:  L{AwardTable}
+
+        """
+        return AwardTable({name: [values[i] for i in indices]
+                           for name, values in self.columns.iteritems()})
+
+    def save(self, path):
+        """Pickle the table to a file."""
+        with open(path, 'wb') as f:
+            pickle.dump(self.columns, f, pickle.HIGHEST_PROTOCOL)
+
+    @classmethod
+    def load(cls, path):
+        """Load a table pickled by L{save}."""
+        with open(path, 'rb') as f:
+            return cls(pickle.load(f))
@@ -1,6 +1,10 @@
 # coding: utf-8
 
+import os
+import logging
+
 import data
+import subgraph
 import abstracts
 
 
@@ -19,6 +23,19 @@ def write_graph_edges(graph, edges, fpath):
         f.write('\n'.join(
             [edge_to_string(graph, edge) for edge in edges]))
 
+def write_weighted_edges(incidence, pis, fpath):
+    """Write the pairs of the given PIs who share awards, with the number
+    of awards they share, from an L{incidence.Incidence}.
+
+    """
+    sources, targets, weights = incidence.edges(pis)
+    pi_ids = incidence.pi_ids
+    with open(fpath, 'w') as f:
+        f.write('\n'.join(
+            ['\t'.join((pi_ids[source], pi_ids[target], str(weight)))
+             for source, target, weight
+             in zip(sources.tolist(), targets.tolist(), weights.tolist())]))
+
 def get_pi_terms(bow_corpus, pi):
     return [tup[0] for tup in bow_corpus.pi_document(pi)]
 
@@ -53,21 +70,29 @@ def load_pi_list(fpath='cise-lcc-binary-membership-ids.txt'):
         return f.read().split()
 
 def filter_edges_to_pis(graph, pis):
-    edges = set()
-    for edge in graph.es:
-        pi1 = graph.vs[edge.source]['label']
-        pi2 = graph.vs[edge.target]['label']
-        if pi1 in pis and pi2 in pis:
-            edges.add(edge)
-    return edges
+    vertices = subgraph.vertex_ids(graph, pis)
+    edge_ids = subgraph.induced_edges(graph, vertices)
+    return graph.es.select(edge_ids.tolist())
 
 
-if __name__ == "__main__":
+def write_pi_graph_edges(fpath='pi-graph-edges.tsv', force=False):
+    pi_list_file = 'cise-lcc-binary-membership-ids.txt'
+    stage = 'cesna-writer:{}'.format(os.path.abspath(fpath))
+    inputs = [data.FULL_GRAPH_FILE, pi_list_file]
+    manifest = data.load_manifest()
+    if not force and manifest.is_current(stage, inputs):
+        logging.info("{} is up to date".format(fpath))
+        return
+
     graph = data.load_full_graph()
-    pis = load_pi_list()
+    pis = load_pi_list(pi_list_file)
     edges = filter_edges_to_pis(graph, pis)
+    write_graph_edges(graph, edges, fpath)
+    manifest.record(stage, inputs, [fpath])
 
-    write_graph_edges(graph, edges, 'pi-graph-edges.tsv')
+
+if __name__ == "__main__":
+    write_pi_graph_edges()
     #bow_corpus = abstracts.AbstractBoWs(parse=True)
     #write_all_pi_terms(pis, bow_corpus, 'repdoc-terms.tsv')
     #write_term_map(bow_corpus, 'term-map.tsv')
@@ -0,0 +1,415 @@
+"""
+This module contains a compact binary format for the PI collaboration graph.
+Unpickling the full graph rebuilds every igraph edge and its attributes, and
+parsing GraphML is slower still; this format stores the graph as flat arrays
+instead, which are memory-mapped on load, so opening a graph costs reading a
+small meta file and several processes can share one copy of the arrays
+through the page cache.
+
+Each array lives in its own binary file in the graph directory::
+
+    offsets.bin         adjacency offsets (num_vertices + 1 entries)
+    neighbors.bin       neighbor of each adjacency entry (2 per edge)
+    adj_edges.bin       edge id of each adjacency entry
+    edges.bin           (source, target) of each edge, in edge order
+    edge_awards.bin     index of each edge's award in the award table
+    label_offsets.bin   byte offsets into the label blob
+    labels.bin          vertex labels (PI ids), concatenated
+    award_id_offsets.bin, award_ids.bin
+                        award id of each edge, packed like the labels;
+                        optional, for graphs without an award table
+    meta.json           dtypes and counts
+
+The adjacency is stored CSR-style, so the neighbors of vertex v and the
+edges connecting them are::
+
+    neighbors[offsets[v]:offsets[v + 1]]
+    adj_edges[offsets[v]:offsets[v + 1]]
+
+Neighbors are sorted within each vertex. The edges keep their igraph order,
+so L{CSRGraph.to_igraph} recreates the graph the file was written from.
+
+"""
+import os
+
+try:
+    import ujson as json
+except ImportError:
+    import json
+
+import numpy as np
+import igraph
+
+
+OFFSET_DTYPE = 'int64'
+VERTEX_DTYPE = 'int32'
+EDGE_DTYPE = 'int32'
+BLOB_DTYPE = 'uint8'
+META_FILE = 'meta.json'
+
+DTYPES = {
+    'offsets': OFFSET_DTYPE,
+    'neighbors': VERTEX_DTYPE,
+    'adj_edges': EDGE_DTYPE,
+    'edges': VERTEX_DTYPE,
+    'edge_awards': EDGE_DTYPE,
+    'label_offsets': OFFSET_DTYPE,
+    'labels': BLOB_DTYPE,
+    'award_id_offsets': OFFSET_DTYPE,
+    'award_ids': BLOB_DTYPE
+}
+
+# edge award index of edges without an award
+NO_AWARD = -1
+
+# the only attributes the format keeps; see write_igraph
+VERTEX_ATTRIBUTES = ('name', 'label')
+EDGE_ATTRIBUTES = ('award', 'awardID', 'label')
+
+
+def csr_arrays(num_vertices, edges):
+    """Build the CSR adjacency of an undirected graph.
+
+    :param int num_vertices: Number of vertices.
+    :type  edges: L{numpy.ndarray}
+    :param edges: (num_edges, 2) array of edge endpoints.
+    :rtype:  tuple of L{numpy.ndarray}
+    :return: The offsets, neighbors, and adjacency edge ids.
+
+    """
+    edges = np.asarray(edges, dtype=VERTEX_DTYPE).reshape((-1, 2))
+    edge_ids = np.arange(len(edges), dtype=EDGE_DTYPE)
+    sources = np.concatenate([edges[:, 0], edges[:, 1]])
+    targets = np.concatenate([edges[:, 1], edges[:, 0]])
+    adj_edges = np.concatenate([edge_ids, edge_ids])
+
+    order = np.lexsort((targets, sources))
+    counts = np.bincount(sources, minlength=num_vertices)
+    offsets = np.zeros(num_vertices + 1, dtype=OFFSET_DTYPE)
+    np.cumsum(counts, out=offsets[1:])
+    return (offsets, targets[order], adj_edges[order])
+
+
+def encode_labels(labels):
+    """Pack labels into a blob and the offsets of each label within it.
+
+    :type  labels: list of str
+    :rtype:  tuple of L{numpy.ndarray}
+    :return: The offsets (one more than labels) and the blob.
+
+    """
+    encoded = [str(label) for label in labels]
+    offsets = np.zeros(len(encoded) + 1, dtype=OFFSET_DTYPE)
+    np.cumsum(np.array([len(label) for label in encoded], dtype=OFFSET_DTYPE),
+              out=offsets[1:])
+    text = ''.join(encoded)
+    blob = (np.frombuffer(text, dtype=BLOB_DTYPE) if text
+            else np.zeros(0, dtype=BLOB_DTYPE))
+    return (offsets, blob)
+
+
+def decode_labels(offsets, blob):
+    """Unpack the labels packed by L{encode_labels}."""
+    offsets = offsets.tolist()
+    text = blob.tostring()
+    return [text[offsets[i]:offsets[i + 1]]
+            for i in xrange(len(offsets) - 1)]
+
+
+def write_arrays(dirpath, arrays, dtypes, meta):
+    """Write arrays to a directory, one binary file each, followed by the
+    meta file which makes them readable.
+
+    :param str dirpath: Directory to write to; it is created if it does not
+        exist and existing files are overwritten.
+    :param dict arrays: Array by name.
+    :param dict dtypes: Dtype of each array, by name.
+    :param dict meta: Counts to store in the meta file, along with the dtypes.
+
+    """
+    if not os.path.isdir(dirpath):
+        os.makedirs(dirpath)
+
+    for name, array in arrays.iteritems():
+        path = os.path.join(dirpath, name + '.bin')
+        with open(path, 'wb') as f:
+            f.write(np.ascontiguousarray(array, dtype=dtypes[name]).tostring())
+
+    meta = dict(meta, dtypes=dtypes)
+    path = os.path.join(dirpath, META_FILE)
+    with open(path + '.tmp', 'w') as f:
+        json.dump(meta, f)
+    os.rename(path + '.tmp', path)
+
+
+def read_meta(dirpath):
+    """Read the meta file written by L{write_arrays}.
+
+    :raises IOError: If there is no meta file in the directory.
+
+    """
+    meta_path = os.path.join(dirpath, META_FILE)
+    if not os.path.isfile(meta_path):
+        raise IOError('no CSR arrays in {}'.format(dirpath))
+    with open(meta_path) as f:
+        return json.load(f)
+
+
+def map_array(dirpath, name, dtype):
+    """Memory-map one of the arrays written by L{write_arrays}, read-only."""
+    dtype = np.dtype(dtype)
+    path = os.path.join(dirpath, name + '.bin')
+    if os.path.getsize(path) == 0:  # mmap refuses empty files
+        return np.zeros(0, dtype=dtype)
+    return np.memmap(path, dtype=dtype, mode='r')
+
+
+def write_graph(dirpath, labels, edges, edge_awards=None,
+                edge_award_ids=None):
+    """Write a graph to a directory in the CSR format.
+
+    :param str dirpath: Directory to write to; it is created if it does not
+        exist and existing graph files are overwritten.
+    :type  labels: list of str
+    :param labels: The label of each vertex.
+    :type  edges: list of tuple of (int, int)
+    :param edges: The endpoints of each edge, as vertex ids.
+    :type  edge_awards: list of int
+    :param edge_awards: The index of each edge's award in the award table;
+        L{NO_AWARD} for all edges by default.
+    :type  edge_award_ids: list of str
+    :param edge_award_ids: The award id of each edge, to store with the
+        graph; not stored by default.
+
+    """
+    edges = np.asarray(edges, dtype=VERTEX_DTYPE).reshape((-1, 2))
+    if edge_awards is None:
+        edge_awards = np.empty(len(edges), dtype=EDGE_DTYPE)
+        edge_awards.fill(NO_AWARD)
+    offsets, neighbors, adj_edges = csr_arrays(len(labels), edges)
+    label_offsets, blob = encode_labels(labels)
+
+    arrays = {
+        'offsets': offsets,
+        'neighbors': neighbors,
+        'adj_edges': adj_edges,
+        'edges': edges,
+        'edge_awards': edge_awards,
+        'label_offsets': label_offsets,
+        'labels': blob
+    }
+    if edge_award_ids is not None:
+        arrays['award_id_offsets'], arrays['award_ids'] = \
+            encode_labels(edge_award_ids)
+    dtypes = {name: DTYPES[name] for name in arrays}
+    write_arrays(dirpath, arrays, dtypes, {'num_vertices': len(labels),
+                                           'num_edges': len(edges)})
+
+
+def check_attributes(graph, award_ids=True):
+    """Check that L{CSRGraph.to_igraph} can restore every attribute of a
+    graph from its CSR copy: vertices may only have a 'name' and a 'label'
+    equal to it, and edges an 'award' index, an 'awardID' and a 'label'
+    equal to it. Without I{award_ids}, an 'awardID' is only restored
+    through the award table, so the edges need their 'award' as well.
+
+    :type  graph: L{igraph.Graph}
+    :param bool award_ids: Whether the award ids are stored.
+    :raises ValueError: If an attribute would be lost.
+
+    """
+    lost = []
+    vertex_attributes = graph.vs.attributes() if graph.vcount() else []
+    lost.extend('vertex ' + name for name in vertex_attributes
+                if name not in VERTEX_ATTRIBUTES)
+    if 'label' in vertex_attributes and (
+            'name' not in vertex_attributes or
+            graph.vs['label'] != graph.vs['name']):
+        lost.append('vertex label')
+
+    edge_attributes = graph.es.attributes() if graph.ecount() else []
+    lost.extend('edge ' + name for name in edge_attributes
+                if name not in EDGE_ATTRIBUTES)
+    if 'label' in edge_attributes and (
+            'awardID' not in edge_attributes or
+            graph.es['label'] != graph.es['awardID']):
+        lost.append('edge label')
+    if ('awardID' in edge_attributes and not award_ids and
+            'award' not in edge_attributes):
+        lost.append('edge awardID')
+
+    if lost:
+        raise ValueError('the CSR format cannot store the {} attributes'
+                         .format(', '.join(lost)))
+
+
+def write_igraph(graph, dirpath, award_ids=True):
+    """Write an igraph Graph to a directory in the CSR format. Vertex labels
+    come from the 'name' attribute, edge award indices from the 'award'
+    attribute if the graph has one (see L{award_table}), and edge award ids
+    from the 'awardID' attribute. Graphs with other attributes, such as the
+    weighted simple graph, are refused; see L{check_attributes}.
+
+    :type  graph: L{igraph.Graph}
+    :param graph: The graph to write.
+    :param str dirpath: Directory to write to.
+    :param bool award_ids: If False, do not store the award ids, e.g.
+        because they are looked up in the award table.
+    :raises ValueError: If the graph has attributes the format would lose.
+
+    """
+    check_attributes(graph, award_ids)
+    labels = graph.vs['name'] if graph.vcount() else []
+    edge_awards = None
+    edge_award_ids = None
+    if graph.ecount():
+        attributes = graph.es.attributes()
+        if 'award' in attributes:
+            edge_awards = graph.es['award']
+        if award_ids and 'awardID' in attributes:
+            edge_award_ids = graph.es['awardID']
+    write_graph(dirpath, labels, graph.get_edgelist(), edge_awards,
+                edge_award_ids)
+
+
+class CSRGraph(object):
+    """Read a graph back from the memory-mapped arrays of a graph directory
+    written by L{write_graph}.
+
+    Arrays are mapped lazily on first access, so opening a graph only costs
+    reading its meta file.
+
+    """
+
+    def __init__(self, dirpath):
+        """
+        :param str dirpath: Directory the graph was written to.
+        :raises IOError: If there is no graph in the directory.
+
+        """
+        self.dirpath = dirpath
+        meta = read_meta(dirpath)
+        self.num_vertices = meta['num_vertices']
+        self.num_edges = meta['num_edges']
+        self.dtypes = meta['dtypes']
+        self._arrays = {}
+        self._vertex_ids = None
+
+    def __str__(self):
+        msg = 'CSR graph of {} vertices and {} edges.'
+        return msg.format(self.num_vertices, self.num_edges)
+
+    def vcount(self):
+        return self.num_vertices
+
+    def ecount(self):
+        return self.num_edges
+
+    def array(self, name):
+        """Return one of the memory-mapped arrays of the graph.
+
+        :param str name: Name of the array; see the module docstring.
+        :rtype:  L{numpy.ndarray}
+        :return: The read-only array.
+        :raises KeyError: If there is no such array.
+
+        """
+        try:
+            return self._arrays[name]
+        except KeyError:
+            array = map_array(self.dirpath, name, self.dtypes[name])
+            if name == 'edges':
+                array = array.reshape((-1, 2))
+            self._arrays[name] = array
+            return array
+
+    def label(self, vertex):
+        """Return the label (PI id) of a vertex."""
+        offsets = self.array('label_offsets')
+        blob = self.array('labels')
+        return blob[offsets[vertex]:offsets[vertex + 1]].tostring()
+
+    def labels(self):
+        """Return the labels of all vertices, in vertex order."""
+        return decode_labels(self.array('label_offsets'),
+                             self.array('labels'))
+
+    def vertex_id(self, label):
+        """Return the id of the vertex with a label.
+
+        :raises KeyError: If no vertex has the label.
+
+        """
+        if self._vertex_ids is None:
+            self._vertex_ids = {label: vertex for vertex, label
+                                in enumerate(self.labels())}
+        return self._vertex_ids[str(label)]
+
+    def degrees(self):
+        """Return the degree of every vertex, counting parallel edges."""
+        return np.diff(self.array('offsets'))
+
+    def neighbors(self, vertex):
+        """Return the sorted neighbors of a vertex, once per edge."""
+        offsets = self.array('offsets')
+        return self.array('neighbors')[offsets[vertex]:offsets[vertex + 1]]
+
+    def incident(self, vertex):
+        """Return the ids of the edges of a vertex, ordered as its
+        L{neighbors}.
+
+        """
+        offsets = self.array('offsets')
+        return self.array('adj_edges')[offsets[vertex]:offsets[vertex + 1]]
+
+    def edge_awards(self, edges=None):
+        """Return the award table index of the given edges, all by
+        default; see L{award_table}.
+
+        """
+        awards = self.array('edge_awards')
+        return awards if edges is None else awards[edges]
+
+    def edge_award_ids(self):
+        """Return the award ids stored with the edges, in edge order, or
+        None if they were not stored; see L{write_graph}.
+
+        """
+        if 'award_ids' not in self.dtypes:
+            return None
+        return decode_labels(self.array('award_id_offsets'),
+                             self.array('award_ids'))
+
+    def to_igraph(self, award_ids=None):
+        """Create an igraph Graph with the same vertices and edges, in the
+        same order. Vertices get 'name' and 'label' attributes; edges get
+        their 'award' index if they were written with one, and their
+        'awardID' and 'label' if award ids are given or were stored with
+        the graph.
+
+        :type  award_ids: list of str
+        :param award_ids: The award id of each award table index, e.g. the
+            'awardID' column of the L{award_table.AwardTable}; overrides
+            the stored award ids.
+        :rtype:  L{igraph.Graph}
+
+        """
+        labels = self.labels()
+        edge_attrs = {}
+        if self.num_edges:
+            awards = self.array('edge_awards')
+            if (awards != NO_AWARD).any():
+                edge_attrs['award'] = awards.tolist()
+            awards = awards.tolist()
+            if award_ids is not None:
+                edge_attrs['awardID'] = [award_ids[i] for i in awards]
+            else:
+                stored = self.edge_award_ids()
+                if stored is not None:
+                    edge_attrs['awardID'] = stored
+            if 'awardID' in edge_attrs:
+                edge_attrs['label'] = edge_attrs['awardID']
+        return igraph.Graph(
+            n=self.num_vertices, edges=self.array('edges').tolist(),
+            vertex_attrs={'name': labels, 'label': list(labels)},
+            edge_attrs=edge_attrs)
@@ -5,7 +5,10 @@ with retrieving the files of interest to a particular analysis.
 
 """
 import os
+import shutil
 import logging
+import collections
+import multiprocessing
 import cPickle as pickle
 
 try:
@@ -18,6 +21,16 @@ except ImportError:
 import gensim
 import igraph
 
+import award_store
+import award_index
+import award_db
+import award_table
+import csr_graph
+import json_stream
+import date_index
+import manifest
+import nsf_xml
+
 
 # -----------------------------------------------------------------------------
 # MODULE SETUP
@@ -27,21 +40,78 @@ DATA_DIR = os.path.join(PROJECT_DIR, 'data')
 JSON_DIR = os.path.join(DATA_DIR, 'json')
 GRAPH_SAVE_DIR = os.path.join(DATA_DIR, 'pi-award-graphs')
 PICKLE_DIR = os.path.join(DATA_DIR, 'pickle')
+COLUMNAR_DIR = os.path.join(DATA_DIR, 'columnar')
+NSF_XML_DIR = os.path.join(DATA_DIR, 'nsf-xml')
+CSV_DIR = os.path.join(DATA_DIR, 'csv')
 BOW_DIR = os.path.join(DATA_DIR, 'bow')
 WORDLE_DIR = os.path.join(DATA_DIR, 'wordle')
 STOPWORDS_FILE = os.path.join(PROJECT_DIR, 'api/stopwords.txt')
+AWARD_INDEX_FILE = os.path.join(PICKLE_DIR, 'award-index-{backend}.pickle')
+DATE_INDEX_FILE = os.path.join(PICKLE_DIR, 'date-index-{backend}.npz')
+FULL_GRAPH_FILE = os.path.join(PICKLE_DIR, 'dir05-graph.pickle')
+AWARD_TABLE_FILE = os.path.join(PICKLE_DIR, 'dir05-award-table.pickle')
+FULL_GRAPH_CSR_DIR = os.path.join(DATA_DIR, 'csr', 'dir05-graph')
+BOW_DICTIONARY_FILE = os.path.join(PICKLE_DIR, 'abstracts-dictionary.pickle')
+TFIDF_FILE = os.path.join(PICKLE_DIR, 'abstracts-tfidf.pickle')
+AWARD_DB_FILE = os.path.join(DATA_DIR, 'awards-{backend}.sqlite')
+MANIFEST_FILE = os.path.join(DATA_DIR, 'manifest.json')
+
+
+BACKENDS = ('json', 'columnar')
+
+# backend used when none is passed to DataDirectory; setting this to
+# 'columnar' switches every parsing entry point over to the compiled store
+DEFAULT_BACKEND = 'json'
 
 
 class DataDirectory(object):
     """Enable easy access to the JSON data directory."""
 
-    def __init__(self):
+    def __init__(self, backend=None, stream=False):
         """
         Parse data directory for list of JSON files.
         This is designed to set up the global variables in this module.
 
+        With the 'columnar' backend, awards are read from the store
+        compiled by L{compile_award_store} instead of the JSON files.
+        The available years and months are then those in the store.
+
+        @type  backend: str
+        @param backend: One of 'json' or 'columnar'; defaults to
+            L{DEFAULT_BACKEND}.
+
+        With I{stream} set, each JSON file is decoded incrementally
+        and awards are yielded as their objects complete, so peak
+        memory is bounded by a single award rather than by the
+        largest file. See L{json_stream}.
+
+        @type  stream: bool
+        @param stream: Whether to decode JSON files incrementally.
+
+        @raise ValueError: If the backend is not a valid option.
+        @raise IOError: If the columnar backend is requested but no
+            store has been compiled.
+
         """
+        if backend is None:
+            backend = DEFAULT_BACKEND
+        if backend not in BACKENDS:
+            raise ValueError('backend must be one of {}'.format(BACKENDS))
+
+        self.backend = backend
+        self.stream = stream
         self.json_files = {}
+        self._award_index = None
+        self._date_index = None
+        if backend == 'columnar':
+            self.store = award_store.AwardStore(COLUMNAR_DIR)
+            for source, _, _, filename in self.store.sources:
+                year, month = divmod(source, 100)
+                path = os.path.join(JSON_DIR, filename)
+                self.json_files.setdefault(year, {})[month] = path
+            return
+
+        self.store = None
         for filename in os.listdir(JSON_DIR):
             path = os.path.join(JSON_DIR, filename)
             if os.path.isfile(path) and path.endswith('.json'):
@@ -156,9 +226,322 @@ class DataDirectory(object):
         with open(filepath) as json_file:
             return json.load(json_file)
 
-    def awards(self, year_start=1995, year_end=2014, month_start=1,
+    def file_awards(self, year, month):
+        """
+        A generator that yields each award for a single year/month,
+        reading from the backend this directory was opened with.
+
+        @type  year: int
+        @param year: The year of the file to read.
+
+        @type  month: int
+        @param month: The month of the file to read.
+
+        @rtype:  iterator yielding dict
+        @return: An iterator which yields the award dictionaries for
+            that month; empty if there is no data for it.
+
+        """
+        logging.info("Parsing file {}".format(
+            self.get_filepaths(year, month)))
+        if self.backend == 'columnar':
+            rows = self.store.source_rows(year * 100 + month)
+            for award in self.store.awards(rows):
+                yield award
+        else:
+            filepath = self.get_filepaths(year, month)
+            if not filepath:
+                return
+
+            if self.stream:
+                for _, award in json_stream.stream_json(filepath):
+                    yield award
+                return
+
+            json_data = self.load_json(filepath)
+            for doc_id in json_data:
+                yield json_data[doc_id]
+
+    def all_awards(self):
+        """
+        A generator that yields every award of this directory: those
+        of all the files L{input_files} lists, chronologically, or
+        all rows of the compiled store. Unlike L{awards}, it is not
+        limited to a range of years, so it covers exactly the inputs
+        that derived artifacts are tracked against.
+
+        @rtype:  iterator yielding dict
+        @return: An iterator which yields every award dictionary.
+
+        """
+        if self.backend == 'columnar':
+            for award in self.store.awards():
+                yield award
+            return
+
+        for year in sorted(self.available_years()):
+            for month in sorted(self.available_months(year)):
+                for award in self.file_awards(year, month):
+                    yield award
+
+    def column(self, name):
+        """
+        Return one column of the compiled award store as an array,
+        without building award dictionaries. See L{award_store} for
+        the available column names.
+
+        @type  name: str
+        @param name: The name of the column.
+
+        @rtype:  L{numpy.ndarray}
+        @return: The memory-mapped column array.
+
+        @raise ValueError: If the directory uses the JSON backend.
+        @raise KeyError: If there is no such column.
+
+        """
+        if self.store is None:
+            raise ValueError('column access requires the columnar backend')
+        return self.store.column(name)
+
+    def input_files(self):
+        """
+        Return the paths of the files this directory reads awards
+        from: the JSON files, or the column files of the compiled
+        store for the columnar backend. These are the inputs that
+        derived artifacts are tracked against in the manifest.
+
+        @rtype:  list of str
+        @return: A sorted list of absolute file paths.
+
+        """
+        if self.backend == 'columnar':
+            dirpath = self.store.dirpath
+            return sorted(os.path.join(dirpath, name)
+                          for name in os.listdir(dirpath))
+        return sorted(self.file_list())
+
+    def award_index(self, rebuild=False):
+        """
+        Return the index of award locations for this directory's
+        backend. The index is loaded from its pickle file if one has
+        been saved; otherwise it is built by scanning the data once
+        and saved for later sessions.
+
+        The manifest is consulted on load. For the JSON backend,
+        only files which were added, changed, or removed since the
+        index was saved are re-indexed, and the saved index is
+        patched in place; the columnar index is rebuilt whenever
+        the store changes.
+
+        @type  rebuild: bool
+        @param rebuild: If True, rebuild and save the index even if
+            a saved one exists.
+
+        @rtype:  L{award_index.AwardIndex}
+        @return: The award index.
+
+        """
+        if self._award_index is not None and not rebuild:
+            return self._award_index
+
+        path = AWARD_INDEX_FILE.format(backend=self.backend)
+        stage = 'award-index-{}'.format(self.backend)
+        inputs = self.input_files()
+        tracked = load_manifest()
+        changed, removed = tracked.changes(stage, inputs)
+
+        if os.path.isfile(path) and not rebuild and not (changed or removed):
+            index = award_index.AwardIndex.load(path)
+        elif (os.path.isfile(path) and not rebuild and
+                self.backend == 'json' and stage in tracked.stages):
+            logging.info("Patching award index for {} files: {}".format(
+                len(changed) + len(removed), path))
+            index = award_index.AwardIndex.load(path)
+            index.remove_files(
+                os.path.basename(filepath) for filepath in changed + removed)
+            for filepath in changed:
+                index.index_file(filepath)
+            index.save(path)
+            tracked.record(stage, inputs, [path])
+        else:
+            logging.info("Building award index: {}".format(path))
+            if self.backend == 'columnar':
+                index = award_index.AwardIndex.build_columnar(self.store)
+            else:
+                index = award_index.AwardIndex.build_json(self.file_list())
+            index.save(path)
+            tracked.record(stage, inputs, [path])
+
+        self._award_index = index
+        return index
+
+    def get_award(self, award_id):
+        """
+        Retrieve a single award by its award id, reading only that
+        award's data through the award index.
+
+        @type  award_id: str or int
+        @param award_id: The id of the award to retrieve.
+
+        @rtype:  dict
+        @return: The award dictionary.
+
+        @raise KeyError: If there is no award with that id.
+
+        """
+        location = self.award_index().location(award_id)
+        if self.backend == 'columnar':
+            return self.store.award(location)
+
+        filename, offset, length = location
+        filepath = os.path.join(JSON_DIR, filename)
+        return award_index.read_award(filepath, offset, length)
+
+    def get_doc(self, doc_id):
+        """
+        Retrieve a single award by the id of the document it is
+        keyed by in the JSON files.
+
+        @type  doc_id: str or int
+        @param doc_id: The id of the document to retrieve.
+
+        @rtype:  dict
+        @return: The award dictionary.
+
+        @raise KeyError: If there is no document with that id.
+
+        """
+        return self.get_award(self.award_index().award_id(doc_id))
+
+    def date_index(self, rebuild=False):
+        """
+        Return the index of award effective and expiration dates.
+        Like L{award_index}, it is loaded from its saved file if
+        there is one, otherwise built once and saved from all the
+        awards of the directory (see L{all_awards}). It is rebuilt
+        when the manifest shows that the data has changed.
+
+        @type  rebuild: bool
+        @param rebuild: If True, rebuild and save the index even if
+            a saved one exists.
+
+        @rtype:  L{date_index.DateIndex}
+        @return: The date index.
+
+        """
+        if self._date_index is not None and not rebuild:
+            return self._date_index
+
+        path = DATE_INDEX_FILE.format(backend=self.backend)
+        stage = 'date-index-{}'.format(self.backend)
+        inputs = self.input_files()
+        params = {'version': date_index.FORMAT_VERSION}
+        tracked = load_manifest()
+        if not rebuild and tracked.is_current(stage, inputs, params):
+            index = date_index.DateIndex.load(path)
+        else:
+            logging.info("Building date index: {}".format(path))
+            if self.backend == 'columnar':
+                index = date_index.DateIndex(
+                    self.column('award_id'), self.column('effective'),
+                    self.column('expiration'))
+            else:
+                index = date_index.DateIndex.from_awards(self.all_awards())
+            index.save(path)
+            tracked.record(stage, inputs, [path], params)
+
+        self._date_index = index
+        return index
+
+    def award_db(self, rebuild=False):
+        """
+        Return the SQLite award database for this directory's
+        backend, which also holds the PI names and affiliations from
+        the CSV directory. Like L{date_index}, it is opened from its
+        saved file if the manifest shows that neither the data nor
+        the CSV files changed since it was written, and rebuilt
+        from all the awards of the directory otherwise (see
+        L{all_awards}). See L{award_db} for the tables and queries.
+
+        @type  rebuild: bool
+        @param rebuild: If True, rebuild the database even if a
+            saved one is current.
+
+        @rtype:  L{award_db.AwardDatabase}
+        @return: The award database.
+
+        """
+        path = AWARD_DB_FILE.format(backend=self.backend)
+        stage = 'award-db-{}'.format(self.backend)
+        csv_files = [os.path.join(CSV_DIR, filename)
+                     for filename, _, _ in award_db.CSV_TABLES]
+        inputs = self.input_files() + [
+            filepath for filepath in csv_files if os.path.isfile(filepath)]
+        tracked = load_manifest()
+        if not rebuild and tracked.is_current(stage, inputs):
+            return award_db.AwardDatabase(path)
+
+        logging.info("Building award database: {}".format(path))
+        database = award_db.build_database(
+            path, self.all_awards(), CSV_DIR)
+        tracked.record(stage, inputs, [path])
+        return database
+
+    def awards_active(self, start, end):
+        """
+        A generator that yields every award active at any point
+        between two dates (inclusive): those with an effectiveDate
+        no later than the end and an expirationDate no earlier than
+        the start. Matching awards are found through the date index
+        and read individually through the award index, so only
+        matching records are touched. Awards are yielded in order of
+        effective date.
+
+        @type  start: str or L{datetime.date}
+        @param start: First day of the range, e.g. '1999-01-01'.
+
+        @type  end: str or L{datetime.date}
+        @param end: Last day of the range, e.g. '1999-12-31'.
+
+        @rtype:  iterator yielding dict
+        @return: An iterator which yields the matching awards.
+
+        """
+        for award_id in self.date_index().active(start, end):
+            yield self.get_award(award_id)
+
+    def selected_files(self, year_start=1995, year_end=2014, month_start=1,
         month_end=12, file_limit=None):
         """
+        A generator that yields the year, month, and path of each data
+        file selected by the filtering parameters of L{awards}, in
+        chronological order.
+
+        @rtype:  iterator yielding tuple of (int, int, str)
+        @return: An iterator which yields (year, month, filepath)
+            for each file to be parsed.
+
+        """
+        years = range(year_start, year_end + 1)
+        months = range(month_start, month_end + 1)
+
+        files_selected = 0
+        for year in years:
+            for month in months:
+                filepath = self.get_filepaths(year, month)
+                if not filepath:  # no data for this month; skip it
+                    continue
+
+                yield (year, month, filepath)
+
+                files_selected += 1
+                if file_limit is not None and files_selected > file_limit:
+                    break
+
+    def awards(self, year_start=1995, year_end=2014, month_start=1,
+        month_end=12, file_limit=None, workers=None, prefetch=None):
+        """
         A generator that parses each JSON file and yields each
         subsequent chunk of award data. The list of JSON files are
         filtered by year and month, allowing for a possible range of
@@ -179,6 +562,19 @@ class DataDirectory(object):
         year. This function does not allow you to pick different
         months for each year in the range.
 
+        With I{workers} greater than 1, the JSON files are decoded
+        in a pool of that many processes. Awards are still yielded
+        in chronological order, and at most I{prefetch} decoded
+        files are held in memory ahead of the one being consumed.
+        The columnar backend ignores this option, since there is no
+        decoding left to spread across processes, and so does the
+        I{stream} option of the directory: each worker decodes a
+        whole file. Files are decoded sequentially by default:
+        pickling the awards back from the workers costs more than
+        the decoding saved on the full dataset (2.2s with 4 workers
+        against 0.66s sequentially), so a pool only pays off when
+        the consumer does enough work per award to overlap with.
+
         @type  year_start: int
         @param year_start: First year in range to parse.
 
@@ -191,29 +587,34 @@ class DataDirectory(object):
         @type  month_end: int
         @param month_end: Last month in range to parse.
 
+        @type  workers: int
+        @param workers: Number of processes to decode files with.
+
+        @type  prefetch: int
+        @param prefetch: Maximum number of files decoded ahead of
+            the consumer; defaults to the number of workers.
+
         @rtype:  iterator yielding dict
         @return: An iterator which yields award dictionaries parsed
             from the raw JSON files.
 
         """
-        years = range(year_start, year_end + 1)
-        months = range(month_start, month_end + 1)
-
-        files_parsed = 0
-        for year in years:
-            for month in months:
-                filepath = self.get_filepaths(year, month)
-                if not filepath:
-                    break
+        files = self.selected_files(
+            year_start, year_end, month_start, month_end, file_limit)
 
-                logging.info("Parsing file {}".format(filepath))
-                json_data = self.load_json(filepath)
-                for doc_id in json_data:
-                    yield json_data[doc_id]
+        if workers and workers > 1 and self.backend == 'json':
+            per_file = _parallel_file_awards(
+                (filepath for _, _, filepath in files),
+                workers, prefetch or workers)
+        else:
+            per_file = (self.file_awards(year, month)
+                        for year, month, _ in files)
 
-                files_parsed += 1
-                if file_limit is not None and (files_parsed) > file_limit:
-                    break
+        files_parsed = 0
+        for file_awards in per_file:
+            for award in file_awards:
+                yield award
+            files_parsed += 1
 
         logging.info("Number of files parsed: {}".format(files_parsed))
 
@@ -249,10 +650,122 @@ def load_json(filepath):
         return json.load(json_file)
 
 
-def save_graph(graph, filename):
+def _load_file_awards(filepath):
+    """Decode one JSON file into its list of awards; run in worker
+    processes by L{_parallel_file_awards}.
+
+    """
+    logging.info("Parsing file {}".format(filepath))
+    return load_json(filepath).values()
+
+
+def _parallel_file_awards(filepaths, workers, prefetch):
+    """
+    A generator that decodes JSON files in a process pool and yields
+    the list of awards for each file, in the order the paths are
+    given. No more than I{prefetch} files are submitted ahead of the
+    one being yielded, which bounds the memory held by decoded
+    results that have not been consumed yet.
+
+    @type  filepaths: iterable of str
+    @param filepaths: Paths of the JSON files to decode, in order.
+
+    @type  workers: int
+    @param workers: Number of worker processes.
+
+    @type  prefetch: int
+    @param prefetch: Maximum number of files decoded ahead.
+
+    @rtype:  iterator yielding list of dict
+    @return: An iterator which yields the awards of each file.
+
+    """
+    pool = multiprocessing.Pool(workers)
+    pending = collections.deque()
+    try:
+        for filepath in filepaths:
+            pending.append(pool.apply_async(_load_file_awards, (filepath,)))
+            if len(pending) > prefetch:
+                yield pending.popleft().get()
+
+        while pending:
+            yield pending.popleft().get()
+    finally:
+        # also reached if the consumer stops early
+        pool.terminate()
+        pool.join()
+
+
+def load_manifest():
+    """
+    Load the manifest of derived-artifact stages for the data
+    directory. See L{manifest} for details.
+
+    @rtype:  L{manifest.Manifest}
+    @return: The manifest; empty if none has been saved yet.
+
+    """
+    return manifest.Manifest(MANIFEST_FILE, root=DATA_DIR)
+
+
+def compile_award_store(dirpath=COLUMNAR_DIR):
+    """
+    Compile all JSON data files into the columnar award store read by
+    the 'columnar' backend of L{DataDirectory}. Files are read
+    chronologically and decoded incrementally, one award at a time.
+
+    @type  dirpath: str
+    @param dirpath: The directory to write the store to.
+
+    @rtype:  L{award_store.AwardStore}
+    @return: The compiled store, opened for reading.
+
+    """
+    data_directory = DataDirectory()
+
+    def documents():
+        for year in sorted(data_directory.available_years()):
+            for month in sorted(data_directory.available_months(year)):
+                filepath = data_directory.get_filepaths(year, month)
+                logging.info("Compiling file {}".format(filepath))
+                filename = os.path.basename(filepath)
+                for doc_id, award in json_stream.stream_json(filepath):
+                    yield (year * 100 + month, filename, doc_id, award)
+
+    return award_store.compile_store(documents(), dirpath)
+
+
+def compile_xml_store(zip_paths, dirpath=NSF_XML_DIR, workers=None):
+    """
+    Compile yearly NSF XML archives, as downloaded by
+    db/get_nsf_data.py, into a columnar award store. See L{nsf_xml}
+    for how the XML awards map onto the JSON layout. The PI and PO
+    ids of the XML awards are derived from emails and names and do
+    not match the numeric ids of the JSON data, so the store is kept
+    apart from the one the 'columnar' backend of L{DataDirectory}
+    reads.
+
+    @type  zip_paths: iterable of str
+    @param zip_paths: Paths of the <year>.zip archives.
+
+    @type  dirpath: str
+    @param dirpath: The directory to write the store to.
+
+    @type  workers: int
+    @param workers: Number of processes to parse awards with.
+
+    @rtype:  L{award_store.AwardStore}
+    @return: The compiled store, opened for reading.
+
+    """
+    return nsf_xml.compile_xml_store(zip_paths, dirpath, workers)
+
+
+def save_graph(graph, filename, fmt='graphml'):
     """
     Save the graph to the appropriate data directory using
-    GraphML format.
+    GraphML format. Saving as GraphML removes a CSR copy saved
+    under the same name before, so the two cannot disagree.
 
     @type  graph: L{igraph.Graph}
     @param graph: The graph instance to be saved.
@@ -260,7 +773,23 @@ def save_graph(graph, filename):
     @type  filename: str
     @param filename: The name of the file to save the graph to.
 
+    @type  fmt: str
+    @param fmt: Either 'graphml', or 'csr' to save the graph as a
+        directory of binary arrays instead, keeping only the vertex
+        names and edge award ids; see L{csr_graph}.
+
+    @raise ValueError: If the graph is saved as CSR but has
+        attributes that format cannot store; see
+        L{csr_graph.check_attributes}.
+
     """
+    csr_dir = os.path.join(GRAPH_SAVE_DIR, filename + '.csr')
+    if fmt == 'csr':
+        csr_graph.write_igraph(graph, csr_dir)
+        return
+
+    if os.path.isdir(csr_dir):
+        shutil.rmtree(csr_dir)
     with_extension = filename + '.graphml'
     graph_file = os.path.join(GRAPH_SAVE_DIR, with_extension)
     with open(graph_file, 'w') as f:
@@ -269,17 +798,27 @@ def save_graph(graph, filename):
         graph.save(f, format='graphml')
 
 
-def load_graph(filename):
+def load_graph(filename, fmt='graphml'):
     """
-    Load a graph from its saved GraphML file.
+    Load a graph from its saved GraphML file, or from its CSR
+    directory, which is much faster, if it was saved in that
+    format; see L{save_graph}.
 
     @type  filename: str
     @param filename: The name of the file to load the graph from.
 
+    @type  fmt: str
+    @param fmt: Either 'graphml', or 'csr' to load the graph from
+        its directory of binary arrays.
+
     @rtype:  L{igraph.Graph}
     @return: The graph instance loaded from the file.
 
     """
+    if fmt == 'csr':
+        csr_dir = os.path.join(GRAPH_SAVE_DIR, filename + '.csr')
+        return csr_graph.CSRGraph(csr_dir).to_igraph()
+
     with_extension = filename + '.graphml'
     graph_file = os.path.join(GRAPH_SAVE_DIR, with_extension)
     with open(graph_file, 'r') as f:
@@ -288,27 +827,75 @@ def load_graph(filename):
 
 def load_full_graph():
     """
-    Load the complete directorate 5 data graph from its pickle file.
+    Load the complete directorate 5 data graph. It is created from
+    the memory-mapped arrays of its CSR copy, with the awardID of
+    each edge looked up in the award table, if that copy exists;
+    otherwise it is unpickled.
 
     @rtype:   L{igraph.Graph}
     @return: The graph for all directorate 5 data, with vertices
         for each PI and an edge for each shared awardID.
 
     """
-    graph_path = os.path.join(PICKLE_DIR, 'dir05-graph.pickle')
-    return igraph.load(graph_path)
+    if os.path.isfile(os.path.join(FULL_GRAPH_CSR_DIR, csr_graph.META_FILE)):
+        award_ids = load_award_table().columns['awardID']
+        return load_full_csr_graph().to_igraph(award_ids)
+    return igraph.load(FULL_GRAPH_FILE)
+
+
+def load_full_csr_graph():
+    """
+    Open the CSR copy of the full directorate 05 graph, without
+    creating an igraph Graph. Its arrays are memory-mapped, so this
+    takes milliseconds, and processes which open it share the same
+    pages. See L{csr_graph} for the format.
+
+    @rtype:  L{csr_graph.CSRGraph}
+    @return: The graph's arrays.
+
+    @raise IOError: If the CSR copy has not been saved.
+
+    """
+    return csr_graph.CSRGraph(FULL_GRAPH_CSR_DIR)
 
 
 def save_full_graph(g):
     """
-    Save the full directorate 05 graph to a pickle file.
+    Save the full directorate 05 graph to a pickle file, and its
+    vertices, edges, and edge award indices as a CSR copy for
+    L{load_full_csr_graph}.
 
     @type  g: L{igraph.Graph}
     @param g: The graph instance to save
 
     """
-    graph_path = os.path.join(PICKLE_DIR, 'dir05-graph.pickle')
-    g.write_pickle(graph_path)
+    g.write_pickle(FULL_GRAPH_FILE)
+    csr_graph.write_igraph(g, FULL_GRAPH_CSR_DIR, award_ids=False)
+
+
+def load_award_table():
+    """
+    Load the table of award attributes for the edges of the full
+    directorate 05 graph. Each edge of the graph stores the index of
+    its award in the table as its 'award' attribute.
+
+    @rtype:  L{award_table.AwardTable}
+    @return: The award table saved with the full graph.
+
+    """
+    return award_table.AwardTable.load(AWARD_TABLE_FILE)
+
+
+def save_award_table(table):
+    """
+    Save the award table of the full directorate 05 graph to a pickle
+    file.
+
+    @type  table: L{award_table.AwardTable}
+    @param table: The award table to save.
+
+    """
+    table.save(AWARD_TABLE_FILE)
 
 
 #TODO: add exception handling for no file found
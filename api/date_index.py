@@ -0,0 +1,197 @@
+"""
+This module contains an index over the effective and expiration dates of the
+awards, for answering "which awards were active between two dates" without
+scanning the data.
+
+A single window over the effective dates, from the start of the query minus
+the longest duration of any award, would span most of the index, since a few
+awards run for nearly twenty years. Instead, the awards are bucketed by
+duration in powers of two: bucket b holds the awards running fewer than 2^b
+days (and at least 2^(b-1)), sorted by effective date. An award of bucket b
+which is active on or after a start date took effect no earlier than the
+start minus 2^b days, so two binary searches per bucket narrow a query down
+to a window in which at least about half of the entries before the start
+still match. Only the expiration dates inside the windows are compared.
+
+Awards without an expiration date are open-ended: they are kept in a bucket
+of their own and are active from their effective date on. Awards without an
+effective date cannot be placed and are dropped.
+
+"""
+import numpy as np
+
+
+DATE_DTYPE = 'datetime64[D]'
+ID_DTYPE = 'S16'
+
+# NaT is stored as the smallest int64
+NAT_VALUE = np.iinfo(np.int64).min
+
+# bucket of the awards without an expiration date
+OPEN_BUCKET = -1
+
+# version of the saved index; indexes saved before open-ended awards were
+# kept lack them
+FORMAT_VERSION = 2
+
+
+def to_date(value):
+    """Convert a date given as 'YYYY-MM-DD', a L{datetime.date}, or a
+    L{numpy.datetime64} into a day-resolution L{numpy.datetime64}.
+
+    """
+    return np.datetime64(value, 'D')
+
+
+def duration_buckets(days):
+    """Return the bucket of each duration: the number of bits needed to
+    write it, so durations in bucket b are below 2^b days. Negative
+    durations (awards expiring before they take effect) go to bucket 0.
+
+    :type  days: L{numpy.ndarray} of int
+    :param days: Durations in days.
+    :rtype:  L{numpy.ndarray} of int
+
+    """
+    days = np.maximum(np.asarray(days, dtype=np.int64), 0)
+    buckets = np.zeros(len(days), dtype=np.int64)
+    remaining = days.copy()
+    while remaining.any():
+        nonzero = remaining > 0
+        buckets[nonzero] += 1
+        remaining >>= 1
+    return buckets
+
+
+class DateIndex(object):
+    """Duration-bucketed interval index over award effective and expiration
+    dates.
+
+    """
+
+    def __init__(self, award_ids, effective, expiration):
+        """Build the index from aligned arrays. Entries with a missing
+        effective date are dropped; those with a missing expiration date
+        are open-ended.
+
+        :type  award_ids: array-like of str
+        :param award_ids: The award ids.
+        :type  effective: array-like of str or L{numpy.datetime64}
+        :param effective: The effective date of each award.
+        :type  expiration: array-like of str or L{numpy.datetime64}
+        :param expiration: The expiration date of each award.
+
+        """
+        award_ids = np.asarray(award_ids, dtype=ID_DTYPE)
+        effective = np.asarray(effective, dtype=DATE_DTYPE)
+        expiration = np.asarray(expiration, dtype=DATE_DTYPE)
+
+        valid = effective.view(np.int64) != NAT_VALUE
+        order = np.argsort(effective[valid], kind='mergesort')
+        self.award_ids = award_ids[valid][order]
+        self.effective = effective[valid][order]
+        self.expiration = expiration[valid][order]
+
+        open_ended = self.expiration.view(np.int64) == NAT_VALUE
+        days = np.zeros(len(self), dtype=np.int64)
+        days[~open_ended] = (self.expiration[~open_ended] -
+                             self.effective[~open_ended]).astype(np.int64)
+        buckets = duration_buckets(days)
+        buckets[open_ended] = OPEN_BUCKET
+
+        if (~open_ended).any():
+            self.max_duration = np.timedelta64(int(days[~open_ended].max()),
+                                               'D')
+        else:
+            self.max_duration = np.timedelta64(0, 'D')
+        self.num_open_ended = int(open_ended.sum())
+
+        # positions of each bucket's entries, in effective date order
+        self.buckets = {}
+        for bucket in np.unique(buckets).tolist():
+            positions = np.flatnonzero(buckets == bucket)
+            self.buckets[bucket] = (positions, self.effective[positions])
+
+    def __len__(self):
+        return len(self.award_ids)
+
+    def __str__(self):
+        days = int(self.max_duration.astype('timedelta64[D]').astype(int))
+        msg = ('Date index of {} awards, longest running {} days, '
+               '{} open-ended.')
+        return msg.format(len(self), days, self.num_open_ended)
+
+    def active_rows(self, start, end):
+        """Find the index entries for awards active at any point between two
+        dates (inclusive), i.e. those which take effect no later than the end
+        and expire no earlier than the start (or never expire).
+
+        :param start: First day of the range; see L{to_date}.
+        :param end: Last day of the range; see L{to_date}.
+        :rtype:  L{numpy.ndarray} of int
+        :return: Positions of the matching entries, in effective date order.
+
+        """
+        start = to_date(start)
+        end = to_date(end)
+        matches = [np.arange(0)]
+        for bucket, (positions, effective) in self.buckets.iteritems():
+            hi = np.searchsorted(effective, end, 'right')
+            if bucket == OPEN_BUCKET:
+                matches.append(positions[:hi])
+                continue
+
+            longest = np.timedelta64((1 << bucket) - 1, 'D')
+            lo = np.searchsorted(effective, start - longest, 'left')
+            if hi <= lo:
+                continue
+            window = positions[lo:hi]
+            matches.append(window[self.expiration[window] >= start])
+        return np.sort(np.concatenate(matches))
+
+    def active(self, start, end):
+        """Return the ids of all awards active at any point between two dates
+        (inclusive), ordered by effective date. See L{active_rows}.
+
+        :rtype:  L{numpy.ndarray} of str
+        :return: The ids of the matching awards.
+
+        """
+        return self.award_ids[self.active_rows(start, end)]
+
+    def save(self, path):
+        """Save the index arrays to a .npz file at the given path."""
+        np.savez(path, award_ids=self.award_ids, effective=self.effective,
+                 expiration=self.expiration)
+
+    @classmethod
+    def load(cls, path):
+        """Load an index saved by L{save}.
+
+        :param str path: Path of the .npz file.
+        :rtype:  L{DateIndex}
+        :return: The loaded index.
+
+        """
+        arrays = np.load(path)
+        return cls(arrays['award_ids'], arrays['effective'],
+                   arrays['expiration'])
+
+    @classmethod
+    def from_awards(cls, awards):
+        """Build an index from award dicts, as parsed from the JSON files.
+
+        :type  awards: iterable of dict
+        :param awards: The awards to index.
+        :rtype:  L{DateIndex}
+        :return: The index.
+
+        """
+        award_ids = []
+        effective = []
+        expiration = []
+        for award in awards:
+            award_ids.append(str(award['awardID']))
+            effective.append(award['effectiveDate'] or 'NaT')
+            expiration.append(award['expirationDate'] or 'NaT')
+        return cls(award_ids, effective, expiration)
@@ -15,19 +15,32 @@ import os
 import numpy
 import itertools
 
+import pandas as pd
+
 import parse
+import award_db
 
 
 class FundingAgentExplorer(object):
     """Answer questions about NSF award funding agents."""
 
-    def __init__(self):
+    def __init__(self, db=None):
         """
         Parse the funding agents from the raw JSON files using the
         parse module, then set up the hierarchy level selectors.
 
+        @type  db: L{award_db.AwardDatabase}
+        @param db: If given, read the funding agent records from
+            this award database instead of parsing the JSON files;
+            see L{data.DataDirectory.award_db}.
+
         """
-        self._df = parse.parse_funding_agents()
+        if db is None:
+            self._df = parse.parse_funding_agents()
+        else:
+            self._df = pd.DataFrame(
+                db.funding_agents(), columns=award_db.AGENT_COLUMNS)
+            self._df = self._df.set_index('pi_id')
         self._selectors = {
             'dir': ['dir_id', 'dir_abbr', 'dir_name'],
             'div': ['div_id', 'div_abbr', 'div_name'],
@@ -0,0 +1,262 @@
+"""
+This module contains the yearly snapshots of the PI collaboration graph: for
+each year, the graph of the awards which took effect that year, and the
+cumulative graph of all awards up to and including that year. All of them
+are built from a single chronological pass over the awards.
+
+Since vertices and edges are only ever added as the years go by, the
+cumulative graph of a year is that of the year before plus a delta: the PIs
+first seen that year and the edges of that year's awards. Only the deltas
+are stored, as arrays in one compressed numpy archive::
+
+    <year>/names    vertex names of the PIs first seen in the year
+    <year>/edges    (n, 2) endpoints of the year's edges, as vertex ids
+    <year>/awards   index of each edge's award in the award table
+    <year>/active   ids of the vertices with an award in the year, in the
+                    order they were first seen within the year
+
+Vertex ids are positions in the cumulative vertex list, so the cumulative
+graph of a year is rebuilt by concatenating the deltas up to it, and the
+graph of the year alone by re-indexing the year's edges over its active
+vertices. Either is created on demand with a single igraph constructor
+call. The awards' attributes are kept once, in an L{award_table.AwardTable}
+saved next to the archive; see L{GraphSnapshots.award_table}.
+
+"""
+import os
+import logging
+
+import numpy as np
+import igraph
+
+import data
+import parse
+import award_table
+
+
+SNAPSHOT_FILE = os.path.join(data.GRAPH_SAVE_DIR, 'snapshots.npz')
+SNAPSHOT_TABLE_FILE = os.path.join(
+    data.GRAPH_SAVE_DIR, 'snapshots-award-table.pickle')
+
+ID_DTYPE = np.int32
+
+
+class SnapshotSink(parse.GraphSink):
+    """Build the PI collaboration graph while recording where each year
+    starts, so it can be saved as yearly deltas; see L{build_snapshots}.
+
+    """
+
+    def __init__(self):
+        parse.GraphSink.__init__(self, all_edge_attributes=False)
+        self.years = []
+        self.vertex_starts = []  # number of vertices before each year
+        self.edge_starts = []  # number of edges before each year
+        self.active = []  # vertex ids with an award, per year
+        self._active_seen = set()
+
+    def consume(self, award_data):
+        year = parse.award_source(award_data) // 100
+        if not self.years or year != self.years[-1]:
+            if self.years and year < self.years[-1]:
+                raise ValueError('awards must be consumed in chronological '
+                                 'order; got {} after {}'.format(
+                                     year, self.years[-1]))
+            self.years.append(year)
+            self.vertex_starts.append(len(self.vertex_names))
+            self.edge_starts.append(len(self.edges))
+            self.active.append([])
+            self._active_seen = set()
+
+        parse.GraphSink.consume(self, award_data)
+        for pi_id in award_data['PIcoPI']:
+            vertex = self.vertex_index[str(pi_id)]
+            if vertex not in self._active_seen:
+                self._active_seen.add(vertex)
+                self.active[-1].append(vertex)
+
+    def deltas(self):
+        """Return the delta arrays of each year; see the module docstring.
+
+        :rtype:  iterator yielding (int, dict)
+        :return: The year and its arrays, by name, in chronological order.
+
+        """
+        vertex_ends = self.vertex_starts[1:] + [len(self.vertex_names)]
+        edge_ends = self.edge_starts[1:] + [len(self.edges)]
+        for i, year in enumerate(self.years):
+            first, last = self.edge_starts[i], edge_ends[i]
+            edges = np.array(self.edges[first:last], dtype=ID_DTYPE)
+            yield (year, {
+                'names': np.array(
+                    self.vertex_names[self.vertex_starts[i]:vertex_ends[i]],
+                    dtype=str),
+                'edges': edges.reshape((last - first, 2)),
+                'awards': np.array(self.edge_awards[first:last],
+                                   dtype=ID_DTYPE),
+                'active': np.array(self.active[i], dtype=ID_DTYPE)
+            })
+
+
+def save_snapshots(sink, path=SNAPSHOT_FILE, table_path=SNAPSHOT_TABLE_FILE):
+    """Save the yearly deltas and award table of a filled L{SnapshotSink}.
+
+    :param sink: The sink, after consuming the awards.
+    :type  sink: L{SnapshotSink}
+    :param str path: Path of the archive of deltas.
+    :param str table_path: Path of the award table.
+
+    """
+    arrays = {}
+    for year, delta in sink.deltas():
+        for name, array in delta.iteritems():
+            arrays['{}/{}'.format(year, name)] = array
+
+    # write to a temporary name so an interrupted save leaves no archive
+    tmp_path = path + '.tmp.npz'
+    np.savez_compressed(tmp_path, **arrays)
+    os.rename(tmp_path, path)
+    sink.table.save(table_path)
+
+
+def build_snapshots(path=SNAPSHOT_FILE, table_path=SNAPSHOT_TABLE_FILE,
+                    **kwargs):
+    """Build the yearly and cumulative snapshots from one pass over the
+    awards and save them.
+
+    :param str path: Path of the archive of deltas.
+    :param str table_path: Path of the award table.
+    :param kwargs: Filtering and parallelism parameters passed through to
+        L{data.DataDirectory.awards}.
+    :rtype:  L{GraphSnapshots}
+    :return: The saved snapshots.
+
+    """
+    sink = SnapshotSink()
+    parse._scan_one(sink, **kwargs)
+    logging.info('saving snapshots of {} years to {}'.format(
+        len(sink.years), path))
+    save_snapshots(sink, path, table_path)
+    return GraphSnapshots(path, table_path)
+
+
+class GraphSnapshots(object):
+    """Reconstruct yearly and cumulative graphs from saved deltas."""
+
+    def __init__(self, path=SNAPSHOT_FILE, table_path=SNAPSHOT_TABLE_FILE):
+        """
+        :param str path: Path of the archive of deltas; its arrays are read
+            as they are needed.
+        :param str table_path: Path of the award table.
+
+        """
+        self.archive = np.load(path)
+        self.table_path = table_path
+        self._table = None
+        self._years = sorted(set(
+            int(key.split('/')[0]) for key in self.archive.files))
+
+    def __str__(self):
+        return 'Graph snapshots for {} years.'.format(len(self._years))
+
+    def years(self):
+        """Return the sorted list of years with a snapshot."""
+        return list(self._years)
+
+    def award_table(self):
+        """Return the award table the 'award' edge attribute indexes into,
+        loading it on first use.
+
+        :rtype:  L{award_table.AwardTable}
+
+        """
+        if self._table is None:
+            self._table = award_table.AwardTable.load(self.table_path)
+        return self._table
+
+    def delta(self, year, name):
+        """Return one array of the delta of a year.
+
+        :raises KeyError: If there is no snapshot for the year.
+
+        """
+        return self.archive['{}/{}'.format(year, name)]
+
+    def _years_through(self, year):
+        if year not in self._years:
+            raise KeyError('no snapshot for {}'.format(year))
+        return [y for y in self._years if y <= year]
+
+    def cumulative(self, year):
+        """Return the graph of all awards which took effect up to and
+        including a year.
+
+        :param int year: The last year of the snapshot.
+        :rtype:  L{igraph.Graph}
+        :raises KeyError: If there is no snapshot for the year.
+
+        """
+        years = self._years_through(year)
+        names = np.concatenate([self.delta(y, 'names') for y in years])
+        edges = np.concatenate([self.delta(y, 'edges') for y in years])
+        awards = np.concatenate([self.delta(y, 'awards') for y in years])
+        return self._graph(names.tolist(), edges, awards)
+
+    def year_graph(self, year):
+        """Return the graph of the awards which took effect in a year, as
+        L{parse.pi_award_graph} builds it for that year alone.
+
+        :param int year: The year of the snapshot.
+        :rtype:  L{igraph.Graph}
+        :raises KeyError: If there is no snapshot for the year.
+
+        """
+        years = self._years_through(year)
+        names = np.concatenate([self.delta(y, 'names') for y in years])
+        active = self.delta(year, 'active')
+        local = np.empty(len(names), dtype=ID_DTYPE)
+        local[active] = np.arange(len(active), dtype=ID_DTYPE)
+        edges = local[self.delta(year, 'edges')]
+        return self._graph(names[active].tolist(), edges,
+                           self.delta(year, 'awards'))
+
+    def _graph(self, names, edges, awards):
+        table = self.award_table()
+        award_ids = [table.columns['awardID'][i] for i in awards.tolist()]
+        edge_attrs = {}
+        if len(awards):
+            edge_attrs = {award_table.EDGE_ATTRIBUTE: awards.tolist(),
+                          'awardID': award_ids, 'label': award_ids}
+        return igraph.Graph(
+            n=len(names), edges=edges.tolist(),
+            vertex_attrs={'name': names, 'label': list(names)},
+            edge_attrs=edge_attrs)
+
+
+def load_snapshots(rebuild=False, path=SNAPSHOT_FILE,
+                   table_path=SNAPSHOT_TABLE_FILE, **kwargs):
+    """Return the saved graph snapshots, building them first if the
+    manifest shows that the data changed since they were saved, or that
+    they were saved with other parameters or to other paths.
+
+    :param bool rebuild: If True, build the snapshots even if the saved
+        ones are current.
+    :param str path: Path of the archive of deltas.
+    :param str table_path: Path of the award table.
+    :param kwargs: Passed on to L{build_snapshots}.
+    :rtype:  L{GraphSnapshots}
+
+    """
+    stage = 'graph-snapshots'
+    inputs = data.DataDirectory().input_files()
+    outputs = [path, table_path]
+    params = parse.scan_params(**kwargs)
+    params.update(path=os.path.abspath(path),
+                  table_path=os.path.abspath(table_path))
+    manifest = data.load_manifest()
+    if not rebuild and manifest.is_current(stage, inputs, params):
+        return GraphSnapshots(path, table_path)
+
+    snapshots = build_snapshots(path, table_path, **kwargs)
+    manifest.record(stage, inputs, outputs, params)
+    return snapshots
@@ -1,9 +1,13 @@
+import os
 import sys
 import logging
 import cPickle as pickle
+from xml.sax.saxutils import escape
 
 import data
+import subgraph
 from repdoc_writer import read_pi_tfidf_bow, read_pi_tf_bow
+from repdoc_writer import tfidf_bow_dir, tf_bow_dir
 
 
 header = """<?xml version="1.0" encoding="UTF-8"?>
@@ -29,20 +33,21 @@ key_tag = """
 data_tag = """  <data key="{key}">{value}</data>\n"""
 node_with_data_tag = """<node id="{node_id}">\n{data_tags}</node>\n"""
 
+edge_key_tag = """
+<key id="{attr_id}" for="edge" attr.name="{name}" attr.type="string"/>\n"""
+edge_with_data_tag = """<edge source="{source}" target="{target}">
+{data_tags}</edge>\n"""
 
-def filter_edges(graph, pis):
-    edgelist = set()
 
-    # filter to only those edges that connect the given pis
-    for edge in graph.es:
-        pi1 = graph.vs[edge.source]['label']
-        pi2 = graph.vs[edge.target]['label']
-        if pi1 in pis and pi2 in pis:
-            edgelist.add(edge)
+def filter_nodes(graph, pis):
+    return graph.vs.select(subgraph.vertex_ids(graph, pis).tolist())
+
 
-    # remove parallel edges
-    non_multiples = filter(lambda e: not e.is_multiple(), edgelist)
-    return non_multiples
+def filter_edges(graph, pis):
+    # only those edges that connect the given pis, without parallel edges
+    vertices = subgraph.vertex_ids(graph, pis)
+    edge_ids = subgraph.induced_edges(graph, vertices, simple=True)
+    return graph.es.select(edge_ids.tolist())
 
 
 def write_sparse_graph(graph, corpus, term_map, dtype="double",
@@ -53,7 +58,7 @@ def write_sparse_graph(graph, corpus, term_map, dtype="double",
         write_keys(term_map, dtype, f)
 
         # write all nodes for the given PIs
-        pi_nodes = (node for node in graph.vs if node['label'] in pis)
+        pi_nodes = filter_nodes(graph, pis)
         for num, node in enumerate(pi_nodes):
             if num % 100 == 0:
                 logging.info("{} nodes left to write...".format(
@@ -65,7 +70,7 @@ def write_sparse_graph(graph, corpus, term_map, dtype="double",
         edges = filter_edges(graph, pis)
         num_edges = len(edges)
         logging.info("writing {} edges...".format(num_edges))
-        for edge in filter_edges(graph, pis):
+        for edge in edges:
             write_edge(edge, f)
 
         f.write(footer)
@@ -93,7 +98,12 @@ def write_sparse_node(node, f, corpus):
     f.write(tag)
 
 
-def write_graph(graph, corpus, termids, fpath='pi-graph.graphml'):
+def write_graph(graph, corpus, termids, fpath='pi-graph.graphml',
+                table=None, edge_attributes=()):
+    """Write the PIs of the corpus and the edges between them, with the
+    given award attributes of each edge joined from the award table.
+
+    """
     pis = set(corpus.keys())
     num_nodes = len(pis)
     logging.info("writing dense graph: {} pi nodes, {} terms/node".format(
@@ -101,9 +111,10 @@ def write_graph(graph, corpus, termids, fpath='pi-graph.graphml'):
 
     with open(fpath, 'w') as f:
         f.write(header)
+        write_edge_keys(edge_attributes, f)
 
         # write all nodes for the given PIs
-        pi_nodes = (node for node in graph.vs if node['label'] in pis)
+        pi_nodes = filter_nodes(graph, pis)
         for num, node in enumerate(pi_nodes):
             if num % 100 == 0:
                 logging.info("{} nodes left to write...".format(
@@ -115,8 +126,8 @@ def write_graph(graph, corpus, termids, fpath='pi-graph.graphml'):
         edges = filter_edges(graph, pis)
         num_edges = len(edges)
         logging.info("writing {} edges...".format(num_edges))
-        for edge in filter_edges(graph, pis):
-            write_edge(edge, f)
+        for edge in edges:
+            write_edge(edge, f, table, edge_attributes)
 
         f.write(footer)
 
@@ -135,9 +146,35 @@ def write_node(node, f, corpus, termids):
     f.write(node_tag.format(node_id=node_id, attributes=attr_string))
 
 
-def write_edge(edge, f):
+def write_edge_keys(names, f):
+    for name in names:
+        f.write(edge_key_tag.format(attr_id=ealabel(name), name=name))
+
+
+def ealabel(name):
+    return "e_%s" % name
+
+
+def edge_value(table, edge, name):
+    value = table.edge_value(edge, name)
+    if isinstance(value, list):  # POs
+        value = ', '.join(value)
+    if isinstance(value, unicode):
+        value = value.encode('utf-8')
+    return escape(str(value))
+
+
+def write_edge(edge, f, table=None, edge_attributes=()):
     id1, id2 = edge.tuple
-    f.write(edge_tag.format(source=id1, target=id2))
+    if not edge_attributes:
+        f.write(edge_tag.format(source=id1, target=id2))
+        return
+
+    dtags = (data_tag.format(key=ealabel(name),
+                             value=edge_value(table, edge, name))
+             for name in edge_attributes)
+    f.write(edge_with_data_tag.format(
+        source=id1, target=id2, data_tags=''.join(dtags)))
 
 
 # LOADERS
@@ -146,6 +183,9 @@ def write_edge(edge, f):
 def load_graph():
     return data.load_full_graph()
 
+def load_award_table():
+    return data.load_award_table()
+
 def load_pi_list(fpath='cise-lcc-binary-membership-ids.txt'):
     with open(fpath) as f:
         return f.read().split()
@@ -155,6 +195,10 @@ def load_corpus(pi_ids, corpus_type='tfidf'):
                    else read_pi_tf_bow)
     return {pi:dict(read_pi_doc(pi)) for pi in pi_ids}
 
+def corpus_files(pi_ids, corpus_type='tfidf'):
+    bow_dir = tfidf_bow_dir if corpus_type == 'tfidf' else tf_bow_dir
+    return [os.path.join(bow_dir, "%s.csv" % pi) for pi in pi_ids]
+
 def load_term_ids():
     with open('termids.txt') as f:
         return map(int, f.read().split())
@@ -167,16 +211,32 @@ def load_term_map():
 # WRITERS
 # =============================================================================
 
-def write_dense_graph(weights='tfidf'):
+def write_dense_graph(weights='tfidf', force=False, edge_attributes=()):
     fpath = 'pi-{}-graph.graphml'.format(weights)
-    logging.info("writing dense {} graph".format(weights))
     pis = load_pi_list()
+
+    # skip the write if neither the graph nor the corpus changed
+    stage = 'graphml-writer:{}'.format(os.path.abspath(fpath))
+    inputs = ([data.FULL_GRAPH_FILE, 'cise-lcc-binary-membership-ids.txt',
+               'termids.txt'] + corpus_files(pis, weights))
+    if edge_attributes:
+        inputs.append(data.AWARD_TABLE_FILE)
+    params = ({'edge_attributes': list(edge_attributes)}
+              if edge_attributes else None)
+    manifest = data.load_manifest()
+    if not force and manifest.is_current(stage, inputs, params):
+        logging.info("{} is up to date".format(fpath))
+        return
+
+    logging.info("writing dense {} graph".format(weights))
     logging.info("filtering graph to %d pis" % len(pis))
     corpus = load_corpus(pis, weights)
     termids = load_term_ids()
     logging.info("writing %d terms for each pi node" % len(termids))
     graph = load_graph()
-    write_graph(graph, corpus, termids, fpath)
+    table = load_award_table() if edge_attributes else None
+    write_graph(graph, corpus, termids, fpath, table, edge_attributes)
+    manifest.record(stage, inputs, [fpath], params)
 
 def write_sparse_graph(weights='tfidf'):
     fpath = 'sparse-pi-{}-graph.graphml'.format(weights)
@@ -0,0 +1,364 @@
+"""
+This module contains the hypergraph of PIs and awards: each award is one
+hyperedge over its PIs. L{parse.pi_award_graph} expands an award with k PIs
+into a clique of k(k-1)/2 edges, so a few large multi-institution awards
+dominate its edge count and memory; the hypergraph stores each award once,
+in space linear in its number of PIs.
+
+The incidences are stored in both directions as CSR arrays, in the format of
+L{csr_graph} (one binary file per array, memory-mapped on load)::
+
+    vertex_offsets      offsets into vertex_edges (num_pis + 1 entries)
+    vertex_edges        awards of each PI, sorted
+    edge_offsets        offsets into edge_members (num_awards + 1 entries)
+    edge_members        PIs of each award, sorted
+    pi_label_offsets    byte offsets into the PI id blob
+    pi_labels           PI ids, concatenated
+    award_label_offsets byte offsets into the award id blob
+    award_labels        award ids, concatenated
+    meta.json           dtypes and counts
+
+so the awards of PI v and the PIs of award e are::
+
+    vertex_edges[vertex_offsets[v]:vertex_offsets[v + 1]]
+    edge_members[edge_offsets[e]:edge_offsets[e + 1]]
+
+Neighborhoods, degrees, and graph statistics are computed from these arrays
+without expanding any clique. The 2-section (the graph of PIs who share an
+award) is only built on request, by L{Hypergraph.projection}, optionally
+leaving out awards above a size cap and weighting each award by 1/(k-1)
+so that large awards do not outweigh small ones.
+
+"""
+import os
+import logging
+
+import numpy as np
+import scipy.sparse as sp
+from scipy.sparse import csgraph
+import igraph
+
+import data
+import parse
+import incidence
+import csr_graph
+
+
+HYPERGRAPH_DIR = os.path.join(data.DATA_DIR, 'csr', 'dir05-hypergraph')
+
+ID_DTYPE = 'int32'
+
+DTYPES = {
+    'vertex_offsets': csr_graph.OFFSET_DTYPE,
+    'vertex_edges': ID_DTYPE,
+    'edge_offsets': csr_graph.OFFSET_DTYPE,
+    'edge_members': ID_DTYPE,
+    'pi_label_offsets': csr_graph.OFFSET_DTYPE,
+    'pi_labels': csr_graph.BLOB_DTYPE,
+    'award_label_offsets': csr_graph.OFFSET_DTYPE,
+    'award_labels': csr_graph.BLOB_DTYPE
+}
+
+# weightings of the awards in the 2-section
+COUNT = 'count'  # each shared award counts 1
+INVERSE = 'inverse'  # an award with k PIs counts 1/(k-1)
+
+
+def gather(offsets, values, ids):
+    """Concatenate the CSR rows of the given ids without a Python loop.
+
+    :type  offsets: L{numpy.ndarray}
+    :param offsets: The row offsets into values.
+    :type  values: L{numpy.ndarray}
+    :param values: The concatenated rows.
+    :type  ids: L{numpy.ndarray}
+    :param ids: The rows to gather.
+    :rtype:  L{numpy.ndarray}
+
+    """
+    ids = np.asarray(ids, dtype=np.int64)
+    starts = offsets[ids]
+    lengths = offsets[ids + 1] - starts
+    total = int(lengths.sum())
+    if not total:
+        return values[:0]
+    shifts = np.repeat(starts - (np.cumsum(lengths) - lengths), lengths)
+    return values[shifts + np.arange(total)]
+
+
+class Hypergraph(object):
+    """PIs as vertices and awards as hyperedges over them."""
+
+    def __init__(self, arrays, pi_ids, award_ids):
+        """
+        :param dict arrays: The CSR arrays by name; see the module docstring.
+            The label arrays are not needed.
+        :type  pi_ids: list of str
+        :param pi_ids: The PI id of each vertex.
+        :type  award_ids: list of str
+        :param award_ids: The award id of each hyperedge.
+
+        """
+        self.arrays = arrays
+        self.pi_ids = pi_ids
+        self.award_ids = award_ids
+        self._pi_index = None
+
+    def __str__(self):
+        return 'Hypergraph of {} PIs and {} awards.'.format(
+            self.vcount(), self.ecount())
+
+    @classmethod
+    def from_incidence(cls, inc):
+        """Create the hypergraph of an L{incidence.Incidence}."""
+        by_pi = sp.csr_matrix(inc.matrix)
+        by_pi.sort_indices()
+        by_award = by_pi.tocsc()
+        by_award.sort_indices()
+        arrays = {
+            'vertex_offsets': by_pi.indptr,
+            'vertex_edges': by_pi.indices,
+            'edge_offsets': by_award.indptr,
+            'edge_members': by_award.indices
+        }
+        arrays = {name: np.asarray(array, dtype=DTYPES[name])
+                  for name, array in arrays.iteritems()}
+        return cls(arrays, list(inc.pi_ids), list(inc.award_ids))
+
+    def save(self, dirpath=HYPERGRAPH_DIR):
+        """Write the hypergraph to a directory; see L{load}."""
+        arrays = dict(self.arrays)
+        arrays['pi_label_offsets'], arrays['pi_labels'] = \
+            csr_graph.encode_labels(self.pi_ids)
+        arrays['award_label_offsets'], arrays['award_labels'] = \
+            csr_graph.encode_labels(self.award_ids)
+        csr_graph.write_arrays(dirpath, arrays, DTYPES, {
+            'num_vertices': self.vcount(),
+            'num_edges': self.ecount()
+        })
+
+    @classmethod
+    def load(cls, dirpath=HYPERGRAPH_DIR):
+        """Read a hypergraph written by L{save}, memory-mapping its arrays.
+
+        :raises IOError: If there is no hypergraph in the directory.
+
+        """
+        dtypes = csr_graph.read_meta(dirpath)['dtypes']
+        arrays = {name: csr_graph.map_array(dirpath, name, dtype)
+                  for name, dtype in dtypes.iteritems()}
+        pi_ids = csr_graph.decode_labels(
+            arrays.pop('pi_label_offsets'), arrays.pop('pi_labels'))
+        award_ids = csr_graph.decode_labels(
+            arrays.pop('award_label_offsets'), arrays.pop('award_labels'))
+        return cls(arrays, pi_ids, award_ids)
+
+    def vcount(self):
+        return len(self.arrays['vertex_offsets']) - 1
+
+    def ecount(self):
+        return len(self.arrays['edge_offsets']) - 1
+
+    def pi_index(self, pi_id):
+        """Return the vertex of a PI.
+
+        :raises KeyError: If the PI has no award.
+
+        """
+        if self._pi_index is None:
+            self._pi_index = {pi: vertex for vertex, pi
+                              in enumerate(self.pi_ids)}
+        return self._pi_index[str(pi_id)]
+
+    def matrix(self):
+        """Return the (num_pis, num_awards) incidence matrix."""
+        edges = self.arrays['vertex_edges']
+        return sp.csr_matrix(
+            (np.ones(len(edges), dtype=incidence.COUNT_DTYPE), edges,
+             self.arrays['vertex_offsets']),
+            shape=(self.vcount(), self.ecount()))
+
+    def degrees(self):
+        """Return the number of awards of each PI."""
+        return np.diff(self.arrays['vertex_offsets'])
+
+    def edge_sizes(self):
+        """Return the number of PIs of each award, its hyperedge degree."""
+        return np.diff(self.arrays['edge_offsets'])
+
+    def members(self, edge):
+        """Return the sorted PIs (vertices) of an award."""
+        offsets = self.arrays['edge_offsets']
+        return self.arrays['edge_members'][offsets[edge]:offsets[edge + 1]]
+
+    def incident(self, vertex):
+        """Return the sorted awards (hyperedges) of a PI."""
+        offsets = self.arrays['vertex_offsets']
+        return self.arrays['vertex_edges'][offsets[vertex]:offsets[vertex + 1]]
+
+    def neighbors(self, vertex, max_size=None):
+        """Return the PIs who share an award with a PI.
+
+        :param int vertex: The vertex of the PI.
+        :param int max_size: If given, awards with more PIs are ignored.
+        :rtype:  L{numpy.ndarray}
+        :return: The sorted vertices of the co-PIs.
+
+        """
+        edges = self.incident(vertex)
+        if max_size is not None:
+            edges = edges[self.edge_sizes()[edges] <= max_size]
+        members = np.unique(gather(self.arrays['edge_offsets'],
+                                   self.arrays['edge_members'], edges))
+        return members[members != vertex]
+
+    def clique_degrees(self):
+        """Return the degree of each PI in the clique expansion, i.e. in the
+        multigraph of L{parse.pi_award_graph}: the sum over the PI's awards
+        of their number of other PIs.
+
+        """
+        return self.matrix().dot(self.edge_sizes() - 1)
+
+    def edge_weights(self, max_size=None, weighting=COUNT):
+        """Return the weight of each award in the 2-section.
+
+        :param int max_size: If given, awards with more PIs get weight 0.
+        :param str weighting: L{COUNT} to weigh every award 1, or
+            L{INVERSE} to weigh an award with k PIs 1/(k-1).
+        :rtype:  L{numpy.ndarray}
+        :raises ValueError: If the weighting is unknown.
+
+        """
+        sizes = self.edge_sizes()
+        if weighting == COUNT:
+            weights = np.ones(len(sizes), dtype=np.int64)
+        elif weighting == INVERSE:
+            weights = 1.0 / np.maximum(sizes - 1, 1)
+        else:
+            raise ValueError('unknown weighting: {}'.format(weighting))
+
+        weights[sizes < 2] = 0
+        if max_size is not None:
+            weights[sizes > max_size] = 0
+        return weights
+
+    def projection(self, max_size=None, weighting=COUNT):
+        """Build the 2-section of the hypergraph: the PIs who share an
+        award are adjacent, with the summed weight of the awards they
+        share; see L{edge_weights} for the parameters.
+
+        :rtype:  L{scipy.sparse.csr_matrix}
+        :return: The symmetric (num_pis, num_pis) weighted adjacency, with an
+            empty diagonal.
+
+        """
+        matrix = self.matrix()
+        weights = self.edge_weights(max_size, weighting)
+        adjacency = sp.csr_matrix(matrix * sp.diags(weights, 0) * matrix.T)
+        adjacency.setdiag(0)
+        adjacency.eliminate_zeros()
+        return adjacency
+
+    def to_igraph(self, max_size=None, weighting=COUNT):
+        """Export the 2-section as a simple graph whose edges have a
+        'weight'; see L{projection}.
+
+        :rtype:  L{igraph.Graph}
+
+        """
+        upper = sp.triu(self.projection(max_size, weighting), 1).tocoo()
+        edge_attrs = ({'weight': upper.data.tolist()} if upper.nnz else {})
+        return igraph.Graph(
+            n=self.vcount(),
+            edges=zip(upper.row.tolist(), upper.col.tolist()),
+            vertex_attrs={'name': list(self.pi_ids),
+                          'label': list(self.pi_ids)},
+            edge_attrs=edge_attrs)
+
+    def components(self):
+        """Find the connected components of the PIs, through the bipartite
+        graph of PIs and awards.
+
+        :rtype:  L{numpy.ndarray}
+        :return: The component of each PI, numbered from 0.
+
+        """
+        matrix = self.matrix()
+        bipartite = sp.bmat([[None, matrix], [matrix.T, None]], format='csr')
+        _, labels = csgraph.connected_components(bipartite, directed=False)
+        _, components = np.unique(labels[:self.vcount()], return_inverse=True)
+        return components
+
+    def stats(self):
+        """Compute graph-level statistics without expanding the awards into
+        cliques.
+
+        :rtype:  dict
+        :return: The numbers of PIs, awards, and PI-award incidences; the
+            mean and largest number of PIs per award; the number of edges of
+            the clique expansion, as in L{parse.pi_award_graph}; the mean
+            number of awards per PI; the number of PIs without any co-PI;
+            and the number of connected components of the PIs and the size
+            of the largest.
+
+        """
+        sizes = self.edge_sizes()
+        num_pis = self.vcount()
+        components = self.components()
+        component_sizes = np.bincount(components)
+        return {
+            'pis': num_pis,
+            'awards': self.ecount(),
+            'incidences': len(self.arrays['vertex_edges']),
+            'mean_award_size': float(sizes.mean()) if len(sizes) else 0.0,
+            'max_award_size': int(sizes.max()) if len(sizes) else 0,
+            'clique_edges': int((sizes * (sizes - 1) // 2).sum()),
+            'mean_pi_awards': (float(self.degrees().mean()) if num_pis
+                               else 0.0),
+            'solo_pis': int((self.clique_degrees() == 0).sum()),
+            'components': len(component_sizes),
+            'largest_component': (int(component_sizes.max())
+                                  if len(component_sizes) else 0)
+        }
+
+
+def build_hypergraph(dirpath=HYPERGRAPH_DIR, **kwargs):
+    """Build the hypergraph from one pass over the awards and save it.
+
+    :param str dirpath: Directory to save the hypergraph to.
+    :param kwargs: Filtering and parallelism parameters; see
+        L{parse.pi_award_graph}.
+    :rtype:  L{Hypergraph}
+
+    """
+    hypergraph = Hypergraph.from_incidence(incidence.build_incidence(**kwargs))
+    logging.info('saving {} to {}'.format(hypergraph, dirpath))
+    hypergraph.save(dirpath)
+    return Hypergraph.load(dirpath)
+
+
+def load_hypergraph(rebuild=False, dirpath=HYPERGRAPH_DIR, **kwargs):
+    """Return the saved hypergraph, building it first if the manifest shows
+    that the data changed since it was saved, or that it was saved with
+    other parameters or to another directory.
+
+    :param bool rebuild: If True, build the hypergraph even if the saved one
+        is current.
+    :param str dirpath: Directory the hypergraph is saved in.
+    :param kwargs: Passed on to L{build_hypergraph}.
+    :rtype:  L{Hypergraph}
+
+    """
+    stage = 'hypergraph'
+    inputs = data.DataDirectory().input_files()
+    outputs = [os.path.join(dirpath, csr_graph.META_FILE)]
+    params = parse.scan_params(**kwargs)
+    params['dirpath'] = os.path.abspath(dirpath)
+    manifest = data.load_manifest()
+    if not rebuild and manifest.is_current(stage, inputs, params):
+        return Hypergraph.load(dirpath)
+
+    hypergraph = build_hypergraph(dirpath, **kwargs)
+    manifest.record(stage, inputs, outputs, params)
+    return hypergraph
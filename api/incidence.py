@@ -0,0 +1,224 @@
+"""
+This module contains the bipartite PI-award incidence matrix, the sparse
+core of the collaboration statistics. The graph of L{parse.pi_award_graph}
+pairs up the PIs of each award in Python, so an award with k PIs costs
+k(k-1)/2 edges and as many interpreter steps. Here each award only adds one
+entry per PI to a sparse matrix A, built in one pass over the awards::
+
+    A[i, j] = 1 if PI i is a PI or co-PI of award j
+
+and the statistics are sparse products and sums of A:
+
+    - A.A^T is the co-PI adjacency; entry (i, j) is the number of awards PIs
+      i and j share, and the diagonal is the number of awards of each PI
+    - the row sums of A are the award counts of the PIs
+    - the column sums of A are the PI counts of the awards
+
+PIs and awards are numbered in the order they are first seen, so PI i is
+vertex i of the graph L{parse.pi_award_graph} builds from the same awards.
+The co-PI adjacency can be exported as a weighted simple igraph Graph, like
+the one built with I{simple=True}, or as weighted edges for the writers;
+see L{Incidence.to_igraph} and L{Incidence.edges}.
+
+"""
+import logging
+
+import numpy as np
+import scipy.sparse as sp
+import igraph
+
+import parse
+
+
+COUNT_DTYPE = np.int32
+
+
+class IncidenceSink(parse.AwardSink):
+    """Collect the PI-award incidence entries; see L{build_incidence}."""
+
+    def __init__(self):
+        self.pi_ids = []
+        self.pi_index = {}  # PI ID -> row
+        self.award_ids = []
+        self.rows = []
+        self.cols = []
+
+    def consume(self, award_data):
+        col = len(self.award_ids)
+        self.award_ids.append(str(award_data['awardID']))
+
+        rows = set()
+        for pi_id in award_data['PIcoPI']:
+            pi_id = str(pi_id)
+            row = self.pi_index.get(pi_id)
+            if row is None:
+                row = self.pi_index[pi_id] = len(self.pi_ids)
+                self.pi_ids.append(pi_id)
+            rows.add(row)
+
+        self.rows.extend(rows)
+        self.cols.extend([col] * len(rows))
+
+    def result(self):
+        shape = (len(self.pi_ids), len(self.award_ids))
+        matrix = sp.csr_matrix(
+            (np.ones(len(self.rows), dtype=COUNT_DTYPE),
+             (np.array(self.rows, dtype=np.int64),
+              np.array(self.cols, dtype=np.int64))),
+            shape=shape)
+        return Incidence(matrix, self.pi_ids, self.award_ids)
+
+
+class Incidence(object):
+    """The PI-award incidence matrix, with the ids of its rows and
+    columns.
+
+    """
+
+    def __init__(self, matrix, pi_ids, award_ids):
+        """
+        :type  matrix: L{scipy.sparse.csr_matrix}
+        :param matrix: The (num_pis, num_awards) 0/1 incidence matrix.
+        :type  pi_ids: list of str
+        :param pi_ids: The PI id of each row.
+        :type  award_ids: list of str
+        :param award_ids: The award id of each column.
+
+        """
+        self.matrix = sp.csr_matrix(matrix)
+        self.pi_ids = list(pi_ids)
+        self.award_ids = list(award_ids)
+        self._pi_index = None
+        self._adjacency = None
+
+    def __str__(self):
+        return 'Incidence of {} PIs on {} awards ({} entries).'.format(
+            len(self.pi_ids), len(self.award_ids), self.matrix.nnz)
+
+    def _index(self):
+        if self._pi_index is None:
+            self._pi_index = {pi: row for row, pi in enumerate(self.pi_ids)}
+        return self._pi_index
+
+    def pi_index(self, pi_id):
+        """Return the row of a PI.
+
+        :raises KeyError: If the PI has no award.
+
+        """
+        return self._index()[str(pi_id)]
+
+    def rows(self, pi_ids):
+        """Return the sorted rows of the given PIs; PIs without an award
+        are ignored.
+
+        """
+        index = self._index()
+        rows = set(index[pi_id] for pi_id in map(str, pi_ids)
+                   if pi_id in index)
+        return np.array(sorted(rows), dtype=np.int64)
+
+    def pi_award_counts(self):
+        """Return the number of awards of each PI, by row."""
+        return np.asarray(self.matrix.sum(axis=1)).ravel()
+
+    def award_pi_counts(self):
+        """Return the number of PIs of each award, by column."""
+        return np.asarray(self.matrix.sum(axis=0)).ravel()
+
+    def adjacency(self):
+        """Return the co-PI adjacency, A.A^T without its diagonal; entry
+        (i, j) is the number of awards PIs i and j share. It is computed on
+        first use and cached.
+
+        :rtype:  L{scipy.sparse.csr_matrix}
+
+        """
+        if self._adjacency is None:
+            self._adjacency = copi_adjacency(self.matrix)
+        return self._adjacency
+
+    def shared_awards(self, pi1, pi2):
+        """Return the number of awards two PIs share."""
+        return int(self.adjacency()[self.pi_index(pi1), self.pi_index(pi2)])
+
+    def edges(self, pi_ids=None, min_shared=1):
+        """Return the pairs of PIs who share awards, once per pair.
+
+        :type  pi_ids: iterable of str
+        :param pi_ids: If given, only pairs of these PIs are returned.
+        :param int min_shared: Least number of shared awards of a pair.
+        :rtype:  tuple of L{numpy.ndarray}
+        :return: The rows of the two PIs of each pair, with the lower row
+            first, and the number of awards they share; ordered by rows.
+
+        """
+        adjacency = self.adjacency()
+        if pi_ids is not None:
+            keep = np.zeros(len(self.pi_ids), dtype=COUNT_DTYPE)
+            keep[self.rows(pi_ids)] = 1
+            mask = sp.diags(keep, 0)
+            adjacency = mask * adjacency * mask
+
+        upper = sp.triu(adjacency, 1, format='csr')
+        upper.eliminate_zeros()
+        upper = upper.tocoo()
+        selected = upper.data >= min_shared
+        return (upper.row[selected], upper.col[selected],
+                upper.data[selected])
+
+    def to_igraph(self, pi_ids=None, min_shared=1):
+        """Export the co-PI adjacency as a simple graph, with a vertex for
+        every PI (or the given PIs) and an edge for every pair of PIs who
+        share awards, whose 'weight' is the number they share.
+
+        :type  pi_ids: iterable of str
+        :param pi_ids: If given, only these PIs become vertices.
+        :param int min_shared: Least number of shared awards of an edge.
+        :rtype:  L{igraph.Graph}
+
+        """
+        sources, targets, weights = self.edges(pi_ids, min_shared)
+        if pi_ids is None:
+            labels = self.pi_ids
+        else:
+            rows = self.rows(pi_ids)
+            labels = [self.pi_ids[row] for row in rows.tolist()]
+            local = np.zeros(len(self.pi_ids), dtype=np.int64)
+            local[rows] = np.arange(len(rows))
+            sources, targets = local[sources], local[targets]
+
+        edge_attrs = {'weight': weights.tolist()} if len(weights) else {}
+        return igraph.Graph(
+            n=len(labels), edges=zip(sources.tolist(), targets.tolist()),
+            vertex_attrs={'name': list(labels), 'label': list(labels)},
+            edge_attrs=edge_attrs)
+
+
+def copi_adjacency(matrix):
+    """Compute the co-PI adjacency of an incidence matrix.
+
+    :type  matrix: L{scipy.sparse.csr_matrix}
+    :param matrix: The (num_pis, num_awards) incidence matrix.
+    :rtype:  L{scipy.sparse.csr_matrix}
+    :return: The symmetric (num_pis, num_pis) matrix of shared award
+        counts, with an empty diagonal.
+
+    """
+    adjacency = sp.csr_matrix(matrix * matrix.T)
+    adjacency.setdiag(0)
+    adjacency.eliminate_zeros()
+    return adjacency
+
+
+def build_incidence(**kwargs):
+    """Build the PI-award incidence matrix from one pass over the awards.
+
+    :param kwargs: Filtering and parallelism parameters; see
+        L{parse.pi_award_graph}.
+    :rtype:  L{Incidence}
+
+    """
+    incidence = parse._scan_one(IncidenceSink(), **kwargs)
+    logging.info(str(incidence))
+    return incidence
@@ -0,0 +1,164 @@
+"""
+This module contains an append-only journal of completed units of work, so a
+long-running download can pick up where it left off after being interrupted.
+Each completed unit (a month, a document, a PI, ...) is appended to the
+journal file as one JSON line the moment it completes::
+
+    {"kind": "doc", "key": "9606", "value": {"title": ..., "abstract": ...}}
+
+Opening the journal replays the file, so anything recorded by an earlier run
+is known to be done, and its value (if one was recorded) can be reused
+instead of being fetched again. A line cut short by a crash is ignored.
+
+A unit can also name the smaller units it completes, which are then
+forgotten: once a month is recorded, the titles and abstracts of its
+documents are in its data file and need not be kept. Both are written in the
+same line, so a crash cannot separate them, and the file is compacted the
+next time it is opened so that forgotten units stop taking up space::
+
+    {"kind": "month", "key": "1995-01-05", "value": null,
+     "forget": {"doc": ["9606", ...]}}
+
+"""
+import os
+import threading
+
+try:
+    import ujson as json
+except ImportError:
+    import json
+
+
+class Journal(object):
+    """Record and replay completed units of work."""
+
+    def __init__(self, path, replay=True):
+        """
+        :param str path: Path of the journal file; it is created on the
+            first L{record} if it does not exist.
+        :param bool replay: If False, ignore the units recorded by earlier
+            runs, so all work is done again; new units are still appended.
+
+        """
+        self.path = path
+        self._units = {}
+        self._lock = threading.Lock()
+        if replay and os.path.isfile(path):
+            if self._replay():
+                self.compact()
+
+    def _replay(self):
+        """Replay the journal file; return True if it forgets any units."""
+        forgets = False
+        with open(self.path) as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:  # partially written by an interrupted run
+                    continue
+                self._units.setdefault(entry['kind'], {})[entry['key']] = \
+                    entry.get('value')
+                if entry.get('forget'):
+                    self._forget(entry['forget'])
+                    forgets = True
+        return forgets
+
+    def _forget(self, forget):
+        for kind, keys in forget.iteritems():
+            units = self._units.get(kind, {})
+            for key in keys:
+                units.pop(key, None)
+
+    def __len__(self):
+        return sum(len(units) for units in self._units.itervalues())
+
+    def __str__(self):
+        return 'Journal of {} completed units at {}.'.format(len(self),
+                                                             self.path)
+
+    def done(self, kind, key):
+        """Check whether a unit was recorded as completed.
+
+        :param str kind: The kind of unit, e.g. 'month', 'doc', or 'pi'.
+        :param str key: The key of the unit within its kind.
+        :rtype:  bool
+
+        """
+        return str(key) in self._units.get(kind, {})
+
+    def keys(self, kind):
+        """Return the set of keys of all completed units of a kind."""
+        return set(self._units.get(kind, {}))
+
+    def value(self, kind, key):
+        """Return the value recorded with a completed unit.
+
+        :raises KeyError: If the unit was not recorded.
+
+        """
+        return self._units[kind][str(key)]
+
+    def record(self, kind, key, value=None, forget=None):
+        """Append a completed unit to the journal. The line is flushed and
+        synced to disk before returning, so a recorded unit survives a crash
+        right after.
+
+        :param str kind: The kind of unit.
+        :param str key: The key of the unit within its kind.
+        :param value: Any JSON-encodable result of the unit to keep.
+        :param dict forget: Units this one completes, to forget: the keys
+            of the units to drop, by kind.
+
+        """
+        if not forget:
+            self.record_many(kind, [(key, value)])
+            return
+
+        forget = {other: [str(other_key) for other_key in keys]
+                  for other, keys in forget.iteritems()}
+        line = json.dumps({'kind': kind, 'key': str(key), 'value': value,
+                           'forget': forget}) + '\n'
+        with self._lock:
+            self._append(line)
+            self._units.setdefault(kind, {})[str(key)] = value
+            self._forget(forget)
+
+    def _append(self, lines):
+        with open(self.path, 'a') as f:
+            f.write(lines)
+            f.flush()
+            os.fsync(f.fileno())
+
+    def record_many(self, kind, items):
+        """Append several completed units of one kind with a single sync.
+
+        :param str kind: The kind of the units.
+        :type  items: iterable of (str, object)
+        :param items: The (key, value) of each unit; see L{record}.
+
+        """
+        items = [(str(key), value) for key, value in items]
+        lines = ''.join(
+            json.dumps({'kind': kind, 'key': key, 'value': value}) + '\n'
+            for key, value in items)
+        with self._lock:
+            self._append(lines)
+            units = self._units.setdefault(kind, {})
+            for key, value in items:
+                units[key] = value
+
+    def compact(self):
+        """Rewrite the journal file with only the units it still holds,
+        replacing it atomically.
+
+        """
+        with self._lock:
+            with open(self.path + '.tmp', 'w') as f:
+                for kind, units in self._units.iteritems():
+                    for key, value in units.iteritems():
+                        f.write(json.dumps(
+                            {'kind': kind, 'key': key, 'value': value}))
+                        f.write('\n')
+                f.flush()
+                os.fsync(f.fileno())
+            os.rename(self.path + '.tmp', self.path)
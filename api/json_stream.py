@@ -0,0 +1,98 @@
+"""
+This module contains an incremental reader for the monthly JSON data files.
+Each file maps document ids to award objects at the top level. Rather than
+decoding a whole file into a dict, the reader scans the raw text chunk by
+chunk for the boundaries of each award object and decodes the awards one at a
+time as they complete. Only the braces and strings of the text need to be
+tokenized to find the boundaries, which the regex engine does in C; the award
+objects themselves are decoded with ujson when it is installed.
+
+Peak memory is bounded by one chunk plus the largest single award, instead
+of the size of the largest file.
+
+"""
+import re
+
+try:
+    # roughly 2x faster
+    import ujson as json
+except ImportError:
+    # builtin
+    import json
+
+
+CHUNK_SIZE = 1 << 16
+
+# a complete JSON string, a brace, or the opening quote of a string which is
+# not terminated before the end of the text read so far
+TOKEN_PATTERN = re.compile(r'"(?:[^"\\]|\\.)*"|[{}]|"', re.DOTALL)
+
+
+def iter_award_objects(f, chunk_size=CHUNK_SIZE):
+    """Scan a JSON data file for its award objects without decoding them.
+
+    :param file f: The data file, opened in binary mode.
+    :param int chunk_size: Number of bytes to read from the file at a time.
+    :rtype:  iterator yielding (str, int, str)
+    :return: An iterator over (doc_id, offset, raw) for each award, where raw
+        is the undecoded JSON object of the award and offset is its byte
+        offset in the file.
+    :raises ValueError: If the file ends inside a string.
+
+    """
+    buf = ''
+    base = 0  # file offset of buf[0]
+    pos = 0  # where to resume scanning buf
+    depth = 0
+    doc_id = None
+    start = None
+    while True:
+        chunk = f.read(chunk_size)
+        buf += chunk
+        for match in TOKEN_PATTERN.finditer(buf, pos):
+            token = match.group()
+            if token == '{':
+                if depth == 1:
+                    start = match.start()
+                depth += 1
+            elif token == '}':
+                depth -= 1
+                if depth == 1:
+                    yield (doc_id, base + start, buf[start:match.end()])
+                    start = None
+            elif len(token) == 1:  # string cut off by the end of the chunk
+                if not chunk:
+                    raise ValueError('unterminated string at byte {}'.format(
+                        base + match.start()))
+                pos = match.start()
+                break
+            elif depth == 1:
+                doc_id = json.loads(token)
+            pos = match.end()
+        else:
+            pos = len(buf)
+
+        if not chunk:
+            return
+
+        # drop everything before the award being read, if any
+        keep = pos if start is None else start
+        buf = buf[keep:]
+        base += keep
+        pos -= keep
+        if start is not None:
+            start -= keep
+
+
+def stream_json(filepath, chunk_size=CHUNK_SIZE):
+    """Decode the awards of a JSON data file one at a time.
+
+    :param str filepath: Path of the JSON data file.
+    :param int chunk_size: Number of bytes to read from the file at a time.
+    :rtype:  iterator yielding (str, dict)
+    :return: An iterator over (doc_id, award) in file order.
+
+    """
+    with open(filepath, 'rb') as f:
+        for doc_id, _, raw in iter_award_objects(f, chunk_size):
+            yield (doc_id, json.loads(raw))
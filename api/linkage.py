@@ -0,0 +1,386 @@
+"""
+This module contains a record linkage engine for disambiguating investigators
+(or any other records identified by a name), following the methods outlined
+in db/docs/duplicate-record-detection.md.
+
+Comparing every pair of records is quadratic, so candidate pairs are first
+generated by blocking; only records which share a block are ever compared:
+
+    1.  phonetic:    same Soundex code of the last name and same first initial
+    2.  q-gram:      at least I{min_shared} q-grams of the last name in common,
+                     found through an inverted index from q-grams to records
+    3.  institution: an affiliated institution and last initial in common
+
+Blocks larger than I{max_block_size} are skipped, since a key shared by that
+many records (a common q-gram, say) says little about any one pair.
+
+Each candidate pair is then scored with the cosine similarity of the TF-IDF
+weighted q-gram vectors of the two full names, which is close to the
+SoftTF-IDF idea of tolerating small spelling differences while discounting
+common fragments. Sharing an institution adds a bonus. Scores are computed
+for all candidate pairs at once with sparse matrix operations, and pairs
+which score above a threshold and agree on the first initial are merged.
+The connected components of the matched pairs are the clusters; each is
+labelled with the smallest id among its records as the canonical id.
+
+"""
+import os
+import re
+import csv
+import logging
+import unicodedata
+import collections
+
+import numpy as np
+import scipy.sparse as sp
+from scipy.sparse import csgraph
+
+
+Q = 3
+MAX_BLOCK_SIZE = 200
+MIN_SHARED = 2
+THRESHOLD = 0.8
+INSTITUTION_BONUS = 0.2
+SCORE_CHUNK = 100000
+
+NAME_SUFFIXES = set(['jr', 'sr', 'ii', 'iii', 'iv', 'phd', 'md'])
+TOKEN_PATTERN = re.compile(r'[a-z]+')
+
+SOUNDEX_CODES = {}
+for _letters, _code in (('bfpv', '1'), ('cgjkqsxz', '2'), ('dt', '3'),
+                        ('l', '4'), ('mn', '5'), ('r', '6')):
+    for _letter in _letters:
+        SOUNDEX_CODES[_letter] = _code
+
+
+def name_tokens(name):
+    """Split a name into lowercase ASCII tokens, dropping punctuation and
+    suffixes such as 'Jr' or 'III'.
+
+    :param str name: The name, as unicode or utf-8 encoded str.
+    :rtype:  list of str
+    :return: The tokens, in order.
+
+    """
+    if isinstance(name, str):
+        name = name.decode('utf-8', 'ignore')
+    folded = unicodedata.normalize('NFKD', name).encode('ascii', 'ignore')
+    return [token for token in TOKEN_PATTERN.findall(folded.lower())
+            if token not in NAME_SUFFIXES]
+
+
+def soundex(word):
+    """Compute the Soundex code of a word, e.g. 'robert' -> 'r163'.
+
+    :param str word: A lowercase ASCII word.
+    :rtype:  str
+    :return: The first letter followed by three digits, or '' if the word
+        is empty.
+
+    """
+    if not word:
+        return ''
+
+    digits = []
+    last = SOUNDEX_CODES.get(word[0], '')
+    for letter in word[1:]:
+        code = SOUNDEX_CODES.get(letter, '')
+        if code and code != last:
+            digits.append(code)
+        if letter not in 'hw':  # h and w do not separate equal codes
+            last = code
+    return (word[0] + ''.join(digits) + '000')[:4]
+
+
+def qgrams(text, q=Q):
+    """Return the q-grams of a text, padded so that its first and last
+    characters start and end a q-gram of their own.
+
+    :param str text: The text.
+    :param int q: The length of each q-gram.
+    :rtype:  list of str
+    :return: The q-grams, in order and with repetitions.
+
+    """
+    padded = '#' * (q - 1) + text + '$' * (q - 1)
+    return [padded[start:start + q] for start in xrange(len(padded) - q + 1)]
+
+
+def tfidf_matrix(texts, q=Q):
+    """Build L2-normalized TF-IDF weighted q-gram vectors for texts.
+
+    :type  texts: list of str
+    :param texts: The texts to vectorize.
+    :param int q: The length of each q-gram.
+    :rtype:  L{scipy.sparse.csr_matrix}
+    :return: One row per text, one column per distinct q-gram.
+
+    """
+    vocabulary = {}
+    rows = []
+    cols = []
+    for row, text in enumerate(texts):
+        if not text:
+            continue
+        for gram in qgrams(text, q):
+            rows.append(row)
+            cols.append(vocabulary.setdefault(gram, len(vocabulary)))
+
+    shape = (len(texts), max(len(vocabulary), 1))
+    counts = sp.csr_matrix(
+        (np.ones(len(rows)), (rows, cols)), shape=shape)
+    counts.sum_duplicates()
+
+    df = np.bincount(counts.indices, minlength=shape[1])
+    idf = np.log(float(len(texts)) / np.maximum(df, 1))
+    weighted = counts * sp.diags(idf, 0)
+
+    norms = np.sqrt(np.asarray(weighted.multiply(weighted).sum(axis=1)))
+    norms = norms.ravel()
+    norms[norms == 0] = 1.0
+    return sp.csr_matrix(sp.diags(1.0 / norms, 0) * weighted)
+
+
+def block_pairs(keys, max_block_size=MAX_BLOCK_SIZE):
+    """Generate the pairs of records which share a blocking key.
+
+    :type  keys: list of iterable
+    :param keys: The blocking keys of each record.
+    :param int max_block_size: Blocks with more records are skipped.
+    :rtype:  L{numpy.ndarray} of int64
+    :return: A code i * n + j (with i < j) for each pair, once for every
+        key the pair shares.
+
+    """
+    blocks = collections.defaultdict(list)
+    for row, row_keys in enumerate(keys):
+        for key in set(row_keys):
+            blocks[key].append(row)
+
+    n = len(keys)
+    pairs = [np.zeros(0, dtype=np.int64)]
+    for rows in blocks.itervalues():
+        if 1 < len(rows) <= max_block_size:
+            rows = np.array(sorted(rows), dtype=np.int64)
+            first, second = np.triu_indices(len(rows), 1)
+            pairs.append(rows[first] * n + rows[second])
+    return np.concatenate(pairs)
+
+
+class LinkageEngine(object):
+    """Find clusters of records which refer to the same entity."""
+
+    def __init__(self, ids, names, institutions=None, q=Q,
+                 max_block_size=MAX_BLOCK_SIZE, min_shared=MIN_SHARED):
+        """
+        :type  ids: list of str
+        :param ids: The id of each record.
+        :type  names: list of str
+        :param names: The full name of each record, first name first.
+        :type  institutions: list of iterable
+        :param institutions: The ids of the institutions each record is
+            affiliated with; optional.
+        :param int q: The length of the q-grams used for blocking and scoring.
+        :param int max_block_size: Blocks with more records are skipped.
+        :param int min_shared: Number of last name q-grams two records must
+            share to be compared through q-gram blocking.
+
+        """
+        self.ids = list(ids)
+        self.q = q
+        self.max_block_size = max_block_size
+        self.min_shared = min_shared
+
+        tokens = [name_tokens(name) for name in names]
+        self.full_names = [' '.join(parts) for parts in tokens]
+        self.first_names = [parts[0] if parts else '' for parts in tokens]
+        self.last_names = [parts[-1] if parts else '' for parts in tokens]
+        self.first_initials = np.array(
+            [first[:1] for first in self.first_names], dtype='S1')
+
+        if institutions is None:
+            institutions = [()] * len(self.ids)
+        self.institutions = [set(insts) for insts in institutions]
+
+        self._vectors = tfidf_matrix(self.full_names, q)
+        self._affiliations = self._affiliation_matrix()
+
+    def __len__(self):
+        return len(self.ids)
+
+    def _affiliation_matrix(self):
+        codes = {}
+        rows = []
+        cols = []
+        for row, insts in enumerate(self.institutions):
+            for inst in insts:
+                rows.append(row)
+                cols.append(codes.setdefault(inst, len(codes)))
+        shape = (len(self.ids), max(len(codes), 1))
+        return sp.csr_matrix((np.ones(len(rows)), (rows, cols)), shape=shape)
+
+    def candidate_pairs(self):
+        """Generate the candidate pairs from all three blocking schemes.
+
+        :rtype:  tuple of (L{numpy.ndarray}, L{numpy.ndarray})
+        :return: Row positions (i, j) of each distinct candidate pair.
+
+        """
+        n = len(self.ids)
+        phonetic = [[(soundex(last), first[:1])] if last else []
+                    for first, last in zip(self.first_names, self.last_names)]
+        institution = [[(inst, last[:1]) for inst in insts] if last else []
+                       for insts, last in zip(self.institutions,
+                                              self.last_names)]
+        grams = [qgrams(last, self.q) if last else []
+                 for last in self.last_names]
+
+        shared = block_pairs(grams, self.max_block_size)
+        codes, counts = np.unique(shared, return_counts=True)
+        pairs = np.concatenate([
+            block_pairs(phonetic, self.max_block_size),
+            block_pairs(institution, self.max_block_size),
+            codes[counts >= self.min_shared]
+        ])
+        pairs = np.unique(pairs)
+        logging.info('{} candidate pairs for {} records'.format(
+            len(pairs), n))
+        return pairs // n, pairs % n
+
+    def score(self, first, second):
+        """Score candidate pairs.
+
+        :type  first: L{numpy.ndarray} of int
+        :param first: Row positions of the first record of each pair.
+        :type  second: L{numpy.ndarray} of int
+        :param second: Row positions of the second record of each pair.
+        :rtype:  L{numpy.ndarray} of float
+        :return: The q-gram TF-IDF cosine similarity of the names of each
+            pair, plus the institution bonus if the records share one.
+
+        """
+        scores = np.empty(len(first))
+        for start in xrange(0, len(first), SCORE_CHUNK):
+            i = first[start:start + SCORE_CHUNK]
+            j = second[start:start + SCORE_CHUNK]
+            names = self._vectors[i].multiply(self._vectors[j]).sum(axis=1)
+            insts = self._affiliations[i].multiply(
+                self._affiliations[j]).sum(axis=1)
+            scores[start:start + len(i)] = (
+                np.asarray(names).ravel() +
+                INSTITUTION_BONUS * (np.asarray(insts).ravel() > 0))
+        return scores
+
+    def matches(self, threshold=THRESHOLD):
+        """Find the candidate pairs which refer to the same entity: those
+        which score at least the threshold and agree on the first initial.
+
+        :param float threshold: Minimum score of a match.
+        :rtype:  tuple of (L{numpy.ndarray}, L{numpy.ndarray})
+        :return: Row positions (i, j) of each matching pair.
+
+        """
+        first, second = self.candidate_pairs()
+        keep = ((self.score(first, second) >= threshold) &
+                (self.first_initials[first] == self.first_initials[second]))
+        return first[keep], second[keep]
+
+    def clusters(self, threshold=THRESHOLD):
+        """Cluster the records into entities.
+
+        :param float threshold: Minimum score of a match.
+        :rtype:  dict
+        :return: Maps the id of each record to the canonical id of its
+            cluster, which is the smallest id in the cluster; ids are
+            compared as numbers when they are all numeric.
+
+        """
+        n = len(self.ids)
+        first, second = self.matches(threshold)
+        graph = sp.csr_matrix(
+            (np.ones(len(first)), (first, second)), shape=(n, n))
+        _, labels = csgraph.connected_components(graph, directed=False)
+
+        numeric = all(str(record_id).isdigit() for record_id in self.ids)
+        key = int if numeric else str
+        canonical = {}
+        for record_id, label in zip(self.ids, labels):
+            current = canonical.get(label)
+            if current is None or key(record_id) < key(current):
+                canonical[label] = record_id
+        return {record_id: canonical[label]
+                for record_id, label in zip(self.ids, labels)}
+
+
+def load_pi_records(csv_dir):
+    """Read the PI names and affiliations from the CSV directory.
+
+    :param str csv_dir: Directory with pi-names.csv and pi-affiliations.csv.
+    :rtype:  tuple of (list of str, list of str, list of set)
+    :return: The PI ids, their names, and the ids of their institutions.
+
+    """
+    affiliations = collections.defaultdict(set)
+    with open(os.path.join(csv_dir, 'pi-affiliations.csv'), 'rb') as f:
+        reader = csv.reader(f)
+        next(reader, None)
+        for pi_id, inst_id in reader:
+            affiliations[pi_id].add(inst_id)
+
+    ids = []
+    names = []
+    with open(os.path.join(csv_dir, 'pi-names.csv'), 'rb') as f:
+        reader = csv.reader(f)
+        next(reader, None)
+        for pi_id, name in reader:
+            ids.append(pi_id)
+            names.append(name)
+
+    return ids, names, [affiliations[pi_id] for pi_id in ids]
+
+
+def link_pis(csv_dir, threshold=THRESHOLD):
+    """Cluster the PIs of the CSV directory; see L{LinkageEngine.clusters}.
+
+    :param str csv_dir: Directory with pi-names.csv and pi-affiliations.csv.
+    :param float threshold: Minimum score of a match.
+    :rtype:  dict
+    :return: Maps each PI id to its canonical PI id.
+
+    """
+    ids, names, institutions = load_pi_records(csv_dir)
+    return LinkageEngine(ids, names, institutions).clusters(threshold)
+
+
+def write_clusters(clusters, path):
+    """Write (id, canonical_id) records to a CSV file, sorted by id."""
+    with open(path, 'wb') as f:
+        writer = csv.writer(f)
+        writer.writerow(['pi_id', 'canonical_id'])
+        for record_id in sorted(clusters):
+            writer.writerow([record_id, clusters[record_id]])
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        description='Cluster duplicate PI records into canonical ids.')
+    parser.add_argument(
+        '-c', '--csv-dir', default=os.path.join(
+            os.path.pardir, 'data', 'csv'),
+        help='directory with pi-names.csv and pi-affiliations.csv')
+    parser.add_argument(
+        '-t', '--threshold', type=float, default=THRESHOLD,
+        help='minimum score for two records to be merged')
+    parser.add_argument(
+        '-o', '--outfile', default='pi-clusters.csv',
+        help='CSV file to write (pi_id, canonical_id) records to')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    clusters = link_pis(args.csv_dir, args.threshold)
+    write_clusters(clusters, args.outfile)
+    merged = len(clusters) - len(set(clusters.itervalues()))
+    print '{} records merged into {} clusters'.format(
+        merged, len(set(clusters.itervalues())))
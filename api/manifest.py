@@ -0,0 +1,198 @@
+"""
+This module contains a manifest of the inputs and outputs of each stage that
+derives artifacts from the raw data (the full graph pickle, the BoW corpus,
+the TF-IDF model, the award indices, the writer outputs, ...). For every stage
+the manifest records a checksum of each input file, the parameters the stage
+ran with, and the files it wrote. Before running, a stage asks the manifest
+whether anything changed since it last ran; if nothing did and its outputs
+still exist, the stage can load them instead of recomputing. Stages that can
+be patched in place use L{Manifest.changes} to find exactly which inputs were
+added, modified, or removed.
+
+Checksums are cached by file size and modification time, so checking an
+unchanged input only costs a stat.
+
+The manifest is a JSON file of the form::
+
+    {
+        "files": {<path>: {"size": ..., "mtime": ..., "sha1": ...}},
+        "stages": {
+            <stage>: {
+                "inputs": {<path>: <sha1>},
+                "outputs": [<path>, ...],
+                "params": {...}
+            }
+        }
+    }
+
+Paths are stored relative to the root directory of the manifest.
+
+"""
+import os
+import hashlib
+
+try:
+    import ujson as json
+except ImportError:
+    import json
+
+
+CHUNK_SIZE = 1 << 20
+
+
+def file_checksum(path):
+    """Compute the SHA-1 hex digest of a file's contents.
+
+    :param str path: Path of the file.
+    :rtype:  str
+    :return: The hex digest.
+
+    """
+    sha1 = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), ''):
+            sha1.update(chunk)
+    return sha1.hexdigest()
+
+
+class Manifest(object):
+    """Track input checksums and outputs of derived-artifact stages."""
+
+    def __init__(self, path, root=None):
+        """
+        :param str path: Path of the manifest file; it is created on the
+            first L{record} if it does not exist.
+        :param str root: Directory that recorded paths are relative to;
+            defaults to the directory of the manifest file.
+
+        """
+        self.path = path
+        self.root = os.path.dirname(path) if root is None else root
+        content = self._read()
+        self.files = content.get('files', {})
+        self.stages = content.get('stages', {})
+
+    def _read(self):
+        if not os.path.isfile(self.path):
+            return {}
+        with open(self.path) as f:
+            return json.load(f)
+
+    def _key(self, path):
+        return os.path.relpath(os.path.abspath(path), self.root)
+
+    def _path(self, key):
+        return os.path.normpath(os.path.join(self.root, key))
+
+    def checksum(self, path):
+        """Return the checksum of a file, reusing the cached one if the file's
+        size and modification time have not changed.
+
+        :param str path: Path of the file.
+        :rtype:  str
+        :return: The SHA-1 hex digest of the file.
+
+        """
+        key = self._key(path)
+        stat = os.stat(path)
+        mtime = int(stat.st_mtime * 1000000)  # survives the JSON round trip
+        cached = self.files.get(key)
+        if (cached is not None and cached['size'] == stat.st_size and
+                cached['mtime'] == mtime):
+            return cached['sha1']
+
+        sha1 = file_checksum(path)
+        self.files[key] = {
+            'size': stat.st_size,
+            'mtime': mtime,
+            'sha1': sha1
+        }
+        return sha1
+
+    def changes(self, stage, inputs):
+        """Compare the current inputs of a stage against those recorded the
+        last time it ran.
+
+        :param str stage: Name of the stage.
+        :type  inputs: iterable of str
+        :param inputs: Paths of the stage's current input files.
+        :rtype:  tuple of (list of str, list of str)
+        :return: The paths of inputs which are new or modified, and the paths
+            of recorded inputs which are no longer among the inputs.
+
+        """
+        recorded = self.stages.get(stage, {}).get('inputs', {})
+        current = set()
+        changed = []
+        for path in inputs:
+            key = self._key(path)
+            current.add(key)
+            if recorded.get(key) != self.checksum(path):
+                changed.append(path)
+
+        removed = [self._path(key) for key in recorded if key not in current]
+        return (changed, removed)
+
+    def is_current(self, stage, inputs, params=None):
+        """Check whether a stage's recorded outputs are up to date: the stage
+        has run before with the same parameters, none of its inputs changed
+        since, and all of its outputs still exist.
+
+        :param str stage: Name of the stage.
+        :type  inputs: iterable of str
+        :param inputs: Paths of the stage's current input files.
+        :param dict params: Parameters the stage would run with.
+        :rtype:  bool
+        :return: True if the stage does not need to run.
+
+        """
+        entry = self.stages.get(stage)
+        if entry is None or entry.get('params') != (params or {}):
+            return False
+
+        outputs = (self._path(key) for key in entry['outputs'])
+        if not all(os.path.exists(path) for path in outputs):
+            return False
+
+        changed, removed = self.changes(stage, inputs)
+        return not changed and not removed
+
+    def outputs(self, stage):
+        """Return the paths of the outputs recorded for a stage."""
+        entry = self.stages.get(stage, {})
+        return [self._path(key) for key in entry.get('outputs', [])]
+
+    def record(self, stage, inputs, outputs=(), params=None):
+        """Record a completed run of a stage and save the manifest. The
+        file is re-read first, so the stages other instances recorded since
+        this one was loaded are kept.
+
+        :param str stage: Name of the stage.
+        :type  inputs: iterable of str
+        :param inputs: Paths of the input files the stage ran on.
+        :type  outputs: iterable of str
+        :param outputs: Paths of the files the stage wrote.
+        :param dict params: Parameters the stage ran with.
+
+        """
+        entry = {
+            'inputs': {self._key(path): self.checksum(path)
+                       for path in inputs},
+            'outputs': [self._key(path) for path in outputs],
+            'params': params or {}
+        }
+
+        content = self._read()
+        files = content.get('files', {})
+        files.update(self.files)
+        self.files = files
+        self.stages = content.get('stages', {})
+        self.stages[stage] = entry
+        self.save()
+
+    def save(self):
+        """Write the manifest file, replacing it atomically."""
+        content = {'files': self.files, 'stages': self.stages}
+        with open(self.path + '.tmp', 'w') as f:
+            json.dump(content, f)
+        os.rename(self.path + '.tmp', self.path)
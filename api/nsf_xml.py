@@ -0,0 +1,454 @@
+"""
+This module contains a streaming ingestion pipeline for the raw award data
+downloaded from nsf.gov by db/get_nsf_data.py. Each download is a zip archive
+named <year>.zip holding one XML file per award; the layout of those files is
+described in db/docs/nsf-xml-schema-details.md.
+
+Archives are never read into memory whole. Only the zip central directory is
+read up front; members are decompressed lazily, one at a time, by worker
+processes, and each member is parsed incrementally with iterparse. Parsed
+awards are converted to the same layout as the awards in the monthly JSON
+files (see L{parse_award}) and compiled into a columnar
+L{award_store.AwardStore}.
+
+The XML has no person ids, so PIs and POs are identified by email address or
+name (see L{investigator_id}), never by the numeric ids of the DIA2 data. The
+store is therefore written to its own directory, L{data.NSF_XML_DIR} by
+default, rather than to the store the 'columnar' backend of
+L{data.DataDirectory} reads: mixing the two would split every PI into two
+unrelated vertices. Open it with L{award_store.AwardStore} directly.
+
+The store expects all awards of one source (year and month) to be appended
+together, while a yearly archive is not ordered by date and may hold awards
+which took effect in other years. Awards are therefore first spilled to one
+JSON lines file per effective month in a temporary directory, then appended
+to the store month by month in chronological order. Awards without an
+effective date are stored under January of their archive's year, so that the
+year and month filters of the readers still find them. Memory use stays
+bounded by the worker batches in flight and the award ids seen so far.
+
+"""
+import os
+import re
+import shutil
+import logging
+import zipfile
+import tempfile
+import collections
+import multiprocessing
+import xml.etree.cElementTree as etree
+
+try:
+    import ujson as json
+except ImportError:
+    import json
+
+import award_store
+
+
+BATCH_SIZE = 256
+SPILL_NAME = 'nsf-{:04d}-{:02d}'
+UNDATED_NAME = 'nsf-undated'
+
+# year in the name of a yearly archive, e.g. 2014.zip
+ARCHIVE_YEAR_PATTERN = re.compile(r'(\d{4})')
+
+# NSF writes dates as MM/DD/YYYY; the schema allows xsd:dateTime as well
+US_DATE_PATTERN = re.compile(r'^(\d{1,2})/(\d{1,2})/(\d{4})')
+ISO_DATE_PATTERN = re.compile(r'^(\d{4})-(\d{2})-(\d{2})')
+WHITESPACE_PATTERN = re.compile(r'\s+')
+
+
+def _text(elem, path):
+    """Return the stripped text of a child element, or '' if it is absent."""
+    child = elem.find(path)
+    if child is None or child.text is None:
+        return u''
+    return child.text.strip()
+
+
+def parse_date(text):
+    """Convert a date from the XML into the 'YYYY-MM-DD' form of the JSON.
+
+    :param str text: A date as MM/DD/YYYY or as an ISO date/dateTime.
+    :rtype:  str
+    :return: The date as 'YYYY-MM-DD', or '' if it is missing or malformed.
+
+    """
+    text = text.strip() if text else ''
+    match = US_DATE_PATTERN.match(text)
+    if match is not None:
+        month, day, year = match.groups()
+        return '{}-{:02d}-{:02d}'.format(year, int(month), int(day))
+
+    match = ISO_DATE_PATTERN.match(text)
+    if match is not None:
+        return '-'.join(match.groups())
+    return ''
+
+
+def investigator_id(first_name, last_name, email):
+    """Derive an id for an investigator. The XML has no person ids, so the
+    email address is used when there is one, and the name otherwise. These
+    ids never match the numeric PI ids of the DIA2 data, so awards parsed
+    from the XML must not be mixed with awards from the JSON files.
+
+    :param str first_name: The investigator's first name.
+    :param str last_name: The investigator's last name.
+    :param str email: The investigator's email address; may be empty.
+    :rtype:  unicode
+    :return: The lowercased email address, or 'last, first' lowercased with
+        runs of whitespace collapsed.
+
+    """
+    if email:
+        return email.strip().lower()
+    name = u'{}, {}'.format(last_name, first_name).strip(u', ')
+    return WHITESPACE_PATTERN.sub(u' ', name).lower()
+
+
+def _funding_agents(organization, programs):
+    """Build the fundingAgent list of an award: one agent per program
+    element, under the award's directorate and division.
+
+    """
+    code = _text(organization, 'Code')
+    directorate = {
+        'id': code[:2],
+        'name': _text(organization, 'Directorate/LongName'),
+        'abbr': _text(organization, 'Directorate/Abbreviation')
+    }
+    division = {
+        'id': code[:4],
+        'name': _text(organization, 'Division/LongName'),
+        'abbr': _text(organization, 'Division/Abbreviation')
+    }
+    return [{'dir': dict(directorate), 'div': dict(division),
+             'pgm': {'id': _text(program, 'Code'),
+                     'name': _text(program, 'Text')}}
+            for program in programs]
+
+
+def parse_award(f):
+    """Incrementally parse one award XML file. Each top-level element of the
+    award is converted as soon as it is complete and then cleared, so the
+    parse never holds more than one such element in memory.
+
+    :param file f: The award XML file, opened in binary mode.
+    :rtype:  dict
+    :return: The award, in the same layout as the awards in the JSON data
+        files; PI and PO ids are derived from names (see
+        L{investigator_id}).
+    :raises SyntaxError: If the XML is malformed or has no AwardID.
+
+    """
+    award = {
+        'awardID': u'',
+        'title': u'',
+        'abstract': u'',
+        'effectiveDate': '',
+        'expirationDate': '',
+        'PIcoPI': [],
+        'PO': [],
+        'fundingAgent': []
+    }
+    organization = None
+    programs = []
+    depth = 0
+    for event, elem in etree.iterparse(f, events=('start', 'end')):
+        if event == 'start':
+            depth += 1
+            continue
+
+        depth -= 1
+        if depth != 2:  # only handle the children of <Award>
+            continue
+
+        tag = elem.tag
+        text = (elem.text or u'').strip()
+        if tag == 'AwardID':
+            award['awardID'] = text
+        elif tag == 'AwardTitle':
+            award['title'] = text
+        elif tag == 'AbstractNarration':
+            award['abstract'] = text
+        elif tag == 'AwardEffectiveDate':
+            award['effectiveDate'] = parse_date(text)
+        elif tag == 'AwardExpirationDate':
+            award['expirationDate'] = parse_date(text)
+        elif tag == 'Investigator':
+            pi_id = investigator_id(_text(elem, 'FirstName'),
+                                    _text(elem, 'LastName'),
+                                    _text(elem, 'EmailAddress'))
+            if pi_id and pi_id not in award['PIcoPI']:
+                award['PIcoPI'].append(pi_id)
+        elif tag == 'ProgramOfficer':
+            po_id = WHITESPACE_PATTERN.sub(
+                u' ', _text(elem, 'SignBlockName')).lower()
+            if po_id and po_id not in award['PO']:
+                award['PO'].append(po_id)
+        elif tag == 'Organization':
+            organization = elem  # converted once the programs are known
+            continue
+        elif tag == 'ProgramElement':
+            programs.append(elem)
+            continue
+        elem.clear()
+
+    if not award['awardID']:
+        raise SyntaxError('award has no AwardID')
+    if organization is not None:
+        award['fundingAgent'] = _funding_agents(organization, programs)
+    return award
+
+
+# zip files opened by this (worker) process, by path
+_archives = {}
+
+
+def _open_archive(zip_path):
+    archive = _archives.get(zip_path)
+    if archive is None:
+        archive = _archives[zip_path] = zipfile.ZipFile(zip_path)
+    return archive
+
+
+def _parse_members(zip_path, names):
+    """Parse a batch of members of an archive; run in worker processes by
+    L{iter_archive_awards}. Members which fail to parse are logged and
+    skipped.
+
+    """
+    archive = _open_archive(zip_path)
+    awards = []
+    for name in names:
+        member = archive.open(name)
+        try:
+            awards.append(parse_award(member))
+        except SyntaxError as err:
+            logging.warning('skipping {} in {}: {}'.format(
+                name, zip_path, err))
+        finally:
+            member.close()
+    return awards
+
+
+def archive_batches(zip_paths, batch_size=BATCH_SIZE):
+    """List the XML members of each archive in batches, reading only the zip
+    central directories.
+
+    :type  zip_paths: iterable of str
+    :param zip_paths: Paths of the yearly zip archives.
+    :param int batch_size: Number of members per batch.
+    :rtype:  iterator yielding (str, list of str)
+    :return: An iterator over (zip_path, member names).
+
+    """
+    for zip_path in zip_paths:
+        logging.info('Reading archive {}'.format(zip_path))
+        archive = zipfile.ZipFile(zip_path)
+        try:
+            names = [info.filename for info in archive.infolist()
+                     if info.filename.lower().endswith('.xml')]
+        finally:
+            archive.close()
+
+        for start in xrange(0, len(names), batch_size):
+            yield (zip_path, names[start:start + batch_size])
+
+
+def archive_year(zip_path):
+    """Return the year of a yearly archive from its file name, or None if
+    the name has no year.
+
+    """
+    match = ARCHIVE_YEAR_PATTERN.search(os.path.basename(zip_path))
+    return int(match.group(1)) if match is not None else None
+
+
+def _iter_batches(zip_paths, workers=None, batch_size=BATCH_SIZE,
+                  prefetch=None):
+    """Parse the awards of the yearly archives batch by batch; see
+    L{iter_archive_awards}. Yields (zip_path, awards) per batch.
+
+    """
+    batches = archive_batches(zip_paths, batch_size)
+    if not workers or workers <= 1:
+        for zip_path, names in batches:
+            yield (zip_path, _parse_members(zip_path, names))
+        return
+
+    prefetch = prefetch or 2 * workers
+    pool = multiprocessing.Pool(workers)
+    pending = collections.deque()
+    try:
+        for zip_path, names in batches:
+            pending.append((zip_path, pool.apply_async(
+                _parse_members, (zip_path, names))))
+            if len(pending) > prefetch:
+                zip_path, result = pending.popleft()
+                yield (zip_path, result.get())
+
+        while pending:
+            zip_path, result = pending.popleft()
+            yield (zip_path, result.get())
+    finally:
+        # also reached if the consumer stops early
+        pool.terminate()
+        pool.join()
+
+
+def iter_archive_awards(zip_paths, workers=None, batch_size=BATCH_SIZE,
+                        prefetch=None):
+    """Parse the awards of the yearly archives, in archive and member order.
+
+    With I{workers} greater than 1, batches of members are parsed in a pool
+    of that many processes, and at most I{prefetch} batches are parsed ahead
+    of the one being consumed.
+
+    :type  zip_paths: iterable of str
+    :param zip_paths: Paths of the yearly zip archives.
+    :param int workers: Number of processes to parse members with.
+    :param int batch_size: Number of members handed to a worker at a time.
+    :param int prefetch: Maximum number of batches parsed ahead of the
+        consumer; defaults to twice the number of workers.
+    :rtype:  iterator yielding dict
+    :return: An iterator over the parsed awards; see L{parse_award}.
+
+    """
+    batches = _iter_batches(zip_paths, workers, batch_size, prefetch)
+    try:
+        for _, awards in batches:
+            for award in awards:
+                yield award
+    finally:
+        batches.close()  # stop the pool if the consumer stops early
+
+
+def _source(award, year=None):
+    """Return the yyyymm source of an award, from its effective date, or
+    January of the given archive year if it has none (0 without a year).
+
+    """
+    date = award['effectiveDate']
+    if date:
+        return int(date[:4]) * 100 + int(date[5:7])
+    return year * 100 + 1 if year else 0
+
+
+def _sourced(batches):
+    """Pair each award of (zip_path, awards) batches with its source."""
+    for zip_path, awards in batches:
+        year = archive_year(zip_path)
+        for award in awards:
+            yield (_source(award, year), award)
+
+
+def _spill(sourced, spill_dir):
+    """Append (source, award) pairs to one JSON lines file per source,
+    skipping awards whose id was already seen. Returns the spilled sources.
+
+    """
+    seen = set()
+    duplicates = 0
+    undated = 0
+    sources = set()
+    spills = {}
+    try:
+        for source, award in sourced:
+            award_id = award['awardID']
+            if award_id in seen:
+                duplicates += 1
+                continue
+            seen.add(award_id)
+
+            if not award['effectiveDate']:
+                undated += 1
+            f = spills.get(source)
+            if f is None:
+                path = os.path.join(spill_dir, str(source))
+                f = spills[source] = open(path, 'ab')
+                sources.add(source)
+            f.write(json.dumps(award))
+            f.write('\n')
+
+            # an archive only touches a few months; don't hold every month
+            # of every year open at once
+            if len(spills) > 64:
+                for spill in spills.values():
+                    spill.close()
+                spills.clear()
+    finally:
+        for spill in spills.values():
+            spill.close()
+
+    if duplicates:
+        logging.info('skipped {} awards listed in more than one '
+                     'archive'.format(duplicates))
+    if undated:
+        logging.info('stored {} awards without an effective date under '
+                     'their archive year'.format(undated))
+    return sources
+
+
+def _spilled_documents(spill_dir, sources):
+    for source in sorted(sources):
+        year, month = divmod(source, 100)
+        name = SPILL_NAME.format(year, month) if source else UNDATED_NAME
+        with open(os.path.join(spill_dir, str(source)), 'rb') as f:
+            for line in f:
+                award = json.loads(line)
+                yield (source, name, award['awardID'], award)
+
+
+def compile_xml_store(zip_paths, dirpath, workers=None,
+                      batch_size=BATCH_SIZE, flush_every=10000):
+    """Compile the awards of the yearly NSF archives into a columnar store.
+
+    Awards are keyed by their award id (the XML has no document ids) and
+    stored under the year and month of their effective date, with the name
+    'nsf-YYYY-MM' as source filename. Awards without an effective date are
+    stored under January of the year in their archive's name, or under
+    source 0 if the name has no year. An award listed in more than one
+    archive is kept as first read.
+
+    :type  zip_paths: iterable of str
+    :param zip_paths: Paths of the yearly zip archives.
+    :param str dirpath: Directory to write the store to.
+    :param int workers: Number of processes to parse members with.
+    :param int batch_size: Number of members handed to a worker at a time.
+    :param int flush_every: Number of rows to buffer between store writes.
+    :rtype:  L{award_store.AwardStore}
+    :return: The store which was written, opened for reading.
+
+    """
+    spill_dir = tempfile.mkdtemp(prefix='nsf-xml-')
+    try:
+        batches = _iter_batches(zip_paths, workers, batch_size)
+        sources = _spill(_sourced(batches), spill_dir)
+        documents = _spilled_documents(spill_dir, sources)
+        return award_store.compile_store(documents, dirpath, flush_every)
+    finally:
+        shutil.rmtree(spill_dir)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        description='Compile yearly NSF XML zip archives into an award store.')
+    parser.add_argument(
+        'archives', nargs='+',
+        help='paths of the <year>.zip archives, in the order to read them')
+    parser.add_argument(
+        '-o', '--outdir', default=os.path.join(
+            os.path.pardir, 'data', 'nsf-xml'),
+        help='directory to write the award store to')
+    parser.add_argument(
+        '-w', '--workers', type=int, default=multiprocessing.cpu_count(),
+        help='number of processes to parse awards with')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    store = compile_xml_store(args.archives, args.outdir, args.workers)
+    print store
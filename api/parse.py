@@ -25,9 +25,456 @@ import igraph
 import pandas as pd
 
 import data
+import award_table
+import csr_graph
 
 
-def pi_award_graph(all_edge_attributes=True, **kwargs):
+# parameters of a scan which only change how fast it runs
+PARALLELISM_PARAMS = ('workers', 'prefetch')
+
+# parameters the saved full graph is parsed with; the version is bumped when
+# the layout of the saved graph or award table changes, so that the ones
+# saved before are parsed again rather than loaded or patched
+FULL_GRAPH_PARAMS = {
+    'version': 2,
+    'all_edge_attributes': False,
+    'simple': False,
+    'dates': False
+}
+
+
+class AwardSink(object):
+    """Base class for the consumers of an L{AwardScan}. Each sink receives
+    every award of the scan through L{consume} and builds its output from
+    them; L{result} returns that output once the scan is done.
+
+    """
+
+    def consume(self, award_data):
+        """Process a single award parsed from the JSON files.
+
+        :param dict award_data: The award, as yielded by
+            L{data.DataDirectory.awards}.
+
+        """
+        raise NotImplementedError
+
+    def result(self):
+        """Return the output built from all awards consumed so far."""
+        raise NotImplementedError
+
+
+class AwardScan(object):
+    """Fill any number of L{AwardSink} instances from a single pass over the
+    award data, so that the JSON files are decoded only once no matter how
+    many outputs are built from them.
+
+    Usage::
+
+        scan = AwardScan()
+        scan.register('graph', GraphSink())
+        scan.register('pis', PiIdSink())
+        results = scan.run()  # {'graph': <Graph>, 'pis': set([...])}
+
+    """
+
+    def __init__(self, **kwargs):
+        """
+        :param kwargs: Filtering and parallelism parameters passed through to
+            L{data.DataDirectory.awards}.
+
+        """
+        self.kwargs = kwargs
+        self.sinks = []
+
+    def register(self, name, sink):
+        """Register a sink to be filled by the scan.
+
+        :param str name: Key of the sink's result in the output of L{run}.
+        :param sink: The sink instance.
+        :type  sink: L{AwardSink}
+        :rtype:  L{AwardSink}
+        :return: The sink which was registered.
+        :raises KeyError: If a sink is already registered under the name.
+
+        """
+        if name in dict(self.sinks):
+            raise KeyError('sink already registered: {}'.format(name))
+        self.sinks.append((name, sink))
+        return sink
+
+    def run(self):
+        """Pass every award to every registered sink, then collect results.
+
+        :rtype:   dict
+        :return:  The result of each sink, keyed by its registered name.
+
+        """
+        consumers = [sink.consume for _, sink in self.sinks]
+        awards_directory = data.DataDirectory()
+        for award_data in awards_directory.awards(**self.kwargs):
+            for consume in consumers:
+                consume(award_data)
+
+        return {name: sink.result() for name, sink in self.sinks}
+
+
+class GraphSink(AwardSink):
+    """Build the PI collaboration graph; see L{pi_award_graph}. The
+    attributes of the awards are collected in an L{award_table.AwardTable},
+    available as the I{table} attribute of the sink once it is done.
+
+    Adding vertices and edges to an igraph Graph one at a time rebuilds its
+    indices on every call, which makes the build quadratic. Instead, the
+    vertex names and edge endpoints are collected as plain lists while
+    consuming the awards, and the graph is created in one call by
+    L{result}.
+
+    With I{simple}, the parallel edges between two PIs are collapsed as
+    they are consumed: each pair of PIs gets one edge, whose 'weight' is the
+    number of awards they share, and with I{dates} also the 'firstDate' and
+    'lastDate' of the effective dates of those awards.
+
+    """
+
+    def __init__(self, all_edge_attributes=False, simple=False, dates=False):
+        if simple and all_edge_attributes:
+            raise ValueError('the edges of a simple graph stand for several '
+                             'awards; they cannot have all edge attributes')
+        self.all_edge_attributes = all_edge_attributes
+        self.simple = simple
+        self.dates = dates
+        self.vertex_names = []
+        self.vertex_index = {}  # PI ID -> vertex index
+        self.edges = []
+        self.edge_awards = []  # index into the award table of each edge
+        self.table = award_table.AwardTable()
+
+        # simple graphs only
+        self.edge_index = {}  # (lower, higher vertex index) -> edge index
+        self.weights = []
+        self.first_dates = []
+        self.last_dates = []
+
+    def consume(self, award_data):
+        vertex_index = self.vertex_index
+
+        # get list of PIs from JSON data; add all to graph
+        pi_set = set()
+        for pi_id in award_data['PIcoPI']:
+            pi_id = str(pi_id)
+            pi_set.add(pi_id)
+
+            if pi_id not in vertex_index:
+                vertex_index[pi_id] = len(self.vertex_names)
+                self.vertex_names.append(pi_id)
+
+        # there may be more than one funding agent
+        fa_dirs = []
+        fa_divs = []
+        fa_pgms = []
+        for agent in award_data['fundingAgent']:
+            fa_dirs.append(agent['dir']['id'])
+            fa_divs.append(agent['div']['id'])
+            fa_pgms.append(agent['pgm']['id'])
+
+        # the attributes are stored once per award, not once per edge
+        award_index = self.table.append({
+            'PIcoPI': [str(pi_id) for pi_id in award_data['PIcoPI']],
+            'source': award_source(award_data),
+            'awardID': str(award_data['awardID']),
+            'abstract': award_data['abstract'].encode('utf-8'),
+            'title': award_data['title'].encode('utf-8'),
+            'effectiveDate': award_data['effectiveDate'],
+            'expirationDate': award_data['expirationDate'],
+            'PO': award_data['PO'],
+            'dir': ','.join(fa_dirs),
+            'div': ','.join(fa_divs),
+            'pgm': ','.join(fa_pgms)
+        })
+
+        # pair up every PI with every other for this award
+        pairs = itertools.combinations(pi_set, 2)
+        if self.simple:
+            self._add_weighted_edges(pairs, award_data['effectiveDate'])
+            return
+
+        for source, target in pairs:
+            self.edges.append((vertex_index[source], vertex_index[target]))
+            self.edge_awards.append(award_index)
+
+    def _add_weighted_edges(self, pairs, date):
+        vertex_index = self.vertex_index
+        edge_index = self.edge_index
+        date = date or None  # awards without a date do not move the range
+        for source, target in pairs:
+            source = vertex_index[source]
+            target = vertex_index[target]
+            key = (source, target) if source < target else (target, source)
+            edge = edge_index.get(key)
+            if edge is None:
+                edge_index[key] = len(self.edges)
+                self.edges.append((source, target))
+                self.weights.append(1)
+                self.first_dates.append(date)
+                self.last_dates.append(date)
+                continue
+
+            self.weights[edge] += 1
+            if date is not None:
+                if self.first_dates[edge] is None or \
+                        date < self.first_dates[edge]:
+                    self.first_dates[edge] = date
+                if self.last_dates[edge] is None or \
+                        date > self.last_dates[edge]:
+                    self.last_dates[edge] = date
+
+    @classmethod
+    def from_graph(cls, g, table, all_edge_attributes=False):
+        """Create a sink which continues building a graph saved earlier, so
+        awards can be added to or removed from it.
+
+        :type  g: L{igraph.Graph}
+        :param g: A graph built by a L{GraphSink}.
+        :type  table: L{award_table.AwardTable}
+        :param table: The award table of the graph.
+        :param bool all_edge_attributes: See L{pi_award_graph}.
+        :rtype:  L{GraphSink}
+
+        """
+        sink = cls(all_edge_attributes)
+        sink.vertex_names = g.vs['name'] if g.vcount() else []
+        sink.vertex_index = {name: index for index, name
+                             in enumerate(sink.vertex_names)}
+        sink.edges = g.get_edgelist()
+        sink.edge_awards = (g.es[award_table.EDGE_ATTRIBUTE] if g.ecount()
+                            else [])
+        sink.table = table
+        return sink
+
+    def remove_sources(self, sources):
+        """Remove the awards of some months, along with their edges and the
+        PIs which are left without any award. The remaining vertices and
+        edges keep their relative order.
+
+        :param sources: The months to remove, as YYYYMM.
+        :type  sources: iterable of int
+        :rtype:  int
+        :return: The number of awards removed.
+        :raises ValueError: If the sink builds a simple graph, whose edges do
+            not record their awards.
+
+        """
+        if self.simple:
+            raise ValueError('awards cannot be removed from a simple graph')
+
+        sources = set(sources)
+        keep = [index for index, source
+                in enumerate(self.table.columns['source'])
+                if source not in sources]
+        removed = len(self.table) - len(keep)
+        if not removed:
+            return 0
+
+        new_award = {old: new for new, old in enumerate(keep)}
+        self.table = self.table.select(keep)
+        kept_edges = [(edge, new_award[award]) for edge, award
+                      in zip(self.edges, self.edge_awards)
+                      if award in new_award]
+        self.edges = [edge for edge, _ in kept_edges]
+        self.edge_awards = [award for _, award in kept_edges]
+
+        pis = set(pi_id for pi_ids in self.table.columns['PIcoPI']
+                  for pi_id in pi_ids)
+        vertex_names = [name for name in self.vertex_names if name in pis]
+        if len(vertex_names) < len(self.vertex_names):
+            vertex_index = {name: index for index, name
+                            in enumerate(vertex_names)}
+            new_vertex = [vertex_index.get(name) for name in self.vertex_names]
+            self.edges = [(new_vertex[source], new_vertex[target])
+                          for source, target in self.edges]
+            self.vertex_names = vertex_names
+            self.vertex_index = vertex_index
+        return removed
+
+    def edge_attribute_columns(self):
+        """Return the value of each edge attribute for every edge, in edge
+        order, as expected by the igraph constructor. Every edge gets the
+        index of its award in the table, and its awardID and label; with
+        I{all_edge_attributes}, the other award attributes are copied onto
+        the edges as well. The edges of a simple graph get their 'weight',
+        and with I{dates} their 'firstDate' and 'lastDate', instead.
+
+        :rtype:  dict
+        :return: List of values by attribute name.
+
+        """
+        if not self.edges:
+            return {}
+
+        if self.simple:
+            columns = {'weight': self.weights}
+            if self.dates:
+                columns['firstDate'] = self.first_dates
+                columns['lastDate'] = self.last_dates
+            return columns
+
+        names = award_table.EDGE_COLUMNS if self.all_edge_attributes else []
+        columns = {name: [self.table.columns[name][i]
+                          for i in self.edge_awards]
+                   for name in names}
+        columns['awardID'] = [self.table.columns['awardID'][i]
+                              for i in self.edge_awards]
+        columns['label'] = columns['awardID']
+        columns[award_table.EDGE_ATTRIBUTE] = self.edge_awards
+        return columns
+
+    def result(self):
+        return igraph.Graph(
+            n=len(self.vertex_names), edges=self.edges,
+            vertex_attrs={'name': self.vertex_names,
+                          'label': list(self.vertex_names)},
+            edge_attrs=self.edge_attribute_columns())
+
+
+class PiIdSink(AwardSink):
+    """Collect the set of all PI IDs; see L{all_pi_ids_from_files}."""
+
+    def __init__(self):
+        self.pi_ids = set()
+
+    def consume(self, award_data):
+        for pi_id in award_data['PIcoPI']:
+            self.pi_ids.add(str(pi_id))
+
+    def result(self):
+        return self.pi_ids
+
+
+class FundingAgentSink(AwardSink):
+    """Build the funding agent frame; see L{parse_funding_agents}."""
+
+    columns = [
+        'pi_id', 'award_id',
+        'dir_id', 'dir_name', 'dir_abbr',
+        'div_id', 'div_name', 'div_abbr',
+        'pgm_id', 'pgm_name'
+    ]
+
+    def __init__(self):
+        self.all_records = []
+
+    def consume(self, award_data):
+        self.all_records += _parse_funding_agent(award_data)
+
+    def result(self):
+        df = pd.DataFrame(self.all_records, columns=self.columns)
+        return df.set_index('pi_id')
+
+
+class PairingsSink(AwardSink):
+    """Build the PI/award pairings frame; see L{frame_pi_award_pairings}."""
+
+    def __init__(self):
+        self.records = []
+
+    def consume(self, award_data):
+        award_id = str(award_data['awardID'])
+        pi_list = [str(pi_id) for pi_id in award_data['PIcoPI']]
+        for pi_id in pi_list:
+            self.records.append((pi_id, award_id))
+
+    def result(self):
+        df = pd.DataFrame(self.records, columns=['pi_id', 'award_id'])
+        return df.set_index('pi_id')
+
+
+class AbstractsSink(AwardSink):
+    """Build the award abstracts frame; see L{frame_abstracts}."""
+
+    def __init__(self):
+        self.records = []
+
+    def consume(self, award_data):
+        award_id = str(award_data['awardID'])
+        abstract = award_data['abstract'].encode('utf-8')
+        self.records.append((award_id, abstract))
+
+    def result(self):
+        df = pd.DataFrame(self.records, columns=['award_id', 'abstract'])
+        return df.set_index('award_id')
+
+
+def award_source(award_data):
+    """Return the month an award's data comes from, as YYYYMM. The JSON
+    files hold the awards taking effect in their month, so this is the month
+    of the effective date; 0 if the award has none.
+
+    :param dict award_data: The award.
+    :rtype:  int
+
+    """
+    date = award_data.get('effectiveDate') or ''
+    try:
+        return int(date[:4]) * 100 + int(date[5:7])
+    except ValueError:
+        return 0
+
+
+def _file_source(filepath):
+    """Return the month of a JSON data file (docs-YYYY-MM.json) as
+    YYYYMM.
+
+    """
+    _, year, month = os.path.basename(filepath).split('.')[0].split('-')
+    return int(year) * 100 + int(month)
+
+
+def scan_all(all_edge_attributes=False, **kwargs):
+    """Build the outputs of L{pi_award_graph}, L{parse_funding_agents},
+    L{frame_pi_award_pairings}, L{frame_abstracts}, and
+    L{all_pi_ids_from_files} from one pass over the JSON files.
+
+    :param bool all_edge_attributes: See L{pi_award_graph}.
+    :param kwargs: Filtering parameters; see L{pi_award_graph}.
+
+    :rtype:   dict
+    :return:  The outputs, keyed by 'graph', 'award_table',
+        'funding_agents', 'pairings', 'abstracts', and 'pi_ids'.
+
+    """
+    scan = AwardScan(**kwargs)
+    graph_sink = scan.register('graph', GraphSink(all_edge_attributes))
+    scan.register('funding_agents', FundingAgentSink())
+    scan.register('pairings', PairingsSink())
+    scan.register('abstracts', AbstractsSink())
+    scan.register('pi_ids', PiIdSink())
+    results = scan.run()
+    results['award_table'] = graph_sink.table
+    return results
+
+
+def scan_params(**kwargs):
+    """Return the parameters of a scan which select its awards, to record
+    with a stage in the manifest; the parallelism parameters are left out,
+    since they do not change the output.
+
+    :param kwargs: Filtering and parallelism parameters; see L{AwardScan}.
+    :rtype:  dict
+
+    """
+    return {name: value for name, value in kwargs.iteritems()
+            if name not in PARALLELISM_PARAMS}
+
+
+def _scan_one(sink, **kwargs):
+    scan = AwardScan(**kwargs)
+    scan.register('result', sink)
+    return scan.run()['result']
+
+
+def pi_award_graph(all_edge_attributes=False, simple=False, dates=False,
+                   **kwargs):
     """Parse the json files for the given years/months into an igraph
     Graph object. The graph is constructed by creating a vertex for
     every PIcoPI ID and an edge for every collaborative effort
@@ -51,88 +498,136 @@ def pi_award_graph(all_edge_attributes=True, **kwargs):
     :param int month_end: Last month in range to parse.
     :param int file_limit: Limits the number of files parsed; note
         this option overrides the year/month params
-    :param bool all_edge_attributes: If False, only the awardID is added as an
-        attribute for each, otherwise everything is; default is True.
+    :param bool all_edge_attributes: If False, only the awardID and the index
+        of the award in the award table are added as attributes for each
+        edge, otherwise everything is; default is False. See
+        L{pi_award_graph_and_table} for the table.
+    :param bool simple: If True, build a simple graph instead, with one edge
+        for each pair of PIs who share any award; its 'weight' attribute is
+        the number of awards they share. This cannot be combined with
+        all_edge_attributes.
+    :param bool dates: If True, the edges of a simple graph also get the
+        'firstDate' and 'lastDate' on which the shared awards took effect.
 
     :rtype:   L{igraph.Graph}
     :returns: Graph constructed from JSON data files parsed.
 
     """
-    g = igraph.Graph()
+    return pi_award_graph_and_table(
+        all_edge_attributes, simple, dates, **kwargs)[0]
 
-    # parse the list of JSON files from the data directory
-    awards_directory = data.DataDirectory()
-    awards = awards_directory.awards(**kwargs)
 
-    pis_seen_set = set()
-    for award_data in awards:
+def pi_award_graph_and_table(all_edge_attributes=False, simple=False,
+                             dates=False, **kwargs):
+    """Parse the json files into the PI collaboration graph, along with the
+    table of award attributes its edges index into through their 'award'
+    attribute. See L{pi_award_graph} for the parameters.
 
-        # get list of PIs from JSON data; add all to graph
-        pi_set = set()
-        for pi_id in award_data['PIcoPI']:
-            pi_id = str(pi_id)
-            pi_set.add(pi_id)
+    :rtype:   tuple of (L{igraph.Graph}, L{award_table.AwardTable})
+    :returns: The graph and its award table.
 
-            if pi_id not in pis_seen_set:
-                g.add_vertex(pi_id, label=pi_id)
-                pis_seen_set.add(pi_id)
+    """
+    sink = GraphSink(all_edge_attributes, simple, dates)
+    return (_scan_one(sink, **kwargs), sink.table)
 
-        # pair up every PI with every other for this award
-        pi_combos = itertools.combinations(pi_set, 2)
-        award_id = str(award_data['awardID'])
 
-        edge_attributes = {
-            'awardID': award_id,
-            'label': award_id
-        }
-        # Yes, this is quite a lot of duplicate information being
-        # added to the graph. It is yet to be seen whether or not
-        # it is truly useful to do this. It is mostly for
-        # convenience. It may be better to only add 'awardID' and
-        # 'label', then look up the rest in tables.
-        if all_edge_attributes:
-
-            # there may be more than one funding agent
-            fa_dirs = []
-            fa_divs = []
-            fa_pgms = []
-            for agent in award_data['fundingAgent']:
-                fa_dirs.append(agent['dir']['id'])
-                fa_divs.append(agent['div']['id'])
-                fa_pgms.append(agent['pgm']['id'])
-
-            edge_attributes.update({
-                'abstract': award_data['abstract'].encode('utf-8'),
-                'title': award_data['title'].encode('utf-8'),
-                'effectiveDate': award_data['effectiveDate'],
-                'expirationDate': award_data['expirationDate'],
-                'PO': award_data['PO'],
-                'dir': ','.join(fa_dirs),
-                'div': ','.join(fa_divs),
-                'pgm': ','.join(fa_pgms)
-            })
-
-        for edge in pi_combos:
-            g.add_edge(edge[0], edge[1], **edge_attributes)
-
-        #print "award_id: {}".format(award_id)
-        #print "pi set: {}".format(pi_set)
-        #print "new edge list: {}".format(pi_combos)
-        #print "number of vertices: {}".format(len(g.vs))
-        #print "number of edges: {}".format(len(g.es))
+def parse_full_graph(force=False):
+    """Parse through all data and save it to a pickle file. If the manifest
+    shows that no data file changed since the pickle was last written, with
+    the same L{FULL_GRAPH_PARAMS}, the saved graph is loaded instead of being
+    parsed again.
+
+    :param bool force: If True, always parse the graph from the data.
+    :rtype:  L{igraph.Graph}
+    :return: The graph which was parsed from the full dataset.
 
+    """
+    stage = 'full-graph'
+    inputs = data.DataDirectory().input_files()
+    outputs = [data.FULL_GRAPH_FILE, data.AWARD_TABLE_FILE,
+               os.path.join(data.FULL_GRAPH_CSR_DIR, csr_graph.META_FILE)]
+    manifest = data.load_manifest()
+    params = FULL_GRAPH_PARAMS
+    if not force and manifest.is_current(stage, inputs, params):
+        logging.info('full graph is up to date; loading it')
+        return data.load_full_graph()
+
+    g, table = pi_award_graph_and_table(
+        params['all_edge_attributes'], params['simple'], params['dates'])
+    data.save_full_graph(g)
+    data.save_award_table(table)
+    manifest.record(stage, inputs, outputs, params)
     return g
 
 
-def parse_full_graph():
-    """Parse through all data and save it to a pickle file.
+def update_full_graph(new_files=None):
+    """Patch the saved full graph with the months whose JSON files were
+    added or revised since it was saved, instead of parsing all of them
+    again. The awards of a revised or removed month are removed from the
+    graph along with their edges, then the awards of each new or revised
+    month are added, so a revision replaces the month's edges rather than
+    duplicating them. The months included are recorded in the manifest
+    (by input file) and in the award table (by award); see
+    L{award_table.AwardTable.sources}.
+
+    Only the changed months are parsed, so the cost of a monthly refresh
+    follows the size of the new data. Vertices of PIs which first appear in
+    a revised month are appended after all others, so the vertex order may
+    differ from that of a full parse; the vertices and edges do not.
 
+    If there is no saved graph and award table to patch, they were saved
+    with other L{FULL_GRAPH_PARAMS}, or the data directory uses the columnar
+    backend, the full graph is parsed instead; see L{parse_full_graph}.
+
+    :param list new_files: Paths of JSON files to apply even if the manifest
+        does not show them as changed.
     :rtype:  L{igraph.Graph}
-    :return: The graph which was parsed from the full dataset.
+    :return: The updated graph.
 
     """
-    g = pi_award_graph()
+    stage = 'full-graph'
+    data_directory = data.DataDirectory()
+    inputs = data_directory.input_files()
+    outputs = [data.FULL_GRAPH_FILE, data.AWARD_TABLE_FILE,
+               os.path.join(data.FULL_GRAPH_CSR_DIR, csr_graph.META_FILE)]
+    manifest = data.load_manifest()
+    params = FULL_GRAPH_PARAMS
+    recorded = manifest.stages.get(stage)
+    if (data_directory.backend != 'json' or recorded is None or
+            not all(os.path.exists(path) for path in outputs)):
+        logging.info('no saved full graph to update; parsing it')
+        return parse_full_graph(force=True)
+    if recorded.get('params') != params:
+        logging.info('saved full graph is out of date; parsing it')
+        return parse_full_graph(force=True)
+
+    changed, removed = manifest.changes(stage, inputs)
+    changed = sorted(set(changed) |
+                     set(os.path.abspath(path) for path in new_files or ()))
+    if not changed and not removed:
+        logging.info('full graph is up to date; loading it')
+        return data.load_full_graph()
+
+    table = data.load_award_table()
+    if 'source' not in table.columns:  # saved before months were recorded
+        logging.info('saved full graph does not record its months; parsing it')
+        return parse_full_graph(force=True)
+
+    sink = GraphSink.from_graph(data.load_full_graph(), table)
+    num_removed = sink.remove_sources(
+        _file_source(path) for path in changed + removed)
+    logging.info('removed {} awards of {} changed months'.format(
+        num_removed, len(changed) + len(removed)))
+
+    for path in changed:
+        year, month = divmod(_file_source(path), 100)
+        for award_data in data_directory.file_awards(year, month):
+            sink.consume(award_data)
+
+    g = sink.result()
     data.save_full_graph(g)
+    data.save_award_table(sink.table)
+    manifest.record(stage, inputs, outputs, params)
     return g
 
 
@@ -144,13 +639,7 @@ def all_pi_ids_from_files():
     :return:  Set of all PI IDs found.
 
     """
-    pi_ids = set()
-    awards_directory = data.DataDirectory()
-    for award in awards_directory.awards():
-        for pi_id in award['PIcoPI']:
-            pi_ids.add(str(pi_id))
-
-    return pi_ids
+    return _scan_one(PiIdSink())
 
 
 def all_pi_ids_from_graph(g):
@@ -188,22 +677,7 @@ def parse_funding_agents():
     :return:  A data frame with the 10 fields listed above.
 
     """
-    all_records = []
-    columns = [
-        'pi_id', 'award_id',
-        'dir_id', 'dir_name', 'dir_abbr',
-        'div_id', 'div_name', 'div_abbr',
-        'pgm_id', 'pgm_name'
-    ]
-
-    # parse the list of JSON files from the data directory
-    awards_directory = data.DataDirectory()
-    for award in awards_directory.awards():
-        records_for_award = _parse_funding_agent(award)
-        all_records += records_for_award
-
-    df = pd.DataFrame(all_records, columns=columns)
-    return df.set_index('pi_id')
+    return _scan_one(FundingAgentSink())
 
 
 def _parse_funding_agent(award_data):
@@ -242,16 +716,7 @@ def frame_pi_award_pairings():
     :return:  DataFrame with pi_id and award_id columns.
 
     """
-    records = []
-    awards_directory = data.DataDirectory()
-    for award in awards_directory.awards():
-        award_id = str(award['awardID'])
-        pi_list = [str(pi_id) for pi_id in award['PIcoPI']]
-        for pi_id in pi_list:
-            records.append((pi_id, award_id))
-
-    df = pd.DataFrame(records, columns=['pi_id', 'award_id'])
-    return df.set_index('pi_id')
+    return _scan_one(PairingsSink())
 
 
 def frame_abstracts():
@@ -261,15 +726,7 @@ def frame_abstracts():
     :return:  DataFrame of abstracts, indexed by award ids.
 
     """
-    records = []
-    awards_directory = data.DataDirectory()
-    for award in awards_directory.awards():
-        award_id = str(award['awardID'])
-        abstract = award['abstract'].encode('utf-8')
-        records.append((award_id, abstract))
-
-    df = pd.DataFrame(records, columns=['award_id', 'abstract'])
-    return df.set_index('award_id')
+    return _scan_one(AbstractsSink())
 
 
 def affiliation_frames(json_dir):
@@ -0,0 +1,179 @@
+"""
+This module contains adaptive throttling for requests to a remote endpoint
+which does not publish its limits. Two controls are combined:
+
+    1.  a token bucket caps the request rate, while still letting short
+        bursts of up to one second's worth of tokens through
+    2.  an AIMD (additive increase, multiplicative decrease) limit caps the
+        number of requests in flight
+
+Every completed request is reported back with its latency and whether it
+succeeded. A timeout, connection error, or 5xx response halves both the
+concurrency limit and the rate. A success with a latency under the target
+raises the concurrency limit by about one per round of requests, and the
+rate by a fixed step, up to their maxima. The throttle thus settles near the
+load the endpoint tolerates instead of relying on hand-tuned sleeps.
+
+Throughput and latency counters are kept for monitoring; see
+L{Throttle.stats}.
+
+"""
+import time
+import threading
+import collections
+
+
+RATE = 10.0  # requests per second
+MIN_RATE = 0.5
+MAX_CONCURRENCY = 32
+LATENCY_TARGET = 2.0  # seconds
+DECREASE = 0.5
+WINDOW = 60.0  # seconds of history for the throughput counter
+LATENCY_SAMPLES = 1000
+
+
+class TokenBucket(object):
+    """Limit the rate of events, allowing bursts up to the capacity."""
+
+    def __init__(self, rate, capacity=None):
+        """
+        :param float rate: Tokens added per second.
+        :param float capacity: Maximum number of tokens saved up; defaults
+            to one second's worth, and at least one.
+
+        """
+        self.rate = float(rate)
+        self.capacity = capacity
+        self.tokens = self._capacity()
+        self._last = time.time()
+        self._lock = threading.Lock()
+
+    def _capacity(self):
+        if self.capacity is not None:
+            return float(self.capacity)
+        return max(self.rate, 1.0)
+
+    def _refill(self, now):
+        elapsed = now - self._last
+        self._last = now
+        self.tokens = min(self._capacity(), self.tokens + elapsed * self.rate)
+
+    def acquire(self):
+        """Take one token, sleeping until one is available."""
+        while True:
+            with self._lock:
+                self._refill(time.time())
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+class Throttle(object):
+    """Rate and concurrency control with AIMD feedback from responses."""
+
+    def __init__(self, rate=RATE, max_rate=None, concurrency=4,
+                 max_concurrency=MAX_CONCURRENCY,
+                 latency_target=LATENCY_TARGET):
+        """
+        :param float rate: Initial requests per second.
+        :param float max_rate: Highest rate to ramp up to; defaults to the
+            initial rate.
+        :param int concurrency: Initial number of requests in flight.
+        :param int max_concurrency: Highest number of requests in flight to
+            ramp up to.
+        :param float latency_target: Responses slower than this many seconds
+            do not ramp the limits up.
+
+        """
+        self.bucket = TokenBucket(rate)
+        self.max_rate = float(rate if max_rate is None else max_rate)
+        self.rate_step = self.max_rate / 20
+        self.limit = float(min(concurrency, max_concurrency))
+        self.max_concurrency = max_concurrency
+        self.latency_target = latency_target
+
+        self.in_flight = 0
+        self.completed = 0
+        self.failed = 0
+        self._completions = collections.deque()  # completion times
+        self._latencies = collections.deque(maxlen=LATENCY_SAMPLES)
+        self._started = time.time()
+        self._cond = threading.Condition()
+
+    def acquire(self):
+        """Wait for a free slot under the concurrency limit and a token from
+        the rate limiter, then count the request as in flight.
+
+        """
+        with self._cond:
+            while self.in_flight >= int(self.limit):
+                self._cond.wait()
+            self.in_flight += 1
+        self.bucket.acquire()
+
+    def release(self, latency, ok=True):
+        """Report a finished request and adjust the limits.
+
+        :param float latency: Seconds the request took.
+        :param bool ok: False if the request timed out, could not connect,
+            or got a 5xx response.
+
+        """
+        now = time.time()
+        with self._cond:
+            self.in_flight -= 1
+            self._latencies.append(latency)
+            if ok:
+                self.completed += 1
+                self._completions.append(now)
+                if latency <= self.latency_target:
+                    self.limit = min(self.max_concurrency,
+                                     self.limit + 1.0 / self.limit)
+                    self.bucket.rate = min(self.max_rate,
+                                           self.bucket.rate + self.rate_step)
+            else:
+                self.failed += 1
+                self.limit = max(1.0, self.limit * DECREASE)
+                self.bucket.rate = max(MIN_RATE, self.bucket.rate * DECREASE)
+
+            while self._completions and now - self._completions[0] > WINDOW:
+                self._completions.popleft()
+            self._cond.notify_all()
+
+    def stats(self):
+        """Return the live counters of the throttle.
+
+        :rtype:  dict
+        :return: Counts of completed, failed, and in-flight requests; the
+            current concurrency limit and rate; the throughput over the last
+            minute in requests per second; and the mean, median, and 95th
+            percentile latency of recent requests, in seconds.
+
+        """
+        with self._cond:
+            latencies = sorted(self._latencies)
+            window = min(WINDOW, max(time.time() - self._started, 1e-3))
+            stats = {
+                'completed': self.completed,
+                'failed': self.failed,
+                'in_flight': self.in_flight,
+                'limit': int(self.limit),
+                'rate': self.bucket.rate,
+                'throughput': len(self._completions) / window
+            }
+
+        if latencies:
+            stats['latency_mean'] = sum(latencies) / len(latencies)
+            stats['latency_p50'] = latencies[len(latencies) // 2]
+            stats['latency_p95'] = latencies[int(len(latencies) * 0.95)]
+        return stats
+
+    def __str__(self):
+        stats = self.stats()
+        msg = ('{completed} requests ({failed} failed), {throughput:.1f}/s, '
+               '{in_flight}/{limit} in flight, rate limit {rate:.1f}/s')
+        if 'latency_p50' in stats:
+            msg += ', latency p50 {latency_p50:.2f}s p95 {latency_p95:.2f}s'
+        return msg.format(**stats)
@@ -12,6 +12,26 @@ def write_pi_doc(corpus, pi_id):
     with open(fname, 'w') as f:
         f.write(corpus.pi_document(pi_id))
 
+def pi_award_abstracts(graph, table, pi_id):
+    """Join the abstracts of the awards on the edges of a PI from the award
+    table, each award once, in the order of the edges.
+
+    """
+    vertex = graph.vs.find(name=pi_id)
+    edges = graph.es.select(graph.incident(vertex))
+    seen = set()
+    abstracts = []
+    for index in (edges['award'] if len(edges) else []):
+        if index not in seen:
+            seen.add(index)
+            abstracts.append(table.value(index, 'abstract'))
+    return abstracts
+
+def write_pi_doc_from_table(graph, table, pi_id):
+    fname = os.path.join(doc_dir, "%s.txt" % pi_id)
+    with open(fname, 'w') as f:
+        f.write('\n'.join(pi_award_abstracts(graph, table, pi_id)))
+
 def read_pi_doc(pi_id):
     fname = os.path.join(doc_dir, "%s.txt" % pi_id)
     with open(fname) as f:
@@ -10,8 +10,15 @@ import sys
 import time
 import logging
 import argparse
+import threading
+from multiprocessing.pool import ThreadPool
+
 import requests
 
+import journal
+import rate_limit
+import response_cache
+
 try:
     # roughly 2x faster
     import ujson as json
@@ -22,25 +29,298 @@ except ImportError:
 
 URL = 'http://ci4ene01.ecn.purdue.edu/GMU_DIA2/DIA2/site/JSONRPC/query.php'
 
+# where responses are cached by the CLI; see L{enable_cache}
+CACHE_DIR = os.path.join(
+    os.path.abspath(os.path.pardir), 'data', 'rpc-cache')
+
+# journal of completed months, documents, and PIs kept by the CLI
+JOURNAL_FILE = 'request-journal.log'
+
+# number of months downloaded at once by the download-range subcommand
+JOBS = 2
+
+# number of requests kept in flight when fetching titles and abstracts
+WORKERS = 8
+
+# maximum number of connections kept open to the endpoint
+POOL_SIZE = 32
+
+# number of calls sent in one JSON-RPC batch request
+BATCH_SIZE = 50
+
+# seconds to wait for a response before giving up on a request
+TIMEOUT = 60
+
+# number of times a throttled request is retried after a timeout or 5xx
+RETRIES = 3
+
+# seconds between reports of the throttle counters by the CLI
+STATS_INTERVAL = 30
+
+_session = None
+_session_lock = threading.Lock()
+
+# cleared once the endpoint rejects a batch request
+_batches_supported = True
+
+# consulted by every JSON-RPC call once set by enable_cache
+_cache = None
+
+# paces every request to the endpoint once set by enable_throttle
+_throttle = None
+
 
 class InvalidYearMonth(Exception):
     """Raise if data is requested for a year/month no data exists for."""
     pass
 
 
+class BatchNotSupported(Exception):
+    """Raise if the endpoint does not answer a JSON-RPC batch request."""
+    pass
+
+
+def get_session():
+    """
+    Return the HTTP session shared by all requests made from this
+    process. The session keeps a pool of open connections to the
+    endpoint, so consecutive and concurrent requests reuse them
+    instead of opening a new connection for every call.
+
+    @rtype:  L{requests.Session}
+    @return: The shared session.
+
+    """
+    global _session
+    with _session_lock:
+        if _session is None:
+            session = requests.Session()
+            adapter = requests.adapters.HTTPAdapter(
+                pool_connections=1, pool_maxsize=POOL_SIZE)
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+            session.headers.update({
+                'content-type': 'application/json',
+                'accept': 'application/json'
+            })
+            _session = session
+    return _session
+
+
+def enable_cache(dirpath=CACHE_DIR, ttl=response_cache.TTL,
+                 max_bytes=response_cache.MAX_BYTES, refresh=False):
+    """
+    Answer JSON-RPC calls from an on-disk response cache when
+    possible, and store the responses fetched from the endpoint in
+    it. See L{response_cache} for how entries are keyed and evicted.
+
+    @type  dirpath: str
+    @param dirpath: Directory to keep the cache in.
+
+    @type  ttl: float
+    @param ttl: Seconds a cached response stays valid.
+
+    @type  max_bytes: int
+    @param max_bytes: Size limit of the cache.
+
+    @type  refresh: bool
+    @param refresh: If True, fetch every response from the endpoint
+        and overwrite the cached ones.
+
+    @rtype:  L{response_cache.ResponseCache}
+    @return: The cache now in use.
+
+    """
+    global _cache
+    _cache = response_cache.ResponseCache(dirpath, ttl, max_bytes, refresh)
+    return _cache
+
+
+def disable_cache():
+    """Stop using the response cache enabled by L{enable_cache}."""
+    global _cache
+    _cache = None
+
+
+def enable_throttle(rate=rate_limit.RATE, max_rate=None,
+                    max_concurrency=rate_limit.MAX_CONCURRENCY):
+    """
+    Pace all requests to the endpoint with an adaptive throttle,
+    which backs off when requests time out or get 5xx responses and
+    ramps back up while responses are fast. Throttled requests which
+    fail that way are retried up to L{RETRIES} times. See
+    L{rate_limit} for how the limits adapt.
+
+    @type  rate: float
+    @param rate: Initial number of requests per second.
+
+    @type  max_rate: float
+    @param max_rate: Highest number of requests per second to ramp up
+        to; the initial rate by default.
+
+    @type  max_concurrency: int
+    @param max_concurrency: Highest number of requests in flight to
+        ramp up to.
+
+    @rtype:  L{rate_limit.Throttle}
+    @return: The throttle now in use, whose counters can be read
+        with L{rate_limit.Throttle.stats}.
+
+    """
+    global _throttle
+    _throttle = rate_limit.Throttle(
+        rate, max_rate, min(WORKERS, max_concurrency), max_concurrency)
+    return _throttle
+
+
+def disable_throttle():
+    """Stop pacing requests with the throttle from L{enable_throttle}."""
+    global _throttle
+    _throttle = None
+
+
+def _post(json_content):
+    """
+    POST a request body to the endpoint, through the throttle if one
+    is enabled. Timeouts, connection errors, and 5xx responses are
+    reported to the throttle and the request retried; the last
+    failure is raised, or its response returned. Any other error is
+    reported to the throttle as a failure and raised at once.
+
+    """
+    throttle = _throttle
+    if throttle is None:
+        return get_session().post(URL, data=json_content, timeout=TIMEOUT)
+
+    for attempt in xrange(RETRIES + 1):
+        throttle.acquire()
+        start = time.time()
+        ok = False
+        try:
+            res = get_session().post(URL, data=json_content, timeout=TIMEOUT)
+            ok = res.status_code < 500
+        except (requests.exceptions.Timeout,
+                requests.exceptions.ConnectionError) as err:
+            if attempt == RETRIES:
+                raise
+            logging.warning('retrying request: {}'.format(err))
+            continue
+        finally:
+            throttle.release(time.time() - start, ok)
+
+        if ok or attempt == RETRIES:
+            return res
+        logging.warning('retrying request: HTTP {}'.format(res.status_code))
+
+
 def json_rpc_request(json_content):
     """
     Make a POST request to the NSF database through the PHP query
-    endpoint using the JSON contents passed as the body.
+    endpoint using the JSON contents passed as the body. If a
+    response cache is enabled, single calls are answered from it
+    when possible; batch requests are cached per call by
+    L{json_rpc_batch}.
 
     """
-    headers = {
-        'content-type': 'application/json',
-        'accept': 'application/json'
-    }
-    res = requests.post(URL, json_content, headers=headers)
+    cache = _cache
+    body = json.loads(json_content) if cache is not None else None
+    if isinstance(body, dict):
+        response = cache.get(body['method'], body['params'])
+        if response is not None:
+            return response
+
+    res = _post(json_content)
     logging.debug(res.content)
-    return res.json()
+    response = res.json()
+    if isinstance(body, dict):
+        cache.put(body['method'], body['params'], response)
+    return response
+
+
+def json_rpc_batch(calls):
+    """
+    Send several JSON-RPC calls to the endpoint in one batch request
+    and match the responses back up with the calls by their ids.
+
+    @type  calls: list of tuple of (str, object)
+    @param calls: The (method, params) of each call.
+
+    @rtype:  list of dict
+    @return: The response to each call, in the order of the calls.
+
+    @raise BatchNotSupported: If the endpoint does not answer with
+        a response for each call of the batch.
+
+    """
+    cache = _cache
+    responses = {}
+    if cache is not None:
+        for i, (method, params) in enumerate(calls):
+            response = cache.get(method, params)
+            if response is not None:
+                responses[i] = response
+
+    missing = [i for i in xrange(len(calls)) if i not in responses]
+    if not missing:
+        return [responses[i] for i in xrange(len(calls))]
+
+    body = [{'jsonrpc': '2.0', 'method': calls[i][0], 'params': calls[i][1],
+             'id': i} for i in missing]
+    try:
+        res = json_rpc_request(json.dumps(body))
+    except ValueError:  # response is not JSON
+        raise BatchNotSupported('batch response could not be decoded')
+
+    if not isinstance(res, list):
+        raise BatchNotSupported('batch answered with a single response')
+
+    for response in res:
+        if isinstance(response, dict) and response.get('id') in missing:
+            i = response.pop('id')
+            responses[i] = response
+            if cache is not None:
+                cache.put(calls[i][0], calls[i][1], response)
+    if len(responses) != len(calls):
+        raise BatchNotSupported('batch responses do not match the calls')
+    return [responses[i] for i in xrange(len(calls))]
+
+
+def json_rpc_calls(calls, batch_size=BATCH_SIZE):
+    """
+    Make many JSON-RPC calls, sending them in batches of up to
+    I{batch_size} calls. If the endpoint rejects batch requests, the
+    calls are made one at a time instead, and batching is not tried
+    again by this process.
+
+    @type  calls: iterable of tuple of (str, object)
+    @param calls: The (method, params) of each call.
+
+    @type  batch_size: int
+    @param batch_size: Maximum number of calls per batch request; 1
+        makes every call separately.
+
+    @rtype:  list of dict
+    @return: The response to each call, in the order of the calls.
+
+    """
+    global _batches_supported
+    calls = list(calls)
+    responses = []
+    start = 0
+    while start < len(calls) and batch_size > 1 and _batches_supported:
+        batch = calls[start:start + batch_size]
+        try:
+            responses.extend(json_rpc_batch(batch))
+        except BatchNotSupported as err:
+            logging.warning('falling back to single calls: {}'.format(err))
+            _batches_supported = False
+            break
+        start += len(batch)
+
+    for method, params in calls[start:]:
+        body = {'method': method, 'params': params}
+        responses.append(json_rpc_request(json.dumps(body)))
+    return responses
 
 def _translate_month(month):
     """
@@ -99,6 +379,43 @@ def get_name_and_affiliation(pi_id, logical_op='and'):
     return json_rpc_request(json.dumps(req_body))
 
 
+def get_names_and_affiliations(pi_ids, logical_op='and',
+                               batch_size=BATCH_SIZE):
+    """
+    Get the names and affiliations of many PIs, I{batch_size} PIs at
+    a time: the caching triggers of the PIs are sent in one batch
+    request, and their lookups in a following one, so the endpoint
+    has cached every PI before it is looked up. See
+    L{json_rpc_calls}.
+
+    @type  pi_ids: iterable of int or str
+    @param pi_ids: IDs of the PIs to get names and affiliations of.
+
+    @type  logical_op: str
+    @param logical_op: How to combine the various query parameters.
+
+    @type  batch_size: int
+    @param batch_size: Maximum number of PIs per batch request.
+
+    @rtype:  dict
+    @return: Maps each PI ID to its response, in the same form as
+        returned by L{get_name_and_affiliation}.
+
+    """
+    pi_ids = [str(pi_id) for pi_id in pi_ids]
+    batch_size = max(batch_size, 1)
+    names = {}
+    for start in xrange(0, len(pi_ids), batch_size):
+        batch = pi_ids[start:start + batch_size]
+        params = [{'logicalOp': str(logical_op), 'personID': pi_id}
+                  for pi_id in batch]
+        json_rpc_calls([('Trigger', p) for p in params], batch_size)
+        responses = json_rpc_calls(
+            [('getNameGMU', p) for p in params], batch_size)
+        names.update(zip(batch, responses))
+    return names
+
+
 def get_names(pi_id_file, logical_op='and'):
     """
     Get the name of a PI by the disambiguated ID.
@@ -141,6 +458,70 @@ def get_title_and_abstract(doc_id):
     return res['result']['data']
 
 
+def get_titles_and_abstracts(doc_ids, workers=WORKERS,
+                             batch_size=BATCH_SIZE, progress=None):
+    """
+    Get the titles and abstracts for many documents, keeping up to
+    I{workers} requests in flight at once over the shared session.
+    The documents are requested I{batch_size} at a time in batch
+    requests; see L{json_rpc_calls}.
+
+    If a journal is given, documents it has recorded are not
+    requested again, and each batch fetched is recorded in it as
+    soon as it arrives.
+
+    @type  doc_ids: iterable of str
+    @param doc_ids: The IDs of the documents to retrieve the titles
+        and abstracts for.
+
+    @type  workers: int
+    @param workers: Number of concurrent requests; 1 fetches the
+        documents one after another.
+
+    @type  batch_size: int
+    @param batch_size: Maximum number of documents per request.
+
+    @type  progress: L{journal.Journal}
+    @param progress: Journal of the documents already fetched.
+
+    @rtype:  dict
+    @return: Maps each document ID to a dictionary with 'title' and
+        'abstract' fields.
+
+    """
+    fetched = {}
+    missing = []
+    for doc_id in doc_ids:
+        if progress is not None and progress.done('doc', doc_id):
+            fetched[doc_id] = progress.value('doc', doc_id)
+        else:
+            missing.append(doc_id)
+    batches = [missing[start:start + batch_size]
+               for start in xrange(0, len(missing), max(batch_size, 1))]
+
+    def fetch(batch):
+        calls = [('getOneTitleAbstract', doc_id) for doc_id in batch]
+        responses = json_rpc_calls(calls, batch_size)
+        pairs = [(doc_id, res['result']['data'])
+                 for doc_id, res in zip(batch, responses)]
+        if progress is not None:
+            progress.record_many('doc', pairs)
+        return pairs
+
+    if workers <= 1:
+        fetched.update(pair for batch in batches for pair in fetch(batch))
+        return fetched
+
+    pool = ThreadPool(workers)
+    try:
+        fetched.update(pair for pairs in pool.imap_unordered(fetch, batches)
+                       for pair in pairs)
+        return fetched
+    finally:
+        pool.terminate()
+        pool.join()
+
+
 def write_data(data, year, month, dir_id):
     """
     Write the data to a file named based on the month, year,
@@ -162,9 +543,26 @@ def write_data(data, year, month, dir_id):
 
     """
     filename = '-'.join(['docs', str(year), str(month)]) + '.json'
-    path = os.path.abspath(filename)
-    with open(path, 'w') as json_file:
+    write_json(data, os.path.abspath(filename))
+
+
+def write_json(data, path):
+    """
+    Write JSON data to a file atomically: the data is written to a
+    temporary file next to the target, which then replaces it. An
+    interrupted write never leaves a partial file at the path.
+
+    @type  data: dict (json)
+    @param data: The JSON formattable data to write.
+
+    @type  path: str
+    @param path: Path of the file to write.
+
+    """
+    tmp_path = '{}.{}.tmp'.format(path, os.getpid())
+    with open(tmp_path, 'w') as json_file:
         json.dump(data, json_file)
+    os.rename(tmp_path, path)
 
 
 def validate_year_and_month(year, month):
@@ -184,7 +582,8 @@ def validate_year_and_month(year, month):
         raise InvalidYearMonth('There is only data up until 2014-02')
 
 
-def request_data(year, month, dir_id='05', mode='current', logical_op='and'):
+def request_data(year, month, dir_id='05', mode='current', logical_op='and',
+                 workers=WORKERS, batch_size=BATCH_SIZE, progress=None):
     """
     Request data from DIA2 by year, month, and directorate. Before
     making each request, the trigger method is used to build cache
@@ -218,6 +617,20 @@ def request_data(year, month, dir_id='05', mode='current', logical_op='and'):
         the specified directorate AND the specified month AND the
         specified year should be returned.
 
+    @type  workers: int
+    @param workers: Number of titles and abstracts to request at
+        once; see L{get_titles_and_abstracts}.
+
+    @type  batch_size: int
+    @param batch_size: Number of titles and abstracts per batch
+        request.
+
+    @type  progress: L{journal.Journal}
+    @param progress: Journal to resume the download from; titles and
+        abstracts are recorded in it as they arrive, and the month
+        once its file is written, at which point the titles and
+        abstracts of the month are forgotten.
+
     @rtype:  dict
     @return: The awards which matched the query results. By default,
         this will be awards that matched the specified month, year,
@@ -241,17 +654,98 @@ def request_data(year, month, dir_id='05', mode='current', logical_op='and'):
     data = res['result']['data']
 
     # We now have the basic award info; let's also get abstract and title.
-    for doc_id in data:
-        title_and_abstract = get_title_and_abstract(doc_id)
+    titles_and_abstracts = get_titles_and_abstracts(
+        data.keys(), workers, batch_size, progress)
+    for doc_id, title_and_abstract in titles_and_abstracts.iteritems():
         data[doc_id]['title'] = title_and_abstract['title']
         data[doc_id]['abstract'] = title_and_abstract['abstract']
 
     # Now write the data to a JSON file and return it.
     write_data(data, year, month, dir_id)
+    if progress is not None:
+        progress.record('month', _month_key(year, month, dir_id),
+                        forget={'doc': data.keys()})
     return data
 
 
-def write_name_and_affiliation(pi_id):
+def _month_key(year, month, dir_id):
+    return '{}-{}-{}'.format(year, _translate_month(month), dir_id)
+
+
+def month_range(start, end):
+    """
+    List the months from one year/month to another, inclusive.
+
+    @type  start: str
+    @param start: The first month, as YYYY-MM.
+
+    @type  end: str
+    @param end: The last month, as YYYY-MM.
+
+    @rtype:  list of tuple of (int, int)
+    @return: The (year, month) of each month in the range.
+
+    """
+    year, month = [int(part) for part in start.split('-')]
+    end_year, end_month = [int(part) for part in end.split('-')]
+    months = []
+    while (year, month) <= (end_year, end_month):
+        months.append((year, month))
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+    return months
+
+
+def request_range(months, dir_id='05', jobs=JOBS, progress=None, **kwargs):
+    """
+    Download many months, up to I{jobs} of them at once. Months the
+    journal records as done are skipped, and a month which fails is
+    logged without stopping the others.
+
+    @type  months: iterable of tuple of (int, int)
+    @param months: The (year, month) of each month to download.
+
+    @type  dir_id: str
+    @param dir_id: ID of the directorate to get data for.
+
+    @type  jobs: int
+    @param jobs: Number of months to download at once.
+
+    @type  progress: L{journal.Journal}
+    @param progress: Journal to resume the downloads from.
+
+    @param kwargs: Passed on to L{request_data}.
+
+    @rtype:  list of tuple of (int, int)
+    @return: The months which failed.
+
+    """
+    pending = [(year, month) for year, month in months
+               if progress is None or
+               not progress.done('month', _month_key(year, month, dir_id))]
+    logging.info('Downloading {} months'.format(len(pending)))
+
+    def download_month(year_month):
+        year, month = year_month
+        try:
+            request_data(year, month, dir_id, progress=progress, **kwargs)
+        except (InvalidYearMonth, requests.exceptions.RequestException,
+                ValueError, KeyError) as err:
+            logging.error('Unable to download {}-{}: {}'.format(
+                year, month, err))
+            return year_month
+        logging.info('Downloaded {}-{}'.format(year, month))
+        return None
+
+    pool = ThreadPool(max(jobs, 1))
+    try:
+        failed = pool.map(download_month, pending)
+    finally:
+        pool.terminate()
+        pool.join()
+    return [year_month for year_month in failed if year_month is not None]
+
+
+def write_name_and_affiliation(pi_id, json_data=None):
     """
     Write the name and affiliation info for the given PI to a JSON file named
     using this convention::
@@ -259,6 +753,8 @@ def write_name_and_affiliation(pi_id):
         <pi_id>-name-affiliation.json'
 
     @param str pi_id: The PI ID to get and write name and affiliation info for.
+    @param dict json_data: The response for the PI, if it was already
+        requested; see L{get_names_and_affiliations}.
     @raise TypeError: If the ID of the PI is not parseable as an int.
 
     """
@@ -268,9 +764,17 @@ def write_name_and_affiliation(pi_id):
     # TODO: STORE SOMEWHERE BETTER
     json_dir = os.path.abspath('json')
     path = os.path.join(json_dir, out_format.format(pi_id))
-    json_data = get_name_and_affiliation(pi_id)
-    with open(path, 'w') as f:
-        json.dump(json_data, f)
+    if json_data is None:
+        json_data = get_name_and_affiliation(pi_id)
+    write_json(json_data, path)
+
+
+def _open_journal(args):
+    """Open the journal of the CLI; with --refresh, the work it records
+    is done again.
+
+    """
+    return journal.Journal(args.journal, replay=not args.refresh)
 
 
 def name(args):
@@ -290,27 +794,34 @@ def name(args):
         with open(infile, 'r') as f:
             pi_ids = set(f.read().split())
 
-        # get listing of those we already have
-        files = os.listdir('json')
-        pids_we_have = set([name.split('-')[0] for name in files])
-
-        # narrow down to those we don't have
-        pi_ids.difference_update(pids_we_have)
+        # narrow down to those not recorded as done by an earlier run
+        progress = _open_journal(args)
+        pi_ids.difference_update(progress.keys('pi'))
 
-        logging.info('Requesting data for {} PIs'.format(len(pi_ids)))
-        num_processed = 0
+        # drop the ones that are not valid IDs
+        valid_ids = []
         for pi_id in pi_ids:
             try:
-                write_name_and_affiliation(pi_id)
-                num_processed += 1
-                logging.info('Got name/affiliation info for {}.'.format(pi_id))
-                logging.info('{} Processed.'.format(num_processed))
+                valid_ids.append(str(int(pi_id)))
             except ValueError as err:
                 logging.error(str(err))
                 logging.error('Unable to parse PI ID: ' + pi_id)
 
-                if args.delay:
-                    time.sleep(args.delay)
+        logging.info('Requesting data for {} PIs'.format(len(valid_ids)))
+        num_processed = 0
+        for start in xrange(0, len(valid_ids), args.batch_size):
+            batch = valid_ids[start:start + args.batch_size]
+            responses = get_names_and_affiliations(
+                batch, batch_size=args.batch_size)
+            for pi_id in batch:
+                write_name_and_affiliation(pi_id, responses[pi_id])
+                num_processed += 1
+                logging.info('Got name/affiliation info for {}.'.format(pi_id))
+            progress.record_many('pi', ((pi_id, None) for pi_id in batch))
+            logging.info('{} Processed.'.format(num_processed))
+
+            if args.delay:
+                time.sleep(args.delay)
         return 0
     return 1
 
@@ -318,13 +829,40 @@ def name(args):
 def download(args):
     """Main CLI for 'download' subcommand."""
     try:
-        data = request_data(args.year, args.month, args.dir_id)
+        data = request_data(args.year, args.month, args.dir_id,
+                            workers=args.workers, batch_size=args.batch_size,
+                            progress=_open_journal(args))
     except InvalidYearMonth as err:
         print err
         return 1
     return 0
 
 
+def download_range(args):
+    """Main CLI for 'download-range' subcommand."""
+    try:
+        months = month_range(args.start, args.end)
+    except ValueError:
+        print 'months must be given as YYYY-MM'
+        return 1
+
+    failed = request_range(
+        months, args.dir_id, args.jobs, _open_journal(args),
+        workers=args.workers, batch_size=args.batch_size)
+    for year, month in failed:
+        print 'failed: {}-{}'.format(year, _translate_month(month))
+    return 1 if failed else 0
+
+
+def _report_stats(throttle, finished, interval=STATS_INTERVAL):
+    """Log the throttle counters every I{interval} seconds until the
+    I{finished} event is set.
+
+    """
+    while not finished.wait(interval):
+        logging.info(str(throttle))
+
+
 def setup_parser():
     parser = argparse.ArgumentParser()
     subparsers = parser.add_subparsers(
@@ -333,6 +871,35 @@ def setup_parser():
     parser.add_argument(
         '-v', '--verbose', action='store_true',
         help='change log level to debug')
+    parser.add_argument(
+        '--refresh', action='store_true',
+        help='ignore cached responses and the journal, and record the '
+             'fresh ones instead')
+    parser.add_argument(
+        '--no-cache', action='store_true',
+        help='neither read nor write the response cache')
+    parser.add_argument(
+        '--cache-dir', action='store', default=CACHE_DIR,
+        help='directory to cache JSON-RPC responses in')
+    parser.add_argument(
+        '--cache-ttl', action='store', default=response_cache.TTL,
+        type=float, help='seconds cached responses stay valid')
+    parser.add_argument(
+        '--journal', action='store', default=JOURNAL_FILE,
+        help='journal of completed work to resume from and append to')
+    parser.add_argument(
+        '--rate', action='store', default=rate_limit.RATE, type=float,
+        help='initial number of requests per second')
+    parser.add_argument(
+        '--max-rate', action='store', default=None, type=float,
+        help='number of requests per second to ramp up to')
+    parser.add_argument(
+        '--max-concurrency', action='store',
+        default=rate_limit.MAX_CONCURRENCY, type=int,
+        help='number of requests in flight to ramp up to')
+    parser.add_argument(
+        '--no-throttle', action='store_true',
+        help='send requests as fast as the workers allow')
 
     download_parser = subparsers.add_parser(
         'download', help='download award data for a year/month')
@@ -346,8 +913,37 @@ def setup_parser():
         'dir_id', action='store',
         nargs='?', default='05',
         help='the directorate to get data for')
+    download_parser.add_argument(
+        '-w', '--workers', action='store', default=WORKERS, type=int,
+        help='number of titles/abstracts to request at once')
+    download_parser.add_argument(
+        '-b', '--batch-size', action='store', default=BATCH_SIZE, type=int,
+        help='number of titles/abstracts per JSON-RPC batch request')
     download_parser.set_defaults(func=download)
 
+    range_parser = subparsers.add_parser(
+        'download-range', help='download award data for a range of months')
+    range_parser.add_argument(
+        'start', action='store',
+        help='the first month to get data for, as YYYY-MM')
+    range_parser.add_argument(
+        'end', action='store',
+        help='the last month to get data for, as YYYY-MM')
+    range_parser.add_argument(
+        'dir_id', action='store',
+        nargs='?', default='05',
+        help='the directorate to get data for')
+    range_parser.add_argument(
+        '-j', '--jobs', action='store', default=JOBS, type=int,
+        help='number of months to download at once')
+    range_parser.add_argument(
+        '-w', '--workers', action='store', default=WORKERS, type=int,
+        help='number of titles/abstracts to request at once per month')
+    range_parser.add_argument(
+        '-b', '--batch-size', action='store', default=BATCH_SIZE, type=int,
+        help='number of titles/abstracts per JSON-RPC batch request')
+    range_parser.set_defaults(func=download_range)
+
     name_parser = subparsers.add_parser(
         'name', help='get people names and affiliations')
     name_parser.add_argument(
@@ -358,7 +954,10 @@ def setup_parser():
         help='file of PI IDs, one per line, to get names for')
     name_parser.add_argument(
         '-d', '--delay', action='store', default=0, type=float,
-        help='seconds to delay between requests for PIs.')
+        help='seconds to delay between batch requests for PIs.')
+    name_parser.add_argument(
+        '-b', '--batch-size', action='store', default=BATCH_SIZE, type=int,
+        help='number of PIs per JSON-RPC batch request')
     name_parser.set_defaults(func=name)
 
     return parser
@@ -380,7 +979,24 @@ def main():
         handlers=[logging.StreamHandler()]
     )
 
-    exit_code = args.func(args)
+    if not args.no_cache:
+        enable_cache(args.cache_dir, args.cache_ttl, refresh=args.refresh)
+
+    finished = threading.Event()
+    if not args.no_throttle:
+        throttle = enable_throttle(
+            args.rate, args.max_rate, args.max_concurrency)
+        reporter = threading.Thread(
+            target=_report_stats, args=(throttle, finished))
+        reporter.daemon = True
+        reporter.start()
+
+    try:
+        exit_code = args.func(args)
+    finally:
+        finished.set()
+        if _throttle is not None:
+            logging.info(str(_throttle))
     if exit_code:
         parser.print_usage()
     return exit_code
@@ -0,0 +1,183 @@
+"""
+This module contains an on-disk cache of JSON-RPC responses, so repeated
+requests for the same data (re-running a month download during development,
+say) are answered locally instead of by the remote endpoint.
+
+The cache is content-addressed: each response is stored in a file named by
+the SHA-1 digest of the method and its canonically encoded parameters, in a
+subdirectory named by the first two hex digits::
+
+    <cache dir>/ab/ab3f...e1.json
+
+Entries fetched longer ago than the time to live are treated as missing.
+Once the files in the cache add up to more than the size limit, the least
+recently used entries are evicted until the cache is back under 90% of the
+limit. The fetch time of an entry is kept in its file's mtime and the time
+it was last used in its atime, so a hit refreshes the atime only and does
+not extend the life of the entry.
+
+"""
+import os
+import time
+import hashlib
+import logging
+import threading
+import json as stdlib_json  # for the canonical (sorted key) encoding
+
+try:
+    import ujson as json
+except ImportError:
+    import json
+
+
+TTL = 30 * 24 * 60 * 60  # 30 days
+MAX_BYTES = 1 << 30  # 1 GiB
+
+
+def cache_key(method, params):
+    """Return the content address of a call: the SHA-1 hex digest of the
+    method and its parameters, encoded with sorted keys so that equal
+    parameters always give the same key.
+
+    :param str method: The JSON-RPC method.
+    :param params: The JSON-encodable parameters of the call.
+    :rtype:  str
+    :return: The hex digest.
+
+    """
+    content = stdlib_json.dumps([method, params], sort_keys=True,
+                                separators=(',', ':'))
+    return hashlib.sha1(content).hexdigest()
+
+
+class ResponseCache(object):
+    """Store JSON-RPC responses on disk, keyed by method and parameters."""
+
+    def __init__(self, dirpath, ttl=TTL, max_bytes=MAX_BYTES, refresh=False):
+        """
+        :param str dirpath: Directory to keep the cache in; it is created if
+            it does not exist.
+        :param float ttl: Seconds a response stays valid.
+        :param int max_bytes: Size the cache files may add up to before
+            entries are evicted.
+        :param bool refresh: If True, never answer from the cache, but still
+            store the responses fetched.
+
+        """
+        if not os.path.isdir(dirpath):
+            os.makedirs(dirpath)
+
+        self.dirpath = dirpath
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.refresh = refresh
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._size = None  # computed on the first store
+
+    def _path(self, key):
+        return os.path.join(self.dirpath, key[:2], key + '.json')
+
+    def _entries(self):
+        for dirpath, _, filenames in os.walk(self.dirpath):
+            for filename in filenames:
+                if filename.endswith('.json'):
+                    yield os.path.join(dirpath, filename)
+
+    def size(self):
+        """Return the total size of the cache files, in bytes."""
+        return sum(os.path.getsize(path) for path in self._entries())
+
+    def get(self, method, params):
+        """Look up the cached response to a call.
+
+        :param str method: The JSON-RPC method.
+        :param params: The parameters of the call.
+        :rtype:  dict
+        :return: The cached response, or None if there is no valid entry or
+            the cache is being refreshed.
+
+        """
+        if self.refresh:
+            return None
+
+        path = self._path(cache_key(method, params))
+        try:
+            if time.time() - os.path.getmtime(path) > self.ttl:
+                os.remove(path)
+                raise OSError('expired')
+            with open(path) as f:
+                response = json.load(f)
+            # mark as recently used, keeping the fetch time
+            os.utime(path, (time.time(), os.path.getmtime(path)))
+        except (OSError, IOError, ValueError):
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        return response
+
+    def put(self, method, params, response):
+        """Store the response to a call, replacing any previous entry.
+        Error responses are not stored.
+
+        :param str method: The JSON-RPC method.
+        :param params: The parameters of the call.
+        :param dict response: The decoded response.
+
+        """
+        if not isinstance(response, dict) or 'error' in response:
+            return
+
+        path = self._path(cache_key(method, params))
+        if not os.path.isdir(os.path.dirname(path)):
+            try:
+                os.makedirs(os.path.dirname(path))
+            except OSError:  # made by another thread in the meantime
+                pass
+
+        content = json.dumps(response)
+        tmp_path = '{}.{}.tmp'.format(path, threading.current_thread().ident)
+        with open(tmp_path, 'w') as f:
+            f.write(content)
+
+        with self._lock:
+            try:
+                replaced = os.path.getsize(path)
+            except OSError:  # a new entry
+                replaced = 0
+            os.rename(tmp_path, path)
+            if self._size is None:
+                self._size = self.size()
+            else:
+                self._size += len(content) - replaced
+            if self._size > self.max_bytes:
+                self.evict()
+
+    def evict(self, target=None):
+        """Remove the least recently used entries, by file atime, until the
+        cache is no larger than the target size, 90% of the size limit by
+        default.
+
+        """
+        if target is None:
+            target = int(0.9 * self.max_bytes)
+
+        entries = []
+        for path in self._entries():
+            stat = os.stat(path)
+            entries.append((stat.st_atime, stat.st_size, path))
+        entries.sort()
+
+        size = sum(entry[1] for entry in entries)
+        removed = 0
+        for _, entry_size, path in entries:
+            if size <= target:
+                break
+            os.remove(path)
+            size -= entry_size
+            removed += 1
+
+        self._size = size
+        logging.info('evicted {} cached responses'.format(removed))
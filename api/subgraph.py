@@ -0,0 +1,158 @@
+"""
+This module contains the extraction of the subgraph induced by a set of PIs,
+such as those listed in cise-lcc-binary-membership-ids.txt, from the PI
+collaboration graph.
+
+Looking up the labels of both endpoints of every edge through the vertex
+sequence costs two attribute fetches per edge, in Python. Instead, the
+labels are mapped to vertex ids once, through a dictionary cached on the
+graph, and the edges inside the set are found with boolean masks over the
+array of edge endpoints::
+
+    vertices = vertex_ids(graph, pis)           # sorted vertex ids
+    edges = induced_edges(graph, vertices)      # ids of the edges among them
+    sub, vertices, edges = induced_subgraph(graph, pis)
+
+Vertex i of the subgraph is vertex vertices[i] of the graph, and edge j of
+the subgraph is edge edges[j]; the vertices and edges keep their relative
+order.
+
+"""
+import numpy as np
+import igraph
+
+
+ID_DTYPE = np.int64
+
+# attribute of the graph holding its cached label index
+_CACHE_ATTRIBUTE = '_label_index'
+
+
+def label_index(graph):
+    """Return the vertex id of each label of a graph. The dictionary is
+    cached on the graph, and rebuilt if vertices were added or removed
+    since.
+
+    :type  graph: L{igraph.Graph}
+    :param graph: Graph whose vertices have a 'label' attribute.
+    :rtype:  dict
+    :return: Vertex id by label.
+
+    """
+    cached = getattr(graph, _CACHE_ATTRIBUTE, None)
+    if cached is None or cached[0] != graph.vcount():
+        labels = graph.vs['label'] if graph.vcount() else []
+        cached = (graph.vcount(), {label: vertex for vertex, label
+                                   in enumerate(labels)})
+        setattr(graph, _CACHE_ATTRIBUTE, cached)
+    return cached[1]
+
+
+def vertex_ids(graph, labels):
+    """Return the ids of the vertices with the given labels; labels of no
+    vertex in the graph are ignored.
+
+    :type  graph: L{igraph.Graph}
+    :param graph: Graph whose vertices have a 'label' attribute.
+    :type  labels: iterable of str
+    :param labels: Labels (PI ids) of the vertices.
+    :rtype:  L{numpy.ndarray}
+    :return: The sorted vertex ids.
+
+    """
+    index = label_index(graph)
+    ids = set(index[label] for label in labels if label in index)
+    return np.array(sorted(ids), dtype=ID_DTYPE)
+
+
+def edge_array(graph):
+    """Return the endpoints of the edges of a graph.
+
+    :type  graph: L{igraph.Graph}
+    :rtype:  L{numpy.ndarray}
+    :return: (num_edges, 2) array of source and target vertex ids.
+
+    """
+    return np.array(graph.get_edgelist(), dtype=ID_DTYPE).reshape((-1, 2))
+
+
+def first_of_parallel(edges):
+    """Return a mask which is True for the first of each group of parallel
+    edges and for edges without parallels, like C{not edge.is_multiple()}.
+
+    :type  edges: L{numpy.ndarray}
+    :param edges: (num_edges, 2) array of edge endpoints.
+    :rtype:  L{numpy.ndarray}
+
+    """
+    low = np.minimum(edges[:, 0], edges[:, 1])
+    high = np.maximum(edges[:, 0], edges[:, 1])
+    keys = low * (int(edges.max()) + 1 if len(edges) else 1) + high
+    _, first = np.unique(keys, return_index=True)
+    mask = np.zeros(len(edges), dtype=bool)
+    mask[first] = True
+    return mask
+
+
+def induced_edges(graph, vertices, simple=False, edges=None):
+    """Return the ids of the edges whose endpoints are both in a set of
+    vertices.
+
+    :type  graph: L{igraph.Graph}
+    :param graph: The graph.
+    :type  vertices: L{numpy.ndarray}
+    :param vertices: Vertex ids, e.g. from L{vertex_ids}.
+    :param bool simple: If True, keep only the first of parallel edges.
+    :type  edges: L{numpy.ndarray}
+    :param edges: The L{edge_array} of the graph, if already at hand.
+    :rtype:  L{numpy.ndarray}
+    :return: The sorted edge ids.
+
+    """
+    if edges is None:
+        edges = edge_array(graph)
+    member = np.zeros(graph.vcount(), dtype=bool)
+    member[vertices] = True
+    edge_ids = np.flatnonzero(member[edges[:, 0]] & member[edges[:, 1]])
+    if simple:
+        edge_ids = edge_ids[first_of_parallel(edges[edge_ids])]
+    return edge_ids
+
+
+def induced_subgraph(graph, labels, simple=False):
+    """Extract the subgraph induced by the vertices with the given labels,
+    with the attributes of its vertices and edges.
+
+    :type  graph: L{igraph.Graph}
+    :param graph: Graph whose vertices have a 'label' attribute.
+    :type  labels: iterable of str
+    :param labels: Labels (PI ids) of the vertices to keep.
+    :param bool simple: If True, keep only the first of parallel edges.
+    :rtype:  tuple of (L{igraph.Graph}, L{numpy.ndarray},
+        L{numpy.ndarray})
+    :return: The subgraph, and the id in the graph of each of its vertices
+        and each of its edges.
+
+    """
+    vertices = vertex_ids(graph, labels)
+    edges = edge_array(graph)
+    edge_ids = induced_edges(graph, vertices, simple, edges)
+
+    local = np.empty(graph.vcount(), dtype=ID_DTYPE)
+    local[vertices] = np.arange(len(vertices), dtype=ID_DTYPE)
+    sub_edges = local[edges[edge_ids]]
+
+    vertex_list = vertices.tolist()
+    edge_list = edge_ids.tolist()
+    vertex_attrs = {}
+    for name in (graph.vs.attributes() if vertex_list else []):
+        values = graph.vs[name]
+        vertex_attrs[name] = [values[i] for i in vertex_list]
+    edge_attrs = {}
+    for name in (graph.es.attributes() if edge_list else []):
+        values = graph.es[name]
+        edge_attrs[name] = [values[i] for i in edge_list]
+
+    sub = igraph.Graph(n=len(vertex_list), edges=sub_edges.tolist(),
+                       vertex_attrs=vertex_attrs, edge_attrs=edge_attrs)
+    return (sub, vertices, edge_ids)
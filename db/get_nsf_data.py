@@ -6,49 +6,203 @@ for naming::
 
     <year>.zip
 
+The archives can be compiled into the award store read by the API with
+api/nsf_xml.py.
+
 """
 import os
 import sys
+import json
+import zipfile
+import hashlib
 import logging
 import argparse
+import threading
+from multiprocessing.pool import ThreadPool
+
 import requests
 
 
 NSF_AWARDS_URL = 'http://www.nsf.gov/awardsearch/download'
 REQUIRED_PARAMS = ('DownloadFileName', 'All')
 
+# bytes read from the response and written to disk at a time
+CHUNK_SIZE = 1 << 20
+
+# number of years downloaded at once by request_all
+JOBS = 4
+
+# seconds to wait for the server to send more data
+TIMEOUT = 120
+
+# records the size and SHA-256 digest of each completed archive
+CHECKSUM_FILE = 'checksums.json'
+
+_checksum_lock = threading.Lock()
+
+
+def file_sha256(path):
+    """Return the SHA-256 hex digest of a file, read in chunks."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def read_checksums(dirpath):
+    """Return the checksums recorded for the archives in a directory,
+    keyed by year; see L{record_checksum}.
+
+    """
+    path = os.path.join(dirpath, CHECKSUM_FILE)
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (IOError, ValueError):
+        return {}
+
+
+def record_checksum(dirpath, year, path):
+    """Record the size and SHA-256 digest of a completed archive, so a
+    later run can tell it is complete and intact without downloading it
+    again. The checksum file is replaced atomically.
+
+    """
+    entry = {'size': os.path.getsize(path), 'sha256': file_sha256(path)}
+    with _checksum_lock:
+        checksums = read_checksums(dirpath)
+        checksums[str(year)] = entry
+        checksum_path = os.path.join(dirpath, CHECKSUM_FILE)
+        tmp_path = checksum_path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(checksums, f, indent=2, sort_keys=True)
+        os.rename(tmp_path, checksum_path)
+    return entry
+
+
+def is_complete(year, dirpath='./'):
+    """Check whether the archive for a year was completely downloaded:
+    its size and SHA-256 digest must match the recorded checksum.
+
+    :param str year: The year of the archive.
+    :param str dirpath: The directory the archive was written to.
+    :rtype: bool
 
-def request_data(year, dirpath='./'):
-    """Request data from NSF. Write to disk on response. Note that
-    the response will come back as a zipped XML file with all award
-    data for the requested year.
+    """
+    dirpath = os.path.abspath(dirpath)
+    entry = read_checksums(dirpath).get(str(year))
+    path = os.path.join(dirpath, '{}.zip'.format(year))
+    if entry is None or not os.path.isfile(path):
+        return False
+    return (os.path.getsize(path) == entry['size'] and
+            file_sha256(path) == entry['sha256'])
+
+
+def request_data(year, dirpath='./', force=False):
+    """Request data from NSF. The response is a zipped XML file with all
+    award data for the requested year, which is streamed to disk in chunks
+    as it arrives instead of being held in memory.
+
+    The download goes to a partial file next to the archive. If an
+    earlier run was interrupted, the partial file is resumed with an HTTP
+    Range request; a server which ignores the range sends the whole file
+    again, which then replaces the partial one. Once complete, the CRCs of
+    the zip members are checked, the partial file is renamed to
+    ``<year>.zip``, and its checksum is recorded. A year whose archive
+    matches its recorded checksum is skipped.
 
     :param str year: The year to request data for.
     :param str dirpath: The directory to write the zip file to.
+    :param bool force: Download the year even if it is complete.
+    :rtype: str
+    :return: The path of the zip file.
     :raises :class:requests.exceptions.HTTPError: If an HTTP error
         occurs as a result of the request.
+    :raises :class:zipfile.BadZipfile: If the downloaded archive is
+        corrupt; the partial file is removed so the next run starts over.
 
     """
-    params = {'DownloadFileName': year, 'All': 'true'}
-    logging.info('requesting award data for year: {}'.format(year))
-    r = requests.post(NSF_AWARDS_URL, params)
+    dirpath = os.path.abspath(dirpath)
+    fname = '{}.zip'.format(year)
+    outfile = os.path.join(dirpath, fname)
+    if not force and is_complete(year, dirpath):
+        logging.info('data for {} is already complete'.format(year))
+        return outfile
 
-    # will raise HTTP error if one occured
-    r.raise_for_status()
+    part_file = outfile + '.part'
+    offset = os.path.getsize(part_file) if os.path.isfile(part_file) else 0
+    headers = {'Range': 'bytes={}-'.format(offset)} if offset else {}
 
-    # write results to zip file in designated directory
-    fname = '{}.zip'.format(year)
-    outfile = os.path.join(os.path.abspath(dirpath), fname)
-    with open(outfile, 'wb') as f:
-        f.write(r.content)
-        logging.info('data for {} written to {}'.format(year, outfile))
+    params = {'DownloadFileName': year, 'All': 'true'}
+    logging.info('requesting award data for year: {}{}'.format(
+        year, ' from byte {}'.format(offset) if offset else ''))
+    r = requests.get(NSF_AWARDS_URL, params=params, headers=headers,
+                     stream=True, timeout=TIMEOUT)
+    try:
+        if r.status_code == 416:  # nothing past the end of the partial file
+            mode = None
+        else:
+            # will raise HTTP error if one occured
+            r.raise_for_status()
+            mode = 'ab' if r.status_code == 206 else 'wb'
+
+        if mode is not None:
+            with open(part_file, mode) as f:
+                for chunk in r.iter_content(CHUNK_SIZE):
+                    f.write(chunk)
+    finally:
+        r.close()
+
+    try:
+        with zipfile.ZipFile(part_file) as archive:
+            bad_member = archive.testzip()
+        if bad_member is not None:
+            raise zipfile.BadZipfile('bad CRC for {}'.format(bad_member))
+    except zipfile.BadZipfile:
+        os.remove(part_file)
+        raise
+
+    os.rename(part_file, outfile)
+    record_checksum(dirpath, year, outfile)
+    logging.info('data for {} written to {}'.format(year, outfile))
+    return outfile
+
+
+def request_all(dirpath='./', years=None, jobs=JOBS, force=False):
+    """Request data for many years, all years by default, downloading up
+    to I{jobs} of them at once. A year which fails is logged without
+    stopping the others; rerunning resumes or retries it.
+
+    :param str dirpath: The directory to write the zip files to.
+    :param list years: The years to request data for.
+    :param int jobs: Number of years to download at once.
+    :param bool force: Download years even if they are complete.
+    :rtype: list
+    :return: The years which failed.
 
-def request_all(*args):
-    """Request data for all years."""
-    start = '1960'
-    end = '2014'  # TODO: get based on current date
-    for year in range(int(start), int(end) + 1):
-        request_data(str(year), *args)
+    """
+    if years is None:
+        start = '1960'
+        end = '2014'  # TODO: get based on current date
+        years = [str(year) for year in range(int(start), int(end) + 1)]
+
+    def download(year):
+        try:
+            request_data(year, dirpath, force)
+        except (requests.exceptions.RequestException, zipfile.BadZipfile,
+                IOError) as err:
+            logging.error('unable to download {}: {}'.format(year, err))
+            return year
+        return None
+
+    pool = ThreadPool(max(jobs, 1))
+    try:
+        failed = pool.map(download, years)
+    finally:
+        pool.terminate()
+        pool.join()
+    return [year for year in failed if year is not None]
 
 
 def setup_parser():
@@ -60,7 +214,13 @@ def setup_parser():
         help='pass one or more years to restrict requests to those years')
     parser.add_argument(
         '-o', '--outfile', action='store', default='./',
-        help='write to a particular file, rather than the curdir')
+        help='write to a particular directory, rather than the curdir')
+    parser.add_argument(
+        '-j', '--jobs', action='store', type=int, default=JOBS,
+        help='number of years to download at once')
+    parser.add_argument(
+        '-f', '--force', action='store_true',
+        help='download years again even if they are complete')
     parser.add_argument(
         '-v', '--verbose', action='store_true',
         help='print verbose output to console')
@@ -78,13 +238,12 @@ def main():
             format='[%(levelname)s\t%(asctime)s] %(message)s',
             handlers=[logging.StreamHandler()]
         )
-    if args.years:
-        for year in args.years:
-            request_data(year, args.outfile)
-    else:
-        request_all(args.outfile)
+    failed = request_all(args.outfile, args.years or None, args.jobs,
+                         args.force)
+    for year in failed:
+        print 'failed: {}'.format(year)
 
-    return 1
+    return 1 if failed else 0
 
 
 if __name__ == "__main__":
@@ -0,0 +1,93 @@
+"""
+Tests for the SQLite award database.
+
+"""
+import os
+import shutil
+import tempfile
+import unittest
+
+from api import award_db
+
+
+def agent(dir_id, div_id, pgm_id):
+    return {
+        'dir': {'id': dir_id, 'name': 'Directorate ' + dir_id, 'abbr': 'D'},
+        'div': {'id': div_id, 'name': 'Division ' + div_id, 'abbr': 'V'},
+        'pgm': {'id': pgm_id, 'name': 'Program ' + pgm_id}
+    }
+
+
+AWARDS = [
+    {'awardID': '9596119', 'title': u'Metalanguages', 'abstract': u'',
+     'effectiveDate': '1995-01-01', 'expirationDate': '1997-12-31',
+     'PIcoPI': ['499410', 556630], 'PO': ['561889'],
+     'fundingAgent': [agent('05', '0501', '2880')]},
+    {'awardID': '9505631', 'title': u'Pattern Recognition',
+     'abstract': u'Gribskov \xe9', 'effectiveDate': '1998-01-01',
+     'expirationDate': '1999-06-30', 'PIcoPI': [556630], 'PO': [],
+     'fundingAgent': [agent('05', '0506', '2885'),
+                      agent('05', '0501', '2880')]},
+    {'awardID': '0000001', 'title': u'Undated', 'abstract': u'',
+     'effectiveDate': '', 'expirationDate': '', 'PIcoPI': [], 'PO': [],
+     'fundingAgent': []},
+    {'awardID': '0100001', 'title': u'Open-ended', 'abstract': u'',
+     'effectiveDate': '2001-01-01', 'expirationDate': '', 'PIcoPI': [],
+     'PO': [], 'fundingAgent': []}
+]
+
+
+class TestAwardDatabase(unittest.TestCase):
+    """Test building and querying the award database."""
+
+    def setUp(self):
+        self.dirpath = tempfile.mkdtemp()
+        with open(os.path.join(self.dirpath, 'pi-names.csv'), 'w') as f:
+            f.write('pi_id,name\n556630,Michael Gribskov\n')
+        with open(os.path.join(self.dirpath, 'pi-affiliations.csv'), 'w') as f:
+            f.write('pi_id,inst_id\n556630,3\n')
+        with open(os.path.join(self.dirpath, 'institutions.csv'), 'w') as f:
+            f.write('id,org,street,city,state,zip,nation\n'
+                    '3,Purdue,Main St,West Lafayette,IN,47907,United States\n')
+
+        path = os.path.join(self.dirpath, 'awards.sqlite')
+        self.db = award_db.build_database(path, AWARDS, self.dirpath)
+
+    def tearDown(self):
+        self.db.close()
+        shutil.rmtree(self.dirpath)
+
+    def test_pi_queries(self):
+        self.assertEqual(len(self.db), 4)
+        self.assertEqual(self.db.awards_for_pi(556630),
+                         ['9505631', '9596119'])
+        self.assertEqual(self.db.pis_for_award('9596119'),
+                         ['499410', '556630'])
+        self.assertEqual(self.db.pi_name('556630'), 'Michael Gribskov')
+        self.assertEqual(self.db.affiliations(556630)[0][1], 'Purdue')
+
+    def test_program_and_date_queries(self):
+        self.assertEqual(self.db.awards_for_program('2880'),
+                         ['9505631', '9596119'])
+        self.assertEqual(self.db.awards_between('1997-06-01', '1998-01-01'),
+                         ['9596119', '9505631'])
+        self.assertEqual(self.db.awards_between('1999-07-01', '2000-12-31'),
+                         [])
+
+    def test_open_ended_awards_are_active(self):
+        self.assertEqual(self.db.awards_between('2010-01-01', '2010-12-31'),
+                         ['0100001'])
+        self.assertEqual(self.db.awards_between('1999-07-01', '2014-12-31'),
+                         ['0100001'])
+
+    def test_award_round_trip(self):
+        for award in AWARDS:
+            expected = dict(award)
+            expected['PIcoPI'] = [str(pi_id) for pi_id in award['PIcoPI']]
+            self.assertEqual(self.db.award(award['awardID']), expected)
+        self.assertRaises(KeyError, self.db.award, 'missing')
+
+    def test_funding_agent_records(self):
+        records = self.db.funding_agents()
+        self.assertEqual(len(records), 4)
+        self.assertEqual(len(records[0]), len(award_db.AGENT_COLUMNS))
@@ -0,0 +1,64 @@
+"""
+Tests for the award location index.
+
+"""
+import os
+import shutil
+import tempfile
+import unittest
+
+from api import award_index
+
+
+TEXT = ('{"9606":{"abstract":"braces {in} \\"quoted\\" text","awardID":"9596119",'
+        '"fundingAgent":[{"dir":{"id":"05"}}],"PIcoPI":["499410"]},'
+        '"1690":{"abstract":"","awardID":"9505631","fundingAgent":[],'
+        '"PIcoPI":[556630]}}')
+
+
+class TestAwardSpans(unittest.TestCase):
+    """Test locating award objects in the raw JSON text."""
+
+    def test_spans_cover_award_objects(self):
+        spans = list(award_index.award_spans(TEXT))
+        self.assertEqual([doc_id for doc_id, _, _ in spans], ['9606', '1690'])
+        for _, start, end in spans:
+            self.assertEqual(TEXT[start], '{')
+            self.assertEqual(TEXT[end - 1], '}')
+
+    def test_unterminated_string(self):
+        spans = award_index.award_spans(TEXT[:30])
+        self.assertRaises(ValueError, list, spans)
+
+
+class TestAwardIndex(unittest.TestCase):
+    """Test building, saving, and reading through the index."""
+
+    def setUp(self):
+        self.dirpath = tempfile.mkdtemp()
+        self.filepath = os.path.join(self.dirpath, 'docs-1995-01.json')
+        with open(self.filepath, 'w') as f:
+            f.write(TEXT)
+
+    def tearDown(self):
+        shutil.rmtree(self.dirpath)
+
+    def test_read_award_by_location(self):
+        index = award_index.AwardIndex.build_json([self.filepath])
+        filename, offset, length = index.location(9505631)
+        self.assertEqual(filename, 'docs-1995-01.json')
+
+        award = award_index.read_award(self.filepath, offset, length)
+        self.assertEqual(award['awardID'], '9505631')
+        self.assertEqual(index.award_id('9606'), '9596119')
+
+    def test_save_and_load(self):
+        index = award_index.AwardIndex.build_json([self.filepath])
+        path = os.path.join(self.dirpath, 'index.pickle')
+        index.save(path)
+
+        loaded = award_index.AwardIndex.load(path)
+        self.assertEqual(loaded.backend, 'json')
+        self.assertEqual(loaded.locations, index.locations)
+        self.assertEqual(loaded.doc_ids, index.doc_ids)
+        self.assertRaises(KeyError, loaded.location, 'missing')
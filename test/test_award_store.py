@@ -0,0 +1,86 @@
+"""
+Tests for the columnar award store.
+
+"""
+import shutil
+import tempfile
+import unittest
+
+from api import award_store
+
+
+AWARDS = [
+    ('9606', {
+        'abstract': u'',
+        'title': u'Towards Practical Higher-Order Metalanguages',
+        'awardID': u'9596119',
+        'effectiveDate': u'1995-01-01',
+        'expirationDate': u'1997-12-31',
+        'fundingAgent': [{
+            'dir': {'id': u'05', 'name': u'CISE', 'abbr': u'CSE'},
+            'div': {'id': u'0501', 'name': u'CCF', 'abbr': u'CCF'},
+            'pgm': {'id': u'2880', 'name': u'SOFTWARE ENGINEERING'}
+        }],
+        'PIcoPI': [u'499410'],
+        'PO': [u'561889']
+    }),
+    ('1690', {
+        'abstract': u'9505631 Gribskov \xe9tude ***',
+        'title': u'CISE Postdoctoral Program',
+        'awardID': u'0505631',
+        'effectiveDate': u'1995-02-01',
+        'expirationDate': u'',
+        'fundingAgent': [],
+        'PIcoPI': [u'556630', u'499410'],
+        'PO': []
+    })
+]
+
+
+class TestAwardStore(unittest.TestCase):
+    """Test compiling and reading back the columnar store."""
+
+    def setUp(self):
+        self.dirpath = tempfile.mkdtemp()
+        documents = [(199501, 'docs-1995-01.json', AWARDS[0][0], AWARDS[0][1]),
+                     (199502, 'docs-1995-02.json', AWARDS[1][0], AWARDS[1][1])]
+        self.store = award_store.compile_store(
+            documents, self.dirpath, flush_every=1)
+
+    def tearDown(self):
+        shutil.rmtree(self.dirpath)
+
+    def test_round_trip(self):
+        for row, (_, award) in enumerate(AWARDS):
+            self.assertEqual(self.store.award(row), award)
+
+    def test_awards_in_chunks(self):
+        self.assertEqual(list(self.store.awards(chunk_size=1)),
+                         [award for _, award in AWARDS])
+        self.assertEqual(list(self.store.awards([1, 0])),
+                         [AWARDS[1][1], AWARDS[0][1]])
+        rows = self.store.source_rows(199502)
+        self.assertEqual(list(self.store.awards(rows)), [AWARDS[1][1]])
+
+    def test_id_types_preserved(self):
+        award = dict(AWARDS[1][1], PIcoPI=[564049, u'556630'], PO=[565205])
+        store = award_store.compile_store(
+            [(199501, 'docs-1995-01.json', '1', award)], self.dirpath)
+        self.assertEqual(store.award(0), award)
+        self.assertEqual(list(store.awards())[0]['PIcoPI'],
+                         [564049, u'556630'])
+
+    def test_pi_lists_share_codes(self):
+        self.assertEqual(list(self.store.column('pi_offsets')), [0, 1, 3])
+        self.assertEqual(list(self.store.column('pi_codes')), [0, 1, 0])
+
+    def test_source_rows(self):
+        self.assertEqual(list(self.store.source_rows(199502)), [1])
+        self.assertEqual(list(self.store.source_rows(199503)), [])
+
+    def test_split_source_rejected(self):
+        writer = award_store.AwardStoreWriter(self.dirpath)
+        writer.append(AWARDS[0][0], AWARDS[0][1], 199501)
+        writer.append(AWARDS[1][0], AWARDS[1][1], 199502)
+        self.assertRaises(ValueError, writer.append,
+                          AWARDS[0][0], AWARDS[0][1], 199501)
@@ -0,0 +1,40 @@
+"""
+Tests for the award table kept alongside the PI collaboration graph.
+
+"""
+import os
+import shutil
+import tempfile
+import unittest
+
+from api import award_table
+
+
+class TestAwardTable(unittest.TestCase):
+    """Test storing award attributes once per award."""
+
+    def setUp(self):
+        self.table = award_table.AwardTable()
+        self.table.append({'awardID': '9596119', 'title': 'first',
+                           'PO': ['PO 1']})
+        self.table.append({'awardID': '9505631', 'abstract': 'second'})
+
+    def test_rows_and_values(self):
+        self.assertEqual(len(self.table), 2)
+        self.assertEqual(self.table.value(1, 'awardID'), '9505631')
+        row = self.table.row(0)
+        self.assertEqual(sorted(row), sorted(award_table.COLUMNS))
+        self.assertEqual(row['PO'], ['PO 1'])
+        self.assertIsNone(row['abstract'])
+        with self.assertRaises(IndexError):
+            self.table.row(2)
+
+    def test_save_and_load(self):
+        dirpath = tempfile.mkdtemp()
+        try:
+            path = os.path.join(dirpath, 'table.pickle')
+            self.table.save(path)
+            loaded = award_table.AwardTable.load(path)
+        finally:
+            shutil.rmtree(dirpath)
+        self.assertEqual(loaded.columns, self.table.columns)
@@ -0,0 +1,90 @@
+"""
+Tests for the memory-mapped CSR graph format.
+
+"""
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+
+from api import csr_graph
+
+
+LABELS = ['556630', '499410', '100808', '7']
+EDGES = [(0, 1), (1, 2), (0, 1), (3, 1)]
+AWARDS = [0, 1, 2, 2]
+
+
+class TestCSRGraph(unittest.TestCase):
+    """Test writing a graph as CSR arrays and reading it back."""
+
+    def setUp(self):
+        self.dirpath = tempfile.mkdtemp()
+        csr_graph.write_graph(self.dirpath, LABELS, EDGES, AWARDS)
+        self.graph = csr_graph.CSRGraph(self.dirpath)
+
+    def tearDown(self):
+        shutil.rmtree(self.dirpath)
+
+    def test_adjacency(self):
+        self.assertEqual(self.graph.vcount(), 4)
+        self.assertEqual(self.graph.ecount(), 4)
+        self.assertEqual(self.graph.neighbors(1).tolist(), [0, 0, 2, 3])
+        self.assertEqual(sorted(self.graph.incident(1).tolist()),
+                         [0, 1, 2, 3])
+        self.assertEqual(self.graph.degrees().tolist(), [2, 4, 1, 1])
+        self.assertEqual(
+            self.graph.edge_awards(self.graph.incident(2)).tolist(), [1])
+        self.assertIsInstance(self.graph.array('neighbors'), np.memmap)
+
+    def test_labels(self):
+        self.assertEqual(self.graph.labels(), LABELS)
+        self.assertEqual(self.graph.label(3), '7')
+        self.assertEqual(self.graph.vertex_id('100808'), 2)
+        with self.assertRaises(KeyError):
+            self.graph.vertex_id('1')
+
+    def test_round_trip_through_igraph(self):
+        award_ids = ['a', 'b', 'c']
+        g = self.graph.to_igraph(award_ids)
+        # igraph stores undirected edges as (min, max)
+        normalized = [tuple(sorted(edge)) for edge in EDGES]
+        self.assertEqual(g.vs['name'], LABELS)
+        self.assertEqual(g.get_edgelist(), normalized)
+        self.assertEqual(g.es['awardID'], ['a', 'b', 'c', 'c'])
+
+        csr_graph.write_igraph(g, self.dirpath)
+        loaded = csr_graph.CSRGraph(self.dirpath).to_igraph()
+        self.assertEqual(loaded.get_edgelist(), normalized)
+        self.assertEqual(loaded.es['awardID'], ['a', 'b', 'c', 'c'])
+        self.assertEqual(loaded.es['label'], ['a', 'b', 'c', 'c'])
+
+    def test_award_ids_are_optional(self):
+        g = self.graph.to_igraph(['a', 'b', 'c'])
+        csr_graph.write_igraph(g, self.dirpath, award_ids=False)
+        graph = csr_graph.CSRGraph(self.dirpath)
+        self.assertIsNone(graph.edge_award_ids())
+        self.assertNotIn('awardID', graph.to_igraph().es.attributes())
+
+    def test_empty_graph(self):
+        csr_graph.write_graph(self.dirpath, ['1'], [])
+        graph = csr_graph.CSRGraph(self.dirpath)
+        self.assertEqual(graph.neighbors(0).tolist(), [])
+        self.assertEqual(graph.to_igraph().ecount(), 0)
+
+    def test_attributes_it_cannot_store_are_refused(self):
+        g = self.graph.to_igraph(['a', 'b', 'c'])
+        g.es['weight'] = [1, 2, 1, 1]
+        self.assertRaises(ValueError, csr_graph.write_igraph, g, self.dirpath)
+
+        g = self.graph.to_igraph(['a', 'b', 'c'])
+        del g.es['award']
+        self.assertRaises(ValueError, csr_graph.write_igraph, g,
+                          self.dirpath, award_ids=False)
+
+    def test_edges_without_awards(self):
+        csr_graph.write_graph(self.dirpath, LABELS, EDGES)
+        g = csr_graph.CSRGraph(self.dirpath).to_igraph()
+        self.assertEqual(g.ecount(), 4)
+        self.assertNotIn('award', g.es.attributes())
@@ -2,3 +2,98 @@
 Tests for the data module.
 
 """
+import os
+import json
+import shutil
+import tempfile
+import unittest
+
+from api import data
+
+
+FILES = {
+    (1995, 1): {'1': {'awardID': '1', 'PIcoPI': [10]},
+                '2': {'awardID': '2', 'PIcoPI': ['11']}},
+    (1995, 2): {'3': {'awardID': '3', 'PIcoPI': [12]}},
+    (1995, 3): {},
+    (1995, 4): {'4': {'awardID': '4', 'PIcoPI': [10, 13]}}
+}
+
+
+def write_files(dirpath, files):
+    paths = []
+    for (year, month), docs in sorted(files.items()):
+        path = os.path.join(dirpath, 'docs-{}-{:02d}.json'.format(year, month))
+        with open(path, 'w') as f:
+            json.dump(docs, f)
+        paths.append(path)
+    return paths
+
+
+class TestParallelAwards(unittest.TestCase):
+    """Test decoding the JSON files in a pool of worker processes."""
+
+    def setUp(self):
+        self.dirpath = tempfile.mkdtemp()
+        self.paths = write_files(self.dirpath, FILES)
+        self.json_dir = data.JSON_DIR
+        data.JSON_DIR = self.dirpath
+
+    def tearDown(self):
+        data.JSON_DIR = self.json_dir
+        shutil.rmtree(self.dirpath)
+
+    def award_ids(self, **kwargs):
+        awards = data.DataDirectory('json').awards(
+            year_start=1995, year_end=1995, **kwargs)
+        return [award['awardID'] for award in awards]
+
+    def test_same_order_as_sequential(self):
+        sequential = self.award_ids()
+        self.assertEqual(sorted(sequential), ['1', '2', '3', '4'])
+        self.assertEqual(sequential[2:], ['3', '4'])
+        self.assertEqual(self.award_ids(workers=2), sequential)
+        self.assertEqual(self.award_ids(workers=3, prefetch=1), sequential)
+
+    def test_files_in_order(self):
+        per_file = list(data._parallel_file_awards(self.paths, 2, 1))
+        self.assertEqual([len(awards) for awards in per_file], [2, 1, 0, 1])
+        self.assertEqual(per_file[3], [FILES[(1995, 4)]['4']])
+
+    def test_worker_error_propagates(self):
+        with open(self.paths[1], 'w') as f:
+            f.write('{"3": {"awardID": ')
+        per_file = data._parallel_file_awards(self.paths, 2, 2)
+        self.assertEqual(len(next(per_file)), 2)
+        self.assertRaises(ValueError, next, per_file)
+
+    def test_consumer_stops_early(self):
+        per_file = data._parallel_file_awards(self.paths, 2, 1)
+        self.assertEqual(len(next(per_file)), 2)
+        per_file.close()  # terminates the pool
+        self.assertRaises(StopIteration, next, per_file)
+
+
+class TestAllAwards(unittest.TestCase):
+    """Test reading every award, beyond the default range of years."""
+
+    def setUp(self):
+        self.dirpath = tempfile.mkdtemp()
+        files = dict(FILES)
+        files[(2016, 1)] = {'5': {'awardID': '5', 'PIcoPI': [14]}}
+        self.paths = write_files(self.dirpath, files)
+        self.json_dir = data.JSON_DIR
+        data.JSON_DIR = self.dirpath
+
+    def tearDown(self):
+        data.JSON_DIR = self.json_dir
+        shutil.rmtree(self.dirpath)
+
+    def test_covers_input_files(self):
+        directory = data.DataDirectory('json')
+        self.assertEqual(directory.input_files(), self.paths)
+        award_ids = [award['awardID'] for award in directory.all_awards()]
+        self.assertEqual(sorted(award_ids), ['1', '2', '3', '4', '5'])
+        self.assertEqual(award_ids[-1], '5')
+        self.assertNotIn(
+            '5', [award['awardID'] for award in directory.awards()])
@@ -0,0 +1,64 @@
+"""
+Tests for the award date index.
+
+"""
+import unittest
+
+from api import date_index
+
+
+class TestDateIndex(unittest.TestCase):
+    """Test active-award range queries."""
+
+    def setUp(self):
+        self.index = date_index.DateIndex(
+            ['long', 'short', 'later', 'undated'],
+            ['1995-01-01', '1999-06-01', '2003-01-01', 'NaT'],
+            ['2004-12-31', '1999-06-30', '2005-01-01', '2000-01-01'])
+
+    def test_drops_undated_awards(self):
+        self.assertEqual(len(self.index), 3)
+
+    def test_overlapping_awards_are_active(self):
+        active = list(self.index.active('1999-06-15', '1999-07-15'))
+        self.assertEqual(active, ['long', 'short'])
+
+    def test_range_bounds_are_inclusive(self):
+        self.assertEqual(list(self.index.active('2004-12-31', '2004-12-31')),
+                         ['long', 'later'])
+        self.assertEqual(list(self.index.active('2005-01-02', '2010-01-01')),
+                         [])
+
+    def test_open_ended_awards_stay_active(self):
+        index = date_index.DateIndex(
+            ['open', 'closed'], ['2001-01-01', '2001-01-01'],
+            ['NaT', '2001-12-31'])
+        self.assertEqual(len(index), 2)
+        self.assertEqual(list(index.active('2010-01-01', '2010-12-31')),
+                         ['open'])
+        self.assertEqual(list(index.active('1999-01-01', '2000-12-31')), [])
+
+    def test_matches_linear_scan(self):
+        effective = []
+        expiration = []
+        for i in range(200):
+            start = 10000 + (i * 7919) % 5000
+            effective.append(start)
+            expiration.append(start + (i * 104729) % (1 << (i % 13)))
+        index = date_index.DateIndex(
+            [str(i) for i in range(200)],
+            [date_index.to_date('1970-01-01') + day for day in effective],
+            [date_index.to_date('1970-01-01') + day for day in expiration])
+        for first in range(9000, 16000, 250):
+            last = first + 30
+            expected = set(str(i) for i in range(200)
+                           if effective[i] <= last and expiration[i] >= first)
+            start = date_index.to_date('1970-01-01') + first
+            end = date_index.to_date('1970-01-01') + last
+            self.assertEqual(set(index.active(start, end)), expected)
+
+    def test_str_reports_days(self):
+        self.assertEqual(
+            str(self.index),
+            'Date index of 3 awards, longest running 3652 days, '
+            '0 open-ended.')
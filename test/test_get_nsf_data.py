@@ -0,0 +1,142 @@
+"""
+Tests for the NSF award archive downloader, run against a local stand-in
+for nsf.gov.
+
+"""
+import os
+import imp
+import shutil
+import zipfile
+import tempfile
+import threading
+import unittest
+import urlparse
+import cStringIO
+import BaseHTTPServer
+import SocketServer
+
+
+get_nsf_data = imp.load_source('get_nsf_data', os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    'db', 'get_nsf_data.py'))
+
+
+def make_archive(year):
+    content = cStringIO.StringIO()
+    with zipfile.ZipFile(content, 'w', zipfile.ZIP_DEFLATED) as archive:
+        for i in xrange(20):
+            archive.writestr('{}{:05d}.xml'.format(year, i),
+                             os.urandom(2000))  # incompressible
+    return content.getvalue()
+
+
+ARCHIVES = {'1995': make_archive(1995), '1996': make_archive(1996)}
+
+
+class StandInHandler(BaseHTTPServer.BaseHTTPRequestHandler):
+    """Serve the yearly archives, honouring byte ranges."""
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        query = urlparse.parse_qs(urlparse.urlparse(self.path).query)
+        content = ARCHIVES.get(query['DownloadFileName'][0])
+        if content is None:
+            self.send_error(404)
+            return
+
+        self.server.ranges.append(self.headers.getheader('range'))
+        start = 0
+        if self.headers.getheader('range') and self.server.ranges_supported:
+            start = int(self.headers.getheader('range')[6:].rstrip('-'))
+            if start >= len(content):
+                self.send_response(416)
+                self.send_header('content-length', '0')
+                self.end_headers()
+                return
+            self.send_response(206)
+            self.send_header('content-range', 'bytes {}-{}/{}'.format(
+                start, len(content) - 1, len(content)))
+        else:
+            self.send_response(200)
+        self.send_header('content-type', 'application/zip')
+        self.send_header('content-length', str(len(content) - start))
+        self.end_headers()
+        self.wfile.write(content[start:])
+
+
+class StandInServer(SocketServer.ThreadingMixIn, BaseHTTPServer.HTTPServer):
+    daemon_threads = True
+
+    def __init__(self):
+        BaseHTTPServer.HTTPServer.__init__(
+            self, ('127.0.0.1', 0), StandInHandler)
+        self.ranges = []
+        self.ranges_supported = True
+
+
+class TestDownloads(unittest.TestCase):
+    """Test streaming, resuming, and skipping yearly downloads."""
+
+    def setUp(self):
+        self.server = StandInServer()
+        thread = threading.Thread(target=self.server.serve_forever)
+        thread.daemon = True
+        thread.start()
+
+        self.url = get_nsf_data.NSF_AWARDS_URL
+        get_nsf_data.NSF_AWARDS_URL = 'http://127.0.0.1:{}/download'.format(
+            self.server.server_address[1])
+        self.dirpath = tempfile.mkdtemp()
+
+    def tearDown(self):
+        get_nsf_data.NSF_AWARDS_URL = self.url
+        shutil.rmtree(self.dirpath)
+        self.server.shutdown()
+        self.server.server_close()
+
+    def read(self, year):
+        with open(os.path.join(self.dirpath, year + '.zip'), 'rb') as f:
+            return f.read()
+
+    def test_parallel_downloads_are_skipped_when_complete(self):
+        failed = get_nsf_data.request_all(
+            self.dirpath, ['1995', '1996', '1997'], jobs=3)
+        self.assertEqual(failed, ['1997'])
+        self.assertEqual(self.read('1995'), ARCHIVES['1995'])
+        self.assertEqual(self.read('1996'), ARCHIVES['1996'])
+        self.assertTrue(get_nsf_data.is_complete('1996', self.dirpath))
+
+        requests = len(self.server.ranges)
+        get_nsf_data.request_all(self.dirpath, ['1995', '1996'])
+        self.assertEqual(len(self.server.ranges), requests)
+
+        # a corrupted archive no longer matches its checksum
+        with open(os.path.join(self.dirpath, '1996.zip'), 'r+b') as f:
+            f.seek(100)
+            f.write('corrupt')
+        self.assertFalse(get_nsf_data.is_complete('1996', self.dirpath))
+        get_nsf_data.request_data('1996', self.dirpath)
+        self.assertEqual(self.read('1996'), ARCHIVES['1996'])
+
+    def test_partial_download_is_resumed(self):
+        part_file = os.path.join(self.dirpath, '1995.zip.part')
+        for ranges_supported in (True, False):
+            self.server.ranges_supported = ranges_supported
+            with open(part_file, 'wb') as f:
+                f.write(ARCHIVES['1995'][:10000])
+            get_nsf_data.request_data('1995', self.dirpath, force=True)
+            self.assertEqual(self.server.ranges[-1], 'bytes=10000-')
+            self.assertEqual(self.read('1995'), ARCHIVES['1995'])
+            self.assertFalse(os.path.exists(part_file))
+
+    def test_corrupt_partial_download_is_removed(self):
+        part_file = os.path.join(self.dirpath, '1995.zip.part')
+        with open(part_file, 'wb') as f:
+            f.write('x' * 10000)
+        with self.assertRaises(zipfile.BadZipfile):
+            get_nsf_data.request_data('1995', self.dirpath)
+        self.assertFalse(os.path.exists(part_file))
+        get_nsf_data.request_data('1995', self.dirpath)
+        self.assertEqual(self.read('1995'), ARCHIVES['1995'])
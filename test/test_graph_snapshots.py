@@ -0,0 +1,91 @@
+"""
+Tests for the yearly snapshots of the PI collaboration graph.
+
+"""
+import os
+import shutil
+import tempfile
+import unittest
+
+from api import parse
+from api import graph_snapshots
+
+
+def award(award_id, pi_ids, date):
+    return {
+        'awardID': award_id,
+        'PIcoPI': pi_ids,
+        'abstract': u'abstract',
+        'title': u'title',
+        'effectiveDate': date,
+        'expirationDate': '2005-12-31',
+        'PO': [],
+        'fundingAgent': []
+    }
+
+
+AWARDS = [
+    award('1', ['10', '11', '12'], '2001-01-01'),
+    award('2', ['13'], '2001-06-01'),
+    award('3', ['14', '10'], '2002-03-01'),
+    award('4', ['11', '12'], '2002-11-01'),
+    award('5', ['15'], '2003-01-01')
+]
+
+
+def edge_set(g):
+    return sorted((tuple(sorted((g.vs[e.source]['name'],
+                                 g.vs[e.target]['name']))), e['awardID'])
+                  for e in g.es)
+
+
+class TestGraphSnapshots(unittest.TestCase):
+    """Test saving yearly deltas and rebuilding the graphs from them."""
+
+    def setUp(self):
+        self.dirpath = tempfile.mkdtemp()
+        sink = graph_snapshots.SnapshotSink()
+        for award_data in AWARDS:
+            sink.consume(award_data)
+        path = os.path.join(self.dirpath, 'snapshots.npz')
+        table_path = os.path.join(self.dirpath, 'table.pickle')
+        graph_snapshots.save_snapshots(sink, path, table_path)
+        self.snapshots = graph_snapshots.GraphSnapshots(path, table_path)
+
+    def tearDown(self):
+        shutil.rmtree(self.dirpath)
+
+    def graph(self, awards):
+        sink = parse.GraphSink()
+        for award_data in awards:
+            sink.consume(award_data)
+        return sink.result()
+
+    def test_year_graphs(self):
+        self.assertEqual(self.snapshots.years(), [2001, 2002, 2003])
+        for year, awards in ((2001, AWARDS[:2]), (2002, AWARDS[2:4]),
+                             (2003, AWARDS[4:])):
+            g = self.snapshots.year_graph(year)
+            expected = self.graph(awards)
+            self.assertEqual(g.vs['name'], expected.vs['name'])
+            self.assertEqual(g.get_edgelist(), expected.get_edgelist())
+            self.assertEqual(edge_set(g), edge_set(expected))  # 2003 has none
+
+    def test_cumulative_graphs(self):
+        for year, count in ((2001, 2), (2002, 4), (2003, 5)):
+            g = self.snapshots.cumulative(year)
+            expected = self.graph(AWARDS[:count])
+            self.assertEqual(g.vs['name'], expected.vs['name'])
+            self.assertEqual(edge_set(g), edge_set(expected))
+
+        table = self.snapshots.award_table()
+        g = self.snapshots.cumulative(2002)
+        self.assertEqual(table.resolve(g.es, 'awardID'), g.es['awardID'])
+        with self.assertRaises(KeyError):
+            self.snapshots.cumulative(2004)
+
+    def test_chronological_order_is_required(self):
+        sink = graph_snapshots.SnapshotSink()
+        sink.consume(AWARDS[2])
+        with self.assertRaises(ValueError):
+            sink.consume(AWARDS[0])
@@ -0,0 +1,122 @@
+"""
+Tests for the hypergraph of PIs and awards.
+
+"""
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+
+from api import incidence
+from api import hypergraph
+
+
+def award(award_id, pi_ids):
+    return {'awardID': award_id, 'PIcoPI': pi_ids}
+
+
+AWARDS = [
+    award('1', ['10', '11', '12']),
+    award('2', ['12']),
+    award('3', ['13', '10']),
+    award('4', ['11', '12']),
+    award('5', ['20', '21']),
+    award('6', ['22'])
+]
+
+
+def build():
+    sink = incidence.IncidenceSink()
+    for award_data in AWARDS:
+        sink.consume(award_data)
+    return hypergraph.Hypergraph.from_incidence(sink.result())
+
+
+class TestHypergraph(unittest.TestCase):
+    """Test the queries of the hypergraph."""
+
+    def setUp(self):
+        self.hypergraph = build()
+
+    def test_incidences(self):
+        self.assertEqual(self.hypergraph.vcount(), 7)
+        self.assertEqual(self.hypergraph.ecount(), 6)
+        self.assertEqual(self.hypergraph.members(0).tolist(), [0, 1, 2])
+        self.assertEqual(self.hypergraph.incident(2).tolist(), [0, 1, 3])
+        self.assertEqual(self.hypergraph.degrees().tolist(),
+                         [2, 2, 3, 1, 1, 1, 1])
+        self.assertEqual(self.hypergraph.edge_sizes().tolist(),
+                         [3, 1, 2, 2, 2, 1])
+
+    def test_neighbors(self):
+        pi = self.hypergraph.pi_index('10')
+        self.assertEqual(self.hypergraph.neighbors(pi).tolist(), [1, 2, 3])
+        self.assertEqual(self.hypergraph.neighbors(pi, max_size=2).tolist(),
+                         [3])
+        self.assertEqual(self.hypergraph.neighbors(6).tolist(), [])
+
+    def test_gather(self):
+        offsets = np.array([0, 2, 2, 5])
+        values = np.array([7, 8, 9, 10, 11])
+        self.assertEqual(
+            hypergraph.gather(offsets, values, [2, 0, 1]).tolist(),
+            [9, 10, 11, 7, 8])
+
+    def test_projection(self):
+        adjacency = self.hypergraph.projection()
+        self.assertEqual(adjacency[1, 2], 2)
+        self.assertEqual(adjacency[0, 3], 1)
+        self.assertEqual(adjacency.diagonal().tolist(), [0] * 7)
+
+        capped = self.hypergraph.projection(max_size=2)
+        self.assertEqual(capped[1, 2], 1)
+        self.assertEqual(capped[0, 1], 0)
+
+        weighted = self.hypergraph.projection(weighting=hypergraph.INVERSE)
+        self.assertAlmostEqual(weighted[1, 2], 1.5)
+        self.assertAlmostEqual(weighted[0, 1], 0.5)
+
+        self.assertRaises(ValueError, self.hypergraph.projection,
+                          weighting='log')
+
+    def test_to_igraph(self):
+        g = self.hypergraph.to_igraph()
+        self.assertEqual(g.vcount(), 7)
+        self.assertEqual(g.ecount(), 5)
+        self.assertEqual(sorted(g.es['weight']), [1, 1, 1, 1, 2])
+
+    def test_stats(self):
+        self.assertEqual(self.hypergraph.clique_degrees().tolist(),
+                         [3, 3, 3, 1, 1, 1, 0])
+        stats = self.hypergraph.stats()
+        self.assertEqual(stats['incidences'], 11)
+        self.assertEqual(stats['clique_edges'], 6)
+        self.assertEqual(stats['max_award_size'], 3)
+        self.assertEqual(stats['solo_pis'], 1)
+        self.assertEqual(stats['components'], 3)
+        self.assertEqual(stats['largest_component'], 4)
+
+
+class TestHypergraphFiles(unittest.TestCase):
+    """Test saving a hypergraph and mapping it back."""
+
+    def setUp(self):
+        self.dirpath = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.dirpath)
+
+    def test_round_trip(self):
+        built = build()
+        built.save(self.dirpath)
+        loaded = hypergraph.Hypergraph.load(self.dirpath)
+        self.assertEqual(loaded.pi_ids, built.pi_ids)
+        self.assertEqual(loaded.award_ids, built.award_ids)
+        for name in built.arrays:
+            self.assertEqual(loaded.arrays[name].tolist(),
+                             built.arrays[name].tolist())
+        self.assertEqual(loaded.stats(), built.stats())
+
+    def test_missing(self):
+        self.assertRaises(IOError, hypergraph.Hypergraph.load, self.dirpath)
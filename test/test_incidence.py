@@ -0,0 +1,76 @@
+"""
+Tests for the PI-award incidence matrix.
+
+"""
+import unittest
+
+from api import incidence
+
+
+def award(award_id, pi_ids):
+    return {'awardID': award_id, 'PIcoPI': pi_ids}
+
+
+AWARDS = [
+    award('1', ['10', '11', '12']),
+    award('2', ['12']),
+    award(3, [13, '10']),
+    award('4', ['11', '12', '11'])
+]
+
+
+def pair_weights(g):
+    return {tuple(sorted((g.vs[e.source]['name'], g.vs[e.target]['name']))):
+            e['weight'] for e in g.es}
+
+
+class TestIncidence(unittest.TestCase):
+    """Test the incidence matrix and the statistics derived from it."""
+
+    def setUp(self):
+        sink = incidence.IncidenceSink()
+        for award_data in AWARDS:
+            sink.consume(award_data)
+        self.incidence = sink.result()
+
+    def test_matrix(self):
+        self.assertEqual(self.incidence.pi_ids, ['10', '11', '12', '13'])
+        self.assertEqual(self.incidence.award_ids, ['1', '2', '3', '4'])
+        self.assertEqual(self.incidence.matrix.toarray().tolist(), [
+            [1, 0, 1, 0], [1, 0, 0, 1], [1, 1, 0, 1], [0, 0, 1, 0]])
+
+    def test_counts(self):
+        self.assertEqual(self.incidence.pi_award_counts().tolist(),
+                         [2, 2, 3, 1])
+        self.assertEqual(self.incidence.award_pi_counts().tolist(),
+                         [3, 1, 2, 2])
+        self.assertEqual(self.incidence.shared_awards('11', '12'), 2)
+        self.assertEqual(self.incidence.shared_awards(13, '12'), 0)
+        self.assertEqual(self.incidence.adjacency().diagonal().tolist(),
+                         [0, 0, 0, 0])
+
+    def test_edges(self):
+        sources, targets, weights = self.incidence.edges()
+        self.assertEqual(
+            zip(sources.tolist(), targets.tolist(), weights.tolist()),
+            [(0, 1, 1), (0, 2, 1), (0, 3, 1), (1, 2, 2)])
+
+        sources, targets, weights = self.incidence.edges(
+            ['11', '12', '99'])
+        self.assertEqual(
+            zip(sources.tolist(), targets.tolist(), weights.tolist()),
+            [(1, 2, 2)])
+        self.assertEqual(len(self.incidence.edges(min_shared=2)[0]), 1)
+
+    def test_igraph(self):
+        g = self.incidence.to_igraph()
+        self.assertTrue(g.is_simple())
+        self.assertEqual(g.vs['name'], ['10', '11', '12', '13'])
+        self.assertEqual(pair_weights(g), {
+            ('10', '11'): 1, ('10', '12'): 1, ('10', '13'): 1,
+            ('11', '12'): 2})
+
+    def test_igraph_subset(self):
+        g = self.incidence.to_igraph(['13', '10', '12'])
+        self.assertEqual(g.vs['label'], ['10', '12', '13'])
+        self.assertEqual(pair_weights(g), {('10', '12'): 1, ('10', '13'): 1})
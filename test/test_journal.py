@@ -0,0 +1,63 @@
+"""
+Tests for the journal of completed work.
+
+"""
+import os
+import shutil
+import tempfile
+import unittest
+
+from api import journal
+
+
+class TestJournal(unittest.TestCase):
+    """Test recording and replaying completed units."""
+
+    def setUp(self):
+        self.dirpath = tempfile.mkdtemp()
+        self.path = os.path.join(self.dirpath, 'journal.log')
+
+    def tearDown(self):
+        shutil.rmtree(self.dirpath)
+
+    def test_replay(self):
+        first = journal.Journal(self.path)
+        first.record('month', '1995-01-05')
+        first.record_many('doc', [('9606', {'title': 't'}), (1690, None)])
+
+        second = journal.Journal(self.path)
+        self.assertEqual(len(second), 3)
+        self.assertTrue(second.done('month', '1995-01-05'))
+        self.assertTrue(second.done('doc', 1690))
+        self.assertFalse(second.done('pi', '9606'))
+        self.assertEqual(second.value('doc', '9606'), {'title': 't'})
+        self.assertEqual(second.keys('doc'), set(['9606', '1690']))
+
+    def test_partial_line_is_ignored(self):
+        journal.Journal(self.path).record('pi', '499410')
+        with open(self.path, 'a') as f:
+            f.write('{"kind": "pi", "key": "55')
+
+        replayed = journal.Journal(self.path)
+        self.assertEqual(replayed.keys('pi'), set(['499410']))
+
+    def test_completed_units_are_forgotten(self):
+        first = journal.Journal(self.path)
+        first.record_many('doc', [('9606', {'title': 't'}), ('1690', None),
+                                  ('1691', None)])
+        first.record('month', '1995-01-05', forget={'doc': ['9606', 1690]})
+        self.assertEqual(first.keys('doc'), set(['1691']))
+
+        second = journal.Journal(self.path)
+        self.assertEqual(second.keys('doc'), set(['1691']))
+        self.assertTrue(second.done('month', '1995-01-05'))
+        with open(self.path) as f:
+            self.assertEqual(len(f.readlines()), 2)  # compacted
+
+    def test_without_replay(self):
+        journal.Journal(self.path).record('pi', '499410')
+        fresh = journal.Journal(self.path, replay=False)
+        self.assertFalse(fresh.done('pi', '499410'))
+        fresh.record('pi', '556630')
+        self.assertEqual(journal.Journal(self.path).keys('pi'),
+                         set(['499410', '556630']))
@@ -0,0 +1,34 @@
+"""
+Tests for the incremental JSON reader.
+
+"""
+import json
+import unittest
+from cStringIO import StringIO
+
+from api import json_stream
+
+
+TEXT = ('{"9606":{"abstract":"braces {in} \\"quoted\\" text \\\\","awardID":'
+        '"9596119","fundingAgent":[{"dir":{"id":"05"}}],"PIcoPI":["499410"]},'
+        '"1690":{"abstract":"","awardID":"9505631","fundingAgent":[],'
+        '"PIcoPI":[556630]}}')
+
+
+class TestIterAwardObjects(unittest.TestCase):
+    """Test scanning award objects across chunk boundaries."""
+
+    def test_matches_full_decode_for_any_chunk_size(self):
+        expected = json.loads(TEXT)
+        for chunk_size in (1, 2, 3, 7, 64, len(TEXT)):
+            objects = json_stream.iter_award_objects(
+                StringIO(TEXT), chunk_size)
+            for doc_id, offset, raw in objects:
+                self.assertEqual(TEXT[offset:offset + len(raw)], raw)
+                self.assertEqual(json.loads(raw), expected.pop(doc_id))
+            self.assertEqual(expected, {})
+            expected = json.loads(TEXT)
+
+    def test_unterminated_string(self):
+        objects = json_stream.iter_award_objects(StringIO(TEXT[:30]), 4)
+        self.assertRaises(ValueError, list, objects)
@@ -0,0 +1,65 @@
+"""
+Tests for the record linkage engine.
+
+"""
+import unittest
+
+from api import linkage
+
+
+class TestKeys(unittest.TestCase):
+    """Test name normalization and blocking keys."""
+
+    def test_name_tokens(self):
+        self.assertEqual(linkage.name_tokens(u'Jos\xe9 Garc\xeda-L\xf3pez Jr.'),
+                         ['jose', 'garcia', 'lopez'])
+
+    def test_soundex(self):
+        self.assertEqual(linkage.soundex('robert'), 'r163')
+        self.assertEqual(linkage.soundex('rupert'), 'r163')
+        self.assertEqual(linkage.soundex('ashcraft'), 'a261')
+        self.assertEqual(linkage.soundex('tymczak'), 't522')
+        self.assertEqual(linkage.soundex('pfister'), 'p236')
+        self.assertEqual(linkage.soundex(''), '')
+
+    def test_qgrams(self):
+        self.assertEqual(linkage.qgrams('ab'), ['##a', '#ab', 'ab$', 'b$$'])
+
+
+class TestLinkageEngine(unittest.TestCase):
+    """Test candidate generation, scoring, and clustering."""
+
+    def setUp(self):
+        self.ids = ['10', '11', '12', '13', '14', '15', '16']
+        names = ['John Smith', 'Jon Smith', 'Jane Doe', 'John Smith',
+                 'David Johnson', 'David Johnston', 'Mary Harrold']
+        institutions = [['3'], ['3'], ['3'], ['8'], ['5'], ['6'], ['3']]
+        self.engine = linkage.LinkageEngine(self.ids, names, institutions)
+
+    def test_candidates_are_blocked(self):
+        first, second = self.engine.candidate_pairs()
+        pairs = set(zip(first, second))
+        self.assertIn((0, 1), pairs)
+        self.assertIn((0, 3), pairs)
+        self.assertNotIn((4, 6), pairs)
+        self.assertTrue(all(i < j for i, j in pairs))
+
+    def test_scores(self):
+        scores = self.engine.score([0, 0, 0], [3, 1, 2])
+        self.assertAlmostEqual(scores[0], 1.0)
+        self.assertGreater(scores[1], scores[2])
+
+    def test_clusters(self):
+        clusters = self.engine.clusters(threshold=0.75)
+        self.assertEqual(clusters['10'], '10')
+        self.assertEqual(clusters['11'], '10')
+        self.assertEqual(clusters['13'], '10')
+        self.assertEqual(clusters['12'], '12')
+        self.assertEqual(clusters['15'], '15')
+        self.assertEqual(len(set(clusters.values())), 5)
+
+    def test_numeric_ids_compare_as_numbers(self):
+        engine = linkage.LinkageEngine(
+            ['1000', '900'], ['John Smith', 'John Smith'], [['3'], ['3']])
+        clusters = engine.clusters(threshold=0.75)
+        self.assertEqual(clusters, {'1000': '900', '900': '900'})
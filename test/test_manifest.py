@@ -0,0 +1,68 @@
+"""
+Tests for the derived-artifact manifest.
+
+"""
+import os
+import shutil
+import tempfile
+import unittest
+
+from api import manifest
+
+
+class TestManifest(unittest.TestCase):
+    """Test change detection for recorded stages."""
+
+    def setUp(self):
+        self.dirpath = tempfile.mkdtemp()
+        self.inputs = [self.write('docs-1995-01.json', '{}'),
+                       self.write('docs-1995-02.json', '{}')]
+        self.output = self.write('graph.pickle', '')
+        self.path = os.path.join(self.dirpath, 'manifest.json')
+        manifest.Manifest(self.path).record(
+            'graph', self.inputs, [self.output], {'simple': True})
+
+    def tearDown(self):
+        shutil.rmtree(self.dirpath)
+
+    def write(self, name, content):
+        path = os.path.join(self.dirpath, name)
+        with open(path, 'w') as f:
+            f.write(content)
+        return path
+
+    def test_unchanged_stage_is_current(self):
+        loaded = manifest.Manifest(self.path)
+        self.assertTrue(loaded.is_current('graph', self.inputs,
+                                          {'simple': True}))
+        self.assertFalse(loaded.is_current('graph', self.inputs))
+        self.assertFalse(loaded.is_current('unknown', self.inputs))
+
+    def test_detects_changed_added_and_removed_inputs(self):
+        self.write('docs-1995-02.json', '{"1": {}}')
+        added = self.write('docs-1995-03.json', '{}')
+        loaded = manifest.Manifest(self.path)
+
+        changed, removed = loaded.changes('graph', self.inputs + [added])
+        self.assertEqual(changed, [self.inputs[1], added])
+        self.assertEqual(removed, [])
+
+        changed, removed = loaded.changes('graph', self.inputs[:1])
+        self.assertEqual(removed, [self.inputs[1]])
+
+    def test_missing_output_is_not_current(self):
+        os.remove(self.output)
+        loaded = manifest.Manifest(self.path)
+        self.assertFalse(loaded.is_current('graph', self.inputs,
+                                           {'simple': True}))
+
+    def test_record_keeps_stages_of_other_instances(self):
+        first = manifest.Manifest(self.path)
+        second = manifest.Manifest(self.path)
+        first.record('dictionary', self.inputs, [self.output])
+        second.record('tfidf', self.inputs, [self.output])
+
+        loaded = manifest.Manifest(self.path)
+        self.assertEqual(sorted(loaded.stages),
+                         ['dictionary', 'graph', 'tfidf'])
+        self.assertTrue(loaded.is_current('dictionary', self.inputs))
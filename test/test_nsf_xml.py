@@ -0,0 +1,148 @@
+"""
+Tests for the NSF XML archive ingestion pipeline.
+
+"""
+import os
+import shutil
+import zipfile
+import tempfile
+import unittest
+from cStringIO import StringIO
+
+from api import nsf_xml
+
+
+AWARD_XML = """<?xml version="1.0" encoding="UTF-8"?>
+<rootTag>
+<Award>
+<AwardTitle>Towards Practical Higher-Order Metalanguages</AwardTitle>
+<AwardEffectiveDate>{effective}</AwardEffectiveDate>
+<AwardExpirationDate>12/31/1997</AwardExpirationDate>
+<AwardAmount>100000</AwardAmount>
+<Organization>
+<Code>05010000</Code>
+<Directorate>
+<Abbreviation>CSE</Abbreviation>
+<LongName>Direct For Computer &amp; Info Scie &amp; Enginr</LongName>
+</Directorate>
+<Division>
+<Abbreviation>CCF</Abbreviation>
+<LongName>Division of Computing and Communication Foundations</LongName>
+</Division>
+</Organization>
+<ProgramOfficer>
+<SignBlockName>Jane  Doe</SignBlockName>
+</ProgramOfficer>
+<AbstractNarration>An abstract.</AbstractNarration>
+<AwardID>{award_id}</AwardID>
+<Investigator>
+<FirstName>Frank</FirstName>
+<LastName>Pfenning</LastName>
+<EmailAddress>FP@cs.cmu.edu</EmailAddress>
+<RoleCode>Principal Investigator</RoleCode>
+</Investigator>
+<Investigator>
+<FirstName>Peter</FirstName>
+<LastName>Lee</LastName>
+<EmailAddress></EmailAddress>
+<RoleCode>Co-Principal Investigator</RoleCode>
+</Investigator>
+<ProgramElement>
+<Code>2880</Code>
+<Text>SOFTWARE ENGINEERING AND LANGU</Text>
+</ProgramElement>
+<ProgramElement>
+<Code>2885</Code>
+<Text>CISE RESEARCH INFRASTRUCTURE</Text>
+</ProgramElement>
+</Award>
+</rootTag>
+"""
+
+
+def award_xml(award_id, effective='01/01/1995'):
+    return AWARD_XML.format(award_id=award_id, effective=effective)
+
+
+class TestParseAward(unittest.TestCase):
+    """Test converting award XML into the JSON layout."""
+
+    def test_fields(self):
+        award = nsf_xml.parse_award(StringIO(award_xml('9596119')))
+        self.assertEqual(award['awardID'], '9596119')
+        self.assertEqual(award['effectiveDate'], '1995-01-01')
+        self.assertEqual(award['expirationDate'], '1997-12-31')
+        self.assertEqual(award['abstract'], 'An abstract.')
+        self.assertEqual(award['PIcoPI'], ['fp@cs.cmu.edu', 'lee, peter'])
+        self.assertEqual(award['PO'], ['jane doe'])
+
+    def test_funding_agents(self):
+        award = nsf_xml.parse_award(StringIO(award_xml('9596119')))
+        agents = award['fundingAgent']
+        self.assertEqual([agent['pgm']['id'] for agent in agents],
+                         ['2880', '2885'])
+        self.assertEqual(agents[0]['dir']['id'], '05')
+        self.assertEqual(agents[0]['div'],
+                         {'id': '0501', 'abbr': 'CCF', 'name':
+                          'Division of Computing and Communication '
+                          'Foundations'})
+
+    def test_missing_award_id(self):
+        self.assertRaises(SyntaxError, nsf_xml.parse_award,
+                          StringIO(award_xml('')))
+
+    def test_parse_date(self):
+        self.assertEqual(nsf_xml.parse_date('9/1/2014'), '2014-09-01')
+        self.assertEqual(nsf_xml.parse_date('2014-09-01T00:00:00'),
+                         '2014-09-01')
+        self.assertEqual(nsf_xml.parse_date(''), '')
+
+
+class TestArchives(unittest.TestCase):
+    """Test reading awards from zip archives."""
+
+    def setUp(self):
+        self.dirpath = tempfile.mkdtemp()
+        self.zip_paths = []
+        contents = {
+            '1995': [('9596119', '03/01/1995'), ('9505631', '01/01/1995')],
+            '1996': [('9505631', '01/01/1995'), ('9600001', '')]
+        }
+        for year in sorted(contents):
+            path = os.path.join(self.dirpath, year + '.zip')
+            with zipfile.ZipFile(path, 'w') as archive:
+                for award_id, effective in contents[year]:
+                    archive.writestr(award_id + '.xml',
+                                     award_xml(award_id, effective))
+            self.zip_paths.append(path)
+
+    def tearDown(self):
+        shutil.rmtree(self.dirpath)
+
+    def test_member_order(self):
+        for workers in (None, 2):
+            awards = nsf_xml.iter_archive_awards(
+                self.zip_paths, workers, batch_size=1)
+            self.assertEqual([award['awardID'] for award in awards],
+                             ['9596119', '9505631', '9505631', '9600001'])
+
+    def test_compile_store_by_effective_month(self):
+        store = nsf_xml.compile_xml_store(
+            self.zip_paths, os.path.join(self.dirpath, 'store'))
+        self.assertEqual(len(store), 3)
+        self.assertEqual([source[:2] for source in store.sources],
+                         [(199501, 0), (199503, 1), (199601, 2)])
+        award = store.award(store.source_rows(199503)[0])
+        self.assertEqual(award['awardID'], '9596119')
+        self.assertEqual(award['PIcoPI'], ['fp@cs.cmu.edu', 'lee, peter'])
+
+    def test_undated_award_stored_under_archive_year(self):
+        store = nsf_xml.compile_xml_store(
+            self.zip_paths, os.path.join(self.dirpath, 'store'))
+        award = store.award(store.source_rows(199601)[0])
+        self.assertEqual(award['awardID'], '9600001')
+        self.assertEqual(award['effectiveDate'], '')
+
+    def test_archive_year(self):
+        self.assertEqual(nsf_xml.archive_year('/data/nsf/2014.zip'), 2014)
+        self.assertEqual(nsf_xml.archive_year('awards.zip'), None)
@@ -2,3 +2,268 @@
 Tests for the parse module.
 
 """
+import os
+import json
+import shutil
+import tempfile
+import itertools
+import unittest
+
+import igraph
+
+from api import data
+from api import parse
+from api import repdoc_writer
+
+
+def award(award_id, pi_ids, abstract=u'abstract', date='2001-01-01'):
+    return {
+        'awardID': award_id,
+        'PIcoPI': pi_ids,
+        'abstract': abstract,
+        'title': u'title ' + award_id,
+        'effectiveDate': date,
+        'expirationDate': '2003-12-31',
+        'PO': ['PO 1'],
+        'fundingAgent': [
+            {'dir': {'id': '05', 'name': 'CISE', 'abbr': 'CSE'},
+             'div': {'id': '0501', 'name': 'CCF', 'abbr': 'CCF'},
+             'pgm': {'id': '2860', 'name': 'THEORY'}},
+            {'dir': {'id': '05', 'name': 'CISE', 'abbr': 'CSE'},
+             'div': {'id': '0502', 'name': 'CNS', 'abbr': 'CNS'},
+             'pgm': {'id': '2865', 'name': 'NETWORKS'}}
+        ]
+    }
+
+
+AWARDS = [
+    award('1', ['10', '11', '12']),
+    award('2', ['12']),
+    award('3', [13, '10'], date='2001-02-01'),
+    award('4', ['11', '12'], u'r\xe9sum\xe9', date='2001-02-15')
+]
+
+
+def incremental_graph(awards):
+    """Build the graph one vertex and edge at a time, as it used to be."""
+    g = igraph.Graph()
+    seen = set()
+    for award_data in awards:
+        pi_set = set()
+        for pi_id in award_data['PIcoPI']:
+            pi_id = str(pi_id)
+            pi_set.add(pi_id)
+            if pi_id not in seen:
+                g.add_vertex(pi_id, label=pi_id)
+                seen.add(pi_id)
+
+        award_id = award_data['awardID']
+        agents = award_data['fundingAgent']
+        attributes = {
+            'awardID': award_id,
+            'label': award_id,
+            'abstract': award_data['abstract'].encode('utf-8'),
+            'title': award_data['title'].encode('utf-8'),
+            'effectiveDate': award_data['effectiveDate'],
+            'expirationDate': award_data['expirationDate'],
+            'PO': award_data['PO'],
+            'dir': ','.join(agent['dir']['id'] for agent in agents),
+            'div': ','.join(agent['div']['id'] for agent in agents),
+            'pgm': ','.join(agent['pgm']['id'] for agent in agents)
+        }
+        for source, target in itertools.combinations(pi_set, 2):
+            g.add_edge(source, target, **attributes)
+    return g
+
+
+class TestGraphSink(unittest.TestCase):
+    """Test building the PI collaboration graph in bulk."""
+
+    def build(self, all_edge_attributes=True):
+        sink = parse.GraphSink(all_edge_attributes)
+        for award_data in AWARDS:
+            sink.consume(award_data)
+        self.table = sink.table
+        return sink.result()
+
+    def test_same_as_incremental_graph(self):
+        g = self.build()
+        expected = incremental_graph(AWARDS)
+        self.assertEqual(g.vs['name'], expected.vs['name'])
+        self.assertEqual(g.vs['label'], expected.vs['label'])
+        self.assertEqual(g.get_edgelist(), expected.get_edgelist())
+        self.assertEqual(sorted(g.es.attributes()),
+                         sorted(expected.es.attributes() + ['award']))
+        for name in expected.es.attributes():
+            self.assertEqual(g.es[name], expected.es[name])
+
+    def test_award_id_only(self):
+        g = self.build(all_edge_attributes=False)
+        self.assertEqual(sorted(g.es.attributes()),
+                         ['award', 'awardID', 'label'])
+        self.assertEqual(g.es['awardID'], ['1', '1', '1', '3', '4'])
+        self.assertEqual(g.es['award'], [0, 0, 0, 2, 3])
+        self.assertEqual(g.vcount(), 4)
+
+    def test_join_award_table(self):
+        g = self.build(all_edge_attributes=False)
+        self.assertEqual(len(self.table), len(AWARDS))
+        self.assertEqual(self.table.edge_value(g.es[4], 'abstract'),
+                         u'r\xe9sum\xe9'.encode('utf-8'))
+
+        expected = incremental_graph(AWARDS)
+        self.table.join(g)
+        for name in expected.es.attributes():
+            self.assertEqual(g.es[name], expected.es[name])
+
+    def test_pi_award_abstracts(self):
+        g = self.build(all_edge_attributes=False)
+        self.assertEqual(
+            sorted(repdoc_writer.pi_award_abstracts(g, self.table, '12')),
+            ['abstract', u'r\xe9sum\xe9'.encode('utf-8')])
+        g.add_vertex('14')
+        self.assertEqual(
+            repdoc_writer.pi_award_abstracts(g, self.table, '14'), [])
+
+
+class TestSimpleGraph(unittest.TestCase):
+    """Test collapsing the parallel edges of the graph while building it."""
+
+    def build(self, awards=AWARDS, dates=True):
+        sink = parse.GraphSink(simple=True, dates=dates)
+        for award_data in awards:
+            sink.consume(award_data)
+        return sink.result()
+
+    def pair_attributes(self, g, name):
+        return {tuple(sorted((g.vs[e.source]['name'],
+                              g.vs[e.target]['name']))): e[name]
+                for e in g.es}
+
+    def test_weight_counts_shared_awards(self):
+        g = self.build()
+        multigraph = incremental_graph(AWARDS)
+        self.assertTrue(g.is_simple())
+        self.assertEqual(g.vs['name'], multigraph.vs['name'])
+        self.assertEqual(sum(g.es['weight']), multigraph.ecount())
+        self.assertEqual(self.pair_attributes(g, 'weight'), {
+            ('10', '11'): 1, ('10', '12'): 1, ('11', '12'): 2,
+            ('10', '13'): 1})
+
+    def test_collaboration_dates(self):
+        later = award('5', ['12', '11'], date='2000-06-01')
+        g = self.build(AWARDS + [later, award('6', ['11', '12'], date='')])
+        self.assertEqual(self.pair_attributes(g, 'weight')[('11', '12')], 4)
+        self.assertEqual(self.pair_attributes(g, 'firstDate')[('11', '12')],
+                         '2000-06-01')
+        self.assertEqual(self.pair_attributes(g, 'lastDate')[('11', '12')],
+                         '2001-02-15')
+
+    def test_without_dates(self):
+        g = self.build(dates=False)
+        self.assertEqual(g.es.attributes(), ['weight'])
+
+    def test_all_edge_attributes_rejected(self):
+        self.assertRaises(ValueError, parse.GraphSink, True, True)
+
+    def test_awards_cannot_be_removed(self):
+        sink = parse.GraphSink(simple=True)
+        self.assertRaises(ValueError, sink.remove_sources, [200101])
+
+
+def edge_set(g):
+    return sorted((tuple(sorted((g.vs[e.source]['name'],
+                                 g.vs[e.target]['name']))), e['awardID'])
+                  for e in g.es)
+
+
+class TestGraphUpdate(unittest.TestCase):
+    """Test replacing the awards of a month in a built graph."""
+
+    def build(self, awards, sink=None):
+        sink = parse.GraphSink() if sink is None else sink
+        for award_data in awards:
+            sink.consume(award_data)
+        return sink
+
+    def test_revised_month_replaces_edges(self):
+        built = self.build(AWARDS)
+        self.assertEqual(built.table.sources(), [200101, 200102])
+
+        revised = [award('1', ['10', '11']), AWARDS[1]]
+        sink = parse.GraphSink.from_graph(built.result(), built.table)
+        self.assertEqual(sink.remove_sources([200101]), 2)
+        g = self.build(revised, sink).result()
+
+        expected = self.build(AWARDS[2:] + revised).result()
+        self.assertEqual(edge_set(g), edge_set(expected))
+        self.assertEqual(sorted(g.vs['name']), sorted(expected.vs['name']))
+        self.assertEqual(len(sink.table), 4)
+        self.assertEqual(sorted(sink.table.columns['awardID']),
+                         ['1', '2', '3', '4'])
+
+    def test_pis_without_awards_are_removed(self):
+        built = self.build(AWARDS)
+        sink = parse.GraphSink.from_graph(built.result(), built.table)
+        sink.remove_sources([200102])
+        g = sink.result()
+        self.assertEqual(g.vs['name'], ['10', '11', '12'])
+        self.assertEqual(edge_set(g), edge_set(self.build(AWARDS[:2]).result()))
+        self.assertEqual(g.es['award'], [0, 0, 0])
+
+
+def write_json_files(dirpath, awards):
+    """Write awards to JSON data files, one per month of effective date."""
+    months = {}
+    for award_data in awards:
+        month = award_data['effectiveDate'][:7]
+        months.setdefault(month, {})[award_data['awardID']] = award_data
+    for month, docs in months.items():
+        path = os.path.join(dirpath, 'docs-{}.json'.format(month))
+        with open(path, 'w') as f:
+            json.dump(docs, f)
+
+
+class TestScanAll(unittest.TestCase):
+    """Test that the single-pass scan builds what the separate parsers do."""
+
+    def setUp(self):
+        self.dirpath = tempfile.mkdtemp()
+        write_json_files(self.dirpath, AWARDS)
+        self.json_dir = data.JSON_DIR
+        data.JSON_DIR = self.dirpath
+        self.results = parse.scan_all()
+
+    def tearDown(self):
+        data.JSON_DIR = self.json_dir
+        shutil.rmtree(self.dirpath)
+
+    def test_graph(self):
+        g = parse.pi_award_graph()
+        scanned = self.results['graph']
+        self.assertEqual(scanned.vs['name'], g.vs['name'])
+        self.assertEqual(scanned.get_edgelist(), g.get_edgelist())
+        self.assertEqual(edge_set(scanned), edge_set(g))
+        self.assertEqual(scanned.es['award'], g.es['award'])
+        self.assertEqual(len(self.results['award_table']), len(AWARDS))
+
+    def test_frames(self):
+        self.assertTrue(self.results['funding_agents'].equals(
+            parse.parse_funding_agents()))
+        self.assertTrue(self.results['pairings'].equals(
+            parse.frame_pi_award_pairings()))
+        self.assertTrue(self.results['abstracts'].equals(
+            parse.frame_abstracts()))
+
+        # two agents for each PI of each award
+        self.assertEqual(len(self.results['funding_agents']), 2 * 8)
+        self.assertEqual(sorted(self.results['pairings'].index),
+                         ['10', '10', '11', '11', '12', '12', '12', '13'])
+        self.assertEqual(sorted(self.results['abstracts'].index),
+                         ['1', '2', '3', '4'])
+
+    def test_pi_ids(self):
+        self.assertEqual(self.results['pi_ids'],
+                         parse.all_pi_ids_from_files())
+        self.assertEqual(self.results['pi_ids'],
+                         set(['10', '11', '12', '13']))
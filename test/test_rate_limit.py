@@ -0,0 +1,96 @@
+"""
+Tests for the adaptive request throttle.
+
+"""
+import time
+import threading
+import unittest
+
+from api import rate_limit
+
+
+class TestTokenBucket(unittest.TestCase):
+    """Test limiting the rate of events."""
+
+    def test_rate_after_burst(self):
+        bucket = rate_limit.TokenBucket(50, capacity=5)
+        start = time.time()
+        for _ in xrange(15):
+            bucket.acquire()
+        # 5 tokens are saved up, the other 10 arrive at 50 per second
+        self.assertGreaterEqual(time.time() - start, 0.18)
+
+
+class TestThrottle(unittest.TestCase):
+    """Test the AIMD limits and counters of the throttle."""
+
+    def test_failures_back_off(self):
+        throttle = rate_limit.Throttle(rate=1024, concurrency=8)
+        throttle.acquire()
+        throttle.release(0.01, ok=False)
+        self.assertEqual(throttle.limit, 4)
+        self.assertEqual(throttle.bucket.rate, 512)
+
+        for _ in xrange(5):
+            throttle.acquire()
+            throttle.release(0.01, ok=False)
+        self.assertEqual(throttle.limit, 1)
+        self.assertEqual(throttle.bucket.rate, 16)
+
+    def test_healthy_latency_ramps_up(self):
+        throttle = rate_limit.Throttle(
+            rate=1000, max_rate=2000, concurrency=2, max_concurrency=3,
+            latency_target=0.5)
+        for _ in xrange(4):
+            throttle.acquire()
+            throttle.release(0.01)
+        self.assertEqual(int(throttle.limit), 3)
+        self.assertGreater(throttle.bucket.rate, 1000)
+
+        limit = throttle.limit
+        throttle.acquire()
+        throttle.release(1.0)  # slow, but not a failure
+        self.assertEqual(throttle.limit, limit)
+
+        for _ in xrange(100):
+            throttle.acquire()
+            throttle.release(0.01)
+        self.assertEqual(throttle.limit, 3)
+        self.assertEqual(throttle.bucket.rate, 2000)
+
+    def test_concurrency_limit(self):
+        throttle = rate_limit.Throttle(rate=1000, concurrency=2,
+                                       max_concurrency=2)
+        throttle.acquire()
+        throttle.acquire()
+        acquired = threading.Event()
+
+        def acquire():
+            throttle.acquire()
+            acquired.set()
+
+        thread = threading.Thread(target=acquire)
+        thread.start()
+        self.assertFalse(acquired.wait(0.1))
+        throttle.release(0.01)
+        self.assertTrue(acquired.wait(1))
+        thread.join()
+        self.assertEqual(throttle.in_flight, 2)
+
+    def test_stats(self):
+        throttle = rate_limit.Throttle(rate=1000)
+        self.assertNotIn('latency_p50', throttle.stats())
+        for latency in (0.1, 0.2, 0.3, 0.4):
+            throttle.acquire()
+            throttle.release(latency)
+        throttle.acquire()
+        throttle.release(5.0, ok=False)
+
+        stats = throttle.stats()
+        self.assertEqual(stats['completed'], 4)
+        self.assertEqual(stats['failed'], 1)
+        self.assertEqual(stats['in_flight'], 0)
+        self.assertEqual(stats['latency_p50'], 0.3)
+        self.assertEqual(stats['latency_p95'], 5.0)
+        self.assertGreater(stats['throughput'], 0)
+        self.assertIn('4 requests (1 failed)', str(throttle))
@@ -0,0 +1,241 @@
+"""
+Tests for the DIA2 request script, run against a local stand-in for the
+JSON-RPC endpoint.
+
+"""
+import os
+import json
+import shutil
+import tempfile
+import threading
+import unittest
+import BaseHTTPServer
+import SocketServer
+
+import requests
+
+from api import journal
+from api import request_data
+
+
+AWARDS = {
+    '9606': {'awardID': '9596119', 'PIcoPI': ['499410']},
+    '1690': {'awardID': '9505631', 'PIcoPI': ['556630']},
+    '1691': {'awardID': '9505632', 'PIcoPI': ['556630']}
+}
+
+
+class StandInHandler(BaseHTTPServer.BaseHTTPRequestHandler):
+    """Answer the JSON-RPC methods used by request_data."""
+
+    def log_message(self, *args):
+        pass
+
+    def result(self, body):
+        method = body['method']
+        params = body['params']
+        self.server.calls.append(method)
+        if method == 'Trigger':
+            return {}
+        elif method == 'GMUDataTransfer':
+            return {'data': json.loads(json.dumps(AWARDS))}
+        elif method == 'getOneTitleAbstract':
+            return {'data': {'title': 'title ' + params,
+                             'abstract': 'abstract ' + params}}
+        elif method == 'getNameGMU':
+            return {'data': [{'name': 'pi ' + params['personID']}]}
+        raise ValueError(method)
+
+    def do_POST(self):
+        length = int(self.headers.getheader('content-length'))
+        body = json.loads(self.rfile.read(length))
+        self.server.requests += 1
+        if self.server.failures:
+            self.server.failures -= 1
+            self.send_response(503)
+            self.send_header('content-length', '0')
+            self.end_headers()
+            return
+
+        if not isinstance(body, list):
+            content = json.dumps({'result': self.result(body)})
+        elif self.server.batches:
+            content = json.dumps([
+                {'jsonrpc': '2.0', 'result': self.result(call),
+                 'id': call['id']}
+                for call in reversed(body)])  # any order is allowed
+        else:
+            content = json.dumps({'error': 'batches are not supported'})
+
+        self.send_response(200)
+        self.send_header('content-type', 'application/json')
+        self.send_header('content-length', str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+
+class StandInServer(SocketServer.ThreadingMixIn, BaseHTTPServer.HTTPServer):
+    daemon_threads = True
+
+    def __init__(self):
+        BaseHTTPServer.HTTPServer.__init__(
+            self, ('127.0.0.1', 0), StandInHandler)
+        self.calls = []
+        self.requests = 0
+        self.batches = True
+        self.failures = 0
+
+
+class StandInTestCase(unittest.TestCase):
+    """Run each test against a fresh stand-in server, in a temporary
+    working directory.
+
+    """
+
+    def setUp(self):
+        self.server = StandInServer()
+        thread = threading.Thread(target=self.server.serve_forever)
+        thread.daemon = True
+        thread.start()
+
+        self.url = request_data.URL
+        request_data.URL = 'http://127.0.0.1:{}/'.format(
+            self.server.server_address[1])
+
+        self.cwd = os.getcwd()
+        self.dirpath = tempfile.mkdtemp()
+        os.chdir(self.dirpath)
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        shutil.rmtree(self.dirpath)
+        request_data.URL = self.url
+        request_data._batches_supported = True
+        request_data.disable_throttle()
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class TestRequestData(StandInTestCase):
+    """Test downloading a month of awards."""
+
+    def test_concurrent_titles_and_abstracts(self):
+        titles = request_data.get_titles_and_abstracts(AWARDS.keys(), 3)
+        self.assertEqual(sorted(titles), sorted(AWARDS))
+        self.assertEqual(titles['9606']['abstract'], 'abstract 9606')
+
+    def test_download_month(self):
+        for workers in (1, 4):
+            data = request_data.request_data(1995, 1, workers=workers)
+            self.assertEqual(data['1690']['title'], 'title 1690')
+            with open('docs-1995-01.json') as f:
+                self.assertEqual(json.load(f), data)
+
+
+class TestBatchRequests(StandInTestCase):
+    """Test batching JSON-RPC calls and falling back to single calls."""
+
+    def test_batches_are_demultiplexed(self):
+        pi_ids = ['499410', '556630', '100808']
+        names = request_data.get_names_and_affiliations(pi_ids, batch_size=2)
+        for pi_id in pi_ids:
+            self.assertEqual(names[pi_id]['result']['data'][0]['name'],
+                             'pi ' + pi_id)
+        self.assertEqual(self.server.requests, 4)
+        self.assertEqual(self.server.calls,
+                         ['Trigger', 'Trigger', 'getNameGMU', 'getNameGMU',
+                          'Trigger', 'getNameGMU'])
+
+    def test_fallback_to_single_calls(self):
+        self.server.batches = False
+        titles = request_data.get_titles_and_abstracts(
+            AWARDS.keys(), workers=1, batch_size=10)
+        self.assertEqual(titles['1691']['title'], 'title 1691')
+        self.assertEqual(self.server.requests, 1 + len(AWARDS))
+        self.assertFalse(request_data._batches_supported)
+
+
+class TestResponseCache(StandInTestCase):
+    """Test that cached responses are not requested again."""
+
+    def setUp(self):
+        StandInTestCase.setUp(self)
+        request_data.enable_cache(os.path.join(self.dirpath, 'cache'))
+
+    def tearDown(self):
+        request_data.disable_cache()
+        StandInTestCase.tearDown(self)
+
+    def test_repeated_download_is_cached(self):
+        first = request_data.request_data(1995, 1)
+        requests = self.server.requests
+        self.assertEqual(request_data.request_data(1995, 1), first)
+        self.assertEqual(self.server.requests, requests)
+
+        request_data.enable_cache(
+            os.path.join(self.dirpath, 'cache'), refresh=True)
+        request_data.request_data(1995, 1)
+        self.assertGreater(self.server.requests, requests)
+
+
+class TestResumableDownloads(StandInTestCase):
+    """Test resuming downloads from the journal."""
+
+    def setUp(self):
+        StandInTestCase.setUp(self)
+        self.progress = journal.Journal(
+            os.path.join(self.dirpath, 'journal.log'))
+
+    def test_recorded_documents_are_not_requested(self):
+        self.progress.record('doc', '9606', {'title': 't', 'abstract': 'a'})
+        data = request_data.request_data(1995, 1, progress=self.progress)
+        self.assertEqual(data['9606']['title'], 't')
+        self.assertEqual(self.server.calls.count('getOneTitleAbstract'), 2)
+        self.assertTrue(self.progress.done('month', '1995-01-05'))
+        self.assertEqual(self.progress.keys('doc'), set())
+
+        replayed = journal.Journal(self.progress.path)
+        self.assertTrue(replayed.done('month', '1995-01-05'))
+        self.assertEqual(replayed.keys('doc'), set())
+
+    def test_download_range_skips_done_months(self):
+        self.progress.record('month', '1995-02-05')
+        months = request_data.month_range('1994-12', '1995-03')
+        self.assertEqual(months, [(1994, 12), (1995, 1), (1995, 2), (1995, 3)])
+
+        failed = request_data.request_range(
+            months, jobs=2, progress=self.progress)
+        self.assertEqual(failed, [(1994, 12)])  # before the data starts
+        self.assertEqual(self.server.calls.count('GMUDataTransfer'), 2)
+        self.assertTrue(os.path.isfile('docs-1995-03.json'))
+        self.assertFalse(os.path.isfile('docs-1995-02.json'))
+
+
+class TestThrottledRequests(StandInTestCase):
+    """Test pacing requests and retrying the ones that fail."""
+
+    def setUp(self):
+        StandInTestCase.setUp(self)
+        self.throttle = request_data.enable_throttle(rate=100)
+
+    def test_5xx_responses_are_retried(self):
+        self.server.failures = 2
+        limit = self.throttle.limit
+        data = request_data.request_data(1995, 1)
+        self.assertEqual(data['9606']['title'], 'title 9606')
+
+        stats = self.throttle.stats()
+        self.assertEqual(stats['failed'], 2)
+        self.assertEqual(stats['completed'], self.server.requests - 2)
+        self.assertEqual(stats['in_flight'], 0)
+        self.assertLess(self.throttle.bucket.rate, 100)
+        self.assertLess(int(self.throttle.limit), limit)
+
+    def test_unexpected_errors_release_the_throttle(self):
+        request_data.URL = 'not a url'
+        self.assertRaises(requests.exceptions.RequestException,
+                          request_data.request_data, 1995, 1)
+
+        stats = self.throttle.stats()
+        self.assertEqual(stats['failed'], 1)
+        self.assertEqual(stats['in_flight'], 0)
@@ -0,0 +1,86 @@
+"""
+Tests for the on-disk JSON-RPC response cache.
+
+"""
+import os
+import time
+import shutil
+import tempfile
+import unittest
+
+from api import response_cache
+
+
+class TestResponseCache(unittest.TestCase):
+    """Test storing, expiring, and evicting cached responses."""
+
+    def setUp(self):
+        self.dirpath = tempfile.mkdtemp()
+        self.cache = response_cache.ResponseCache(self.dirpath)
+
+    def tearDown(self):
+        shutil.rmtree(self.dirpath)
+
+    def test_key_is_canonical(self):
+        first = response_cache.cache_key('Trigger', {'a': 1, 'b': [2, 3]})
+        second = response_cache.cache_key('Trigger', {'b': [2, 3], 'a': 1})
+        self.assertEqual(first, second)
+        self.assertNotEqual(
+            first, response_cache.cache_key('getNameGMU', {'a': 1, 'b': [2, 3]}))
+
+    def test_round_trip(self):
+        self.assertIsNone(self.cache.get('getOneTitleAbstract', '9606'))
+        response = {'result': {'data': {'title': 't', 'abstract': 'a'}}}
+        self.cache.put('getOneTitleAbstract', '9606', response)
+        self.assertEqual(self.cache.get('getOneTitleAbstract', '9606'),
+                         response)
+        self.assertEqual((self.cache.hits, self.cache.misses), (1, 1))
+
+        self.cache.refresh = True
+        self.assertIsNone(self.cache.get('getOneTitleAbstract', '9606'))
+
+    def test_errors_are_not_stored(self):
+        self.cache.put('Trigger', {}, {'error': 'try again'})
+        self.assertIsNone(self.cache.get('Trigger', {}))
+
+    def test_expired_entries_are_dropped(self):
+        self.cache.put('Trigger', {}, {'result': {}})
+        self.cache.ttl = -1
+        self.assertIsNone(self.cache.get('Trigger', {}))
+        self.assertEqual(self.cache.size(), 0)
+
+    def test_hits_do_not_extend_life(self):
+        self.cache.put('Trigger', {}, {'result': {}})
+        path = self.cache._path(response_cache.cache_key('Trigger', {}))
+        fetched = time.time() - 100
+        os.utime(path, (fetched, fetched))
+
+        self.assertIsNotNone(self.cache.get('Trigger', {}))
+        self.assertEqual(int(os.path.getmtime(path)), int(fetched))
+        self.assertGreater(os.path.getatime(path), fetched + 50)
+        self.cache.ttl = 50
+        self.assertIsNone(self.cache.get('Trigger', {}))
+
+    def test_replacing_an_entry_keeps_the_size(self):
+        response = {'result': 'x' * 100}
+        self.cache.put('m', 0, response)
+        size = self.cache.size()
+        for _ in xrange(3):
+            self.cache.put('m', 0, response)
+        self.assertEqual(self.cache._size, size)
+
+        self.cache.put('m', 0, {'result': 'x' * 50})
+        self.assertEqual(self.cache._size, self.cache.size())
+
+    def test_least_recently_used_are_evicted(self):
+        response = {'result': 'x' * 100}
+        for i in xrange(3):
+            self.cache.put('m', i, response)
+        path = self.cache._path(response_cache.cache_key('m', 0))
+        os.utime(path, (time.time() + 10, os.path.getmtime(path)))
+
+        self.cache.max_bytes = 250
+        self.cache.put('m', 3, response)
+        self.assertIsNotNone(self.cache.get('m', 0))
+        self.assertIsNone(self.cache.get('m', 1))
+        self.assertLessEqual(self.cache.size(), 225)
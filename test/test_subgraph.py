@@ -0,0 +1,73 @@
+"""
+Tests for the extraction of induced subgraphs.
+
+"""
+import unittest
+
+import igraph
+
+from api import subgraph
+
+
+LABELS = ['10', '11', '12', '13']
+EDGES = [(0, 1), (1, 2), (1, 0), (3, 1), (2, 0)]
+
+
+def make_graph():
+    return igraph.Graph(
+        n=len(LABELS), edges=EDGES,
+        vertex_attrs={'name': LABELS, 'label': list(LABELS)},
+        edge_attrs={'award': range(len(EDGES))})
+
+
+def slow_filter(graph, pis):
+    """Filter the edges the way the writers used to."""
+    return [edge.index for edge in graph.es
+            if graph.vs[edge.source]['label'] in pis
+            and graph.vs[edge.target]['label'] in pis]
+
+
+class TestInducedSubgraph(unittest.TestCase):
+    """Test extracting the subgraph induced by a set of PIs."""
+
+    def setUp(self):
+        self.graph = make_graph()
+
+    def test_vertex_ids(self):
+        ids = subgraph.vertex_ids(self.graph, ['12', '10', '99'])
+        self.assertEqual(ids.tolist(), [0, 2])
+
+    def test_label_index_is_rebuilt(self):
+        self.assertEqual(subgraph.label_index(self.graph)['13'], 3)
+        self.graph.add_vertex('14', label='14')
+        self.assertEqual(subgraph.label_index(self.graph)['14'], 4)
+
+    def test_same_as_slow_filter(self):
+        for pis in (['10', '11'], ['10', '11', '12'], ['13'], []):
+            vertices = subgraph.vertex_ids(self.graph, pis)
+            self.assertEqual(
+                subgraph.induced_edges(self.graph, vertices).tolist(),
+                slow_filter(self.graph, set(pis)))
+
+    def test_simple_drops_parallel_edges(self):
+        vertices = subgraph.vertex_ids(self.graph, ['10', '11', '12'])
+        edge_ids = subgraph.induced_edges(self.graph, vertices, simple=True)
+        self.assertEqual(edge_ids.tolist(),
+                         [edge.index for edge in self.graph.es
+                          if edge.index != 3 and not edge.is_multiple()])
+
+    def test_subgraph_and_remapping(self):
+        sub, vertices, edge_ids = subgraph.induced_subgraph(
+            self.graph, ['13', '11', '12'])
+        self.assertEqual(vertices.tolist(), [1, 2, 3])
+        self.assertEqual(edge_ids.tolist(), [1, 3])
+        self.assertEqual(sub.vs['label'], ['11', '12', '13'])
+        self.assertEqual([tuple(sorted(edge)) for edge in sub.get_edgelist()],
+                         [(0, 1), (0, 2)])
+        self.assertEqual(sub.es['award'], [1, 3])
+
+    def test_empty_subgraph(self):
+        sub, vertices, edge_ids = subgraph.induced_subgraph(
+            self.graph, ['99'])
+        self.assertEqual(sub.vcount(), 0)
+        self.assertEqual(len(edge_ids), 0)